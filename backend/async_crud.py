@@ -0,0 +1,89 @@
+"""Async variants of the crud functions.
+
+Each variant runs the sync crud function on the AsyncSession's connection via
+run_sync, so queries go through the async driver without a worker thread and
+the query logic lives only in crud.py. Results are converted to the read
+schema inside the same call, because lazy loads are not possible once control
+is back in async code.
+"""
+import functools
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, schemas, batch
+
+def _to_schema(result, schema):
+    if schema is None or result is None or isinstance(result, bool):
+        return result
+    if isinstance(result, list):
+        return [schema.model_validate(item) for item in result]
+    return schema.model_validate(result)
+
+# Sync crud function -> (async variant, read schema), for routes.py
+_VARIANTS = {}
+
+def _async_variant(fn, schema=None):
+    @functools.wraps(fn)
+    async def variant(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(lambda sync_db: _to_schema(fn(sync_db, *args, **kwargs), schema))
+    _VARIANTS[fn] = (variant, schema)
+    return variant
+
+def variant_of(fn):
+    """The async variant of a sync crud function."""
+    return _VARIANTS[fn][0]
+
+def call_as_schema(fn, db, *args, **kwargs):
+    """Call a sync crud function and convert its result like its async variant does."""
+    return _to_schema(fn(db, *args, **kwargs), _VARIANTS[fn][1])
+
+# --- Category CRUD ---
+get_category = _async_variant(crud.get_category, schemas.Category)
+get_categories = _async_variant(crud.get_categories, schemas.Category)
+create_category = _async_variant(crud.create_category, schemas.Category)
+update_category = _async_variant(crud.update_category, schemas.Category)
+delete_category = _async_variant(crud.delete_category)
+
+# --- SubCategory CRUD ---
+get_sub_category = _async_variant(crud.get_sub_category, schemas.SubCategory)
+get_sub_categories = _async_variant(crud.get_sub_categories, schemas.SubCategory)
+create_sub_category = _async_variant(crud.create_sub_category, schemas.SubCategory)
+update_sub_category = _async_variant(crud.update_sub_category, schemas.SubCategory)
+delete_sub_category = _async_variant(crud.delete_sub_category)
+
+# --- Construction Phase CRUD ---
+get_phase = _async_variant(crud.get_phase, schemas.ConstructionPhase)
+get_phases = _async_variant(crud.get_phases, schemas.ConstructionPhase)
+create_phase = _async_variant(crud.create_phase, schemas.ConstructionPhase)
+update_phase = _async_variant(crud.update_phase, schemas.ConstructionPhase)
+delete_phase = _async_variant(crud.delete_phase)
+
+# --- Tag CRUD ---
+get_tag = _async_variant(crud.get_tag, schemas.Tag)
+get_tags = _async_variant(crud.get_tags, schemas.Tag)
+create_tag = _async_variant(crud.create_tag, schemas.Tag)
+update_tag = _async_variant(crud.update_tag, schemas.Tag)
+delete_tag = _async_variant(crud.delete_tag)
+
+# --- Expense CRUD ---
+get_expense = _async_variant(crud.get_expense, schemas.Expense)
+get_expenses = _async_variant(crud.get_expenses, schemas.Expense)
+get_expenses_compact = _async_variant(crud.get_expenses_compact)
+get_expense_rows = _async_variant(crud.get_expense_rows)
+create_expense = _async_variant(crud.create_expense, schemas.Expense)
+update_expense = _async_variant(crud.update_expense, schemas.Expense)
+delete_expense = _async_variant(crud.delete_expense)
+
+# --- Sync ---
+get_changes = _async_variant(crud.get_changes)
+
+# --- Batch ---
+apply_batch = _async_variant(batch.apply_batch)
+
+# --- Search ---
+search_expenses = _async_variant(crud.search_expenses, schemas.ExpenseSearchHit)
+
+# --- Reports ---
+get_expense_summary = _async_variant(crud.get_expense_summary)
+get_expense_forecast = _async_variant(crud.get_expense_forecast)
+
+# --- Taxonomy ---
+get_taxonomy = _async_variant(crud.get_taxonomy)
@@ -0,0 +1,48 @@
+"""Async variant of the API: the routes of routes.build_router() on an
+AsyncSession (aiosqlite, or asyncpg for Postgres URLs).
+
+Run with: uvicorn backend.async_main:app
+"""
+from fastapi import FastAPI, Header
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+from . import database, responses, metrics, projects, routes
+from . import main
+
+async def get_db(x_project_id: int = Header(projects.DEFAULT_PROJECT_ID)):
+    """AsyncSession scoped to the project named by the X-Project-Id header."""
+    async with database.get_async_sessionmaker()() as db:
+        await db.run_sync(projects.scope, x_project_id)
+        yield db
+
+app = FastAPI(title="BrickByBrick API", default_response_class=responses.DefaultResponse)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173", "http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+app.add_middleware(metrics.MetricsMiddleware)
+
+app.include_router(routes.build_router(get_db, routes.AsyncSessionCalls))
+
+# Routes without an async variant (root, projects, bulk import, export, attachments, metrics) keep their
+# handlers from the sync app
+_async_routes = {
+    (route.path, method)
+    for route in app.router.routes if isinstance(route, APIRoute)
+    for method in route.methods
+}
+for route in main.app.router.routes:
+    if not isinstance(route, APIRoute):
+        continue
+    if any((route.path, method) in _async_routes for method in route.methods):
+        continue
+    app.router.routes.append(route)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,198 @@
+"""Multi-entity write batches.
+
+A batch is a list of create / update / delete operations on categories,
+sub-categories, phases, tags and expenses, applied in one transaction: a
+single commit for the whole UI action, and nothing is written if any
+operation fails. Creates and updates use INSERT / UPDATE ... RETURNING instead
+of a follow-up SELECT.
+
+An operation may name itself with "ref"; later operations can then pass
+"@<ref>" wherever an ID is expected (id, reassign_to, category_id,
+sub_category_id, phase_id, tags), e.g. to tag new expenses with a new tag.
+
+The statements below work on tables rather than models, which the project
+scoping in backend/projects.py does not see, so they filter on and insert the
+session's project themselves.
+"""
+from collections import namedtuple
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from . import crud, models, projects, rollups, schemas, sync
+from .cache import reference_cache
+
+MAX_OPERATIONS = 1000
+
+# read_schema shapes the returned rows like the list routes, without nested
+# objects (tags and references stay IDs) and without internal columns
+BatchEntity = namedtuple("BatchEntity", ["model", "schema", "read_schema", "delete", "cache_names", "label"])
+
+ENTITIES = {
+    "category": BatchEntity(models.Category, schemas.CategoryCreate, schemas.CategoryCompact, crud._delete_category,
+                            ("categories", "sub_categories", "forecast", "taxonomy"), "Category"),
+    "sub_category": BatchEntity(models.SubCategory, schemas.SubCategoryCreate, schemas.SubCategory,
+                                crud._delete_sub_category,
+                                ("categories", "sub_categories", "forecast", "taxonomy"), "SubCategory"),
+    "phase": BatchEntity(models.ConstructionPhase, schemas.ConstructionPhaseCreate, schemas.ConstructionPhase,
+                         crud._delete_phase, ("phases", "forecast", "taxonomy"), "Phase"),
+    "tag": BatchEntity(models.Tag, schemas.TagCreate, schemas.Tag, crud._delete_tag, ("tags", "taxonomy"), "Tag"),
+    "expense": BatchEntity(models.Expense, schemas.ExpenseCreate, schemas.ExpenseCompact, None, (), "Expense"),
+}
+
+REFERENCE_FIELDS = ("category_id", "sub_category_id", "phase_id")
+
+class BatchError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _resolve(value, refs: dict):
+    if isinstance(value, str):
+        if value.startswith("@") and value[1:] in refs:
+            return refs[value[1:]]
+        raise BatchError(400, f"Unknown reference {value!r}")
+    return value
+
+def _validated_data(db: Session, operation: schemas.BatchOperation, entity: BatchEntity, refs: dict):
+    data = dict(operation.data or {})
+    for field in REFERENCE_FIELDS:
+        if data.get(field) is not None:
+            data[field] = _resolve(data[field], refs)
+    if isinstance(data.get("tags"), list):
+        data["tags"] = [_resolve(tag_id, refs) for tag_id in data["tags"]]
+    try:
+        values = entity.schema(**data).dict()
+    except ValidationError as e:
+        raise BatchError(422, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    crud.check_references(db, values)
+    return values
+
+def _set_expense_tags(db: Session, expense_id: int, tag_ids, replace: bool):
+    """Link existing tags to the expense; unknown tag IDs are ignored like in crud."""
+    expense_tags = models.ExpenseTag.__table__
+    if replace:
+        db.execute(delete(expense_tags).where(expense_tags.c.expense_id == expense_id))
+    tag_ids = list(dict.fromkeys(tag_ids))
+    if tag_ids:
+        tag_ids = db.scalars(select(models.Tag.id).where(models.Tag.id.in_(tag_ids))).all()
+    if tag_ids:
+        db.execute(insert(expense_tags), [{"expense_id": expense_id, "tag_id": tag_id} for tag_id in tag_ids])
+    return sorted(tag_ids)
+
+def _row_data(entity: BatchEntity, row, **extra):
+    """RETURNING row as the entity's read schema: amount rather than amount_cents,
+    and no project_id or change tracking columns."""
+    values = {column.key: row._mapping[column] for column in entity.model.__table__.c}
+    return entity.read_schema(**values, **extra).dict()
+
+def _expense_delta_key(row):
+    return rollups.rollup_key(row.project_id, row.category_id, row.sub_category_id, row.phase_id, row.purchase_date)
+
+def _create(db: Session, entity: BatchEntity, values: dict, deltas: dict):
+    table = entity.model.__table__
+    tag_ids = values.pop("tags", None)
+    if values.get("purchase_date") is None:
+        # Leave it out so the column default applies, as in crud.create_expense
+        values.pop("purchase_date", None)
+    values["project_id"] = projects.project_for_insert(db)
+    row = db.execute(insert(table).values(**values).returning(*table.c)).one()
+    if entity.model is not models.Expense:
+        return _row_data(entity, row)
+    tags = _set_expense_tags(db, row.id, tag_ids or [], replace=False)
+    rollups.add_delta(deltas, _expense_delta_key(row), row.amount, 1)
+    return _row_data(entity, row, tags=tags)
+
+def _in_project(db: Session, table, row_id: int):
+    return [table.c.id == row_id, table.c.project_id == projects.project_for_insert(db)]
+
+def _update(db: Session, entity: BatchEntity, row_id: int, values: dict, deltas: dict):
+    table = entity.model.__table__
+    tag_ids = values.pop("tags", None)
+    old = None
+    if entity.model is models.Expense:
+        old = db.execute(select(table).where(*_in_project(db, table, row_id))).first()
+        if old is None:
+            return None
+    row = db.execute(update(table).where(*_in_project(db, table, row_id)).values(**values)
+                     .returning(*table.c)).first()
+    if row is None:
+        return None
+    if old is None:
+        return _row_data(entity, row)
+    tags = _set_expense_tags(db, row_id, tag_ids or [], replace=True)
+    rollups.add_delta(deltas, _expense_delta_key(old), -old.amount, -1)
+    rollups.add_delta(deltas, _expense_delta_key(row), row.amount, 1)
+    return _row_data(entity, row, tags=tags)
+
+def _delete_expense(db: Session, row_id: int, deltas: dict):
+    table = models.Expense.__table__
+    expense_tags = models.ExpenseTag.__table__
+    attachments = models.Attachment.__table__
+    if db.execute(select(table.c.id).where(*_in_project(db, table, row_id))).first() is None:
+        return False
+    db.execute(delete(expense_tags).where(expense_tags.c.expense_id == row_id))
+    db.execute(delete(attachments).where(attachments.c.expense_id == row_id))
+    row = db.execute(delete(table).where(table.c.id == row_id).returning(*table.c)).one()
+    sync.bury(db.connection(), "expenses", [row_id], row.project_id)
+    rollups.add_delta(deltas, _expense_delta_key(row), -row.amount, -1)
+    return True
+
+def _apply(db: Session, operation: schemas.BatchOperation, refs: dict, deltas: dict):
+    entity = ENTITIES[operation.entity]
+    row_id = None
+    if operation.action != "create":
+        if operation.id is None:
+            raise BatchError(400, f"{operation.action} needs an id")
+        row_id = _resolve(operation.id, refs)
+
+    if operation.action == "create":
+        data = _create(db, entity, _validated_data(db, operation, entity, refs), deltas)
+        row_id = data["id"]
+    elif operation.action == "update":
+        data = _update(db, entity, row_id, _validated_data(db, operation, entity, refs), deltas)
+        if data is None:
+            raise BatchError(404, f"{entity.label} not found")
+    else:
+        data = None
+        if entity.model is models.Expense:
+            deleted = _delete_expense(db, row_id, deltas)
+        else:
+            reassign_to = _resolve(operation.reassign_to, refs) if operation.reassign_to is not None else None
+            deleted = entity.delete(db, row_id, reassign_to)
+        if not deleted:
+            raise BatchError(404, f"{entity.label} not found")
+
+    if operation.ref:
+        refs[operation.ref] = row_id
+    return {"entity": operation.entity, "action": operation.action, "id": row_id, "ref": operation.ref, "data": data}
+
+def apply_batch(db: Session, operations):
+    """Apply every operation in order and commit once; roll back on the first error."""
+    if len(operations) > MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {MAX_OPERATIONS} operations")
+    refs = {}
+    deltas = {}
+    results = []
+    cache_names = set()
+    for index, operation in enumerate(operations):
+        try:
+            result = _apply(db, operation, refs, deltas)
+        except (BatchError, HTTPException) as e:
+            db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=f"Operation {index}: {e.detail}")
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Operation {index}: {getattr(e, 'orig', e)}")
+        results.append({"index": index, **result})
+        cache_names.update(ENTITIES[operation.entity].cache_names)
+
+    rollups.apply_deltas(db, deltas)
+    db.commit()
+    if cache_names:
+        reference_cache.bump(*cache_names)
+    return {"results": results}
@@ -0,0 +1,195 @@
+"""Content-addressed file storage for expense attachments.
+
+Files live on disk under their SHA-256 (blobs/ab/cd/abcd...), so identical
+uploads are stored once and the database only keeps metadata. Uploads are
+written in chunks to a temporary file while hashing, then moved into place;
+downloads are streamed in chunks with support for a single HTTP byte range.
+
+Deleting an attachment leaves its blob behind, since another attachment may
+share it. Unreferenced blobs are removed by:
+
+    python -m backend.blobs gc [--grace-hours 1]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+BLOB_DIR = os.getenv("BRICKBYBRICK_BLOB_DIR", "./blobs")
+MAX_ATTACHMENT_BYTES = int(os.getenv("BRICKBYBRICK_MAX_ATTACHMENT_MB", "100")) * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+class BlobTooLarge(Exception):
+    pass
+
+class BlobWriter:
+    """Hashes and spools an upload; commit() moves it to its content address."""
+    def __init__(self, store, max_bytes: int):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        os.makedirs(store.tmp_dir, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise BlobTooLarge(f"Attachments may be at most {self.max_bytes // (1024 * 1024)} MB")
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self):
+        """Store the blob and return its SHA-256; an existing copy is kept."""
+        self._file.close()
+        sha256 = self._digest.hexdigest()
+        path = self.store.path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(self._tmp_path)
+            # Fresh mtime keeps the garbage collector's grace period from
+            # removing it before the new attachment row is committed
+            os.utime(path)
+        else:
+            os.replace(self._tmp_path, path)
+        return sha256
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+
+    def path(self, sha256: str):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def writer(self, max_bytes: int = MAX_ATTACHMENT_BYTES):
+        return BlobWriter(self, max_bytes)
+
+    def read(self, sha256: str, start: int = 0, length: int = None):
+        """Yield the blob (or a slice of it) in CHUNK_SIZE pieces."""
+        remaining = length
+        with open(self.path(sha256), "rb") as f:
+            f.seek(start)
+            while remaining is None or remaining > 0:
+                chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def collect_garbage(self, referenced: set, grace_seconds: float = 3600):
+        """Remove blobs no attachment references, and abandoned uploads.
+
+        Files younger than grace_seconds are kept: their attachment row may
+        not be committed yet.
+        """
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for root, _, names in os.walk(self.root):
+            in_tmp = os.path.abspath(root) == os.path.abspath(self.tmp_dir)
+            for name in names:
+                path = os.path.join(root, name)
+                if (in_tmp or name not in referenced) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+blob_store = BlobStore(BLOB_DIR)
+
+# --- Downloads ---
+def parse_range(header: str, size: int):
+    """Inclusive (start, end) of a single byte range.
+
+    Returns None when the header should be ignored (other units, multiple
+    ranges, malformed), so the whole file is sent; raises ValueError when the
+    range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        if not last.isdigit():
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError(header)
+    if end < start:
+        return None
+    return start, end
+
+def _content_disposition(filename: str):
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "").replace("\\", "") or "attachment"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+def blob_response(request: Request, sha256: str, size: int, media_type: str, filename: str):
+    """Stream a blob, honouring Range / If-Range and If-None-Match."""
+    etag = f'"{sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": _content_disposition(filename),
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range with an old ETag (or a date) means the client's copy changed: send it all
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, length = 0, size
+    if byte_range is not None:
+        status_code = 206
+        start, length = byte_range[0], byte_range[1] - byte_range[0] + 1
+        headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(blob_store.read(sha256, start, length), status_code=status_code,
+                             headers=headers, media_type=media_type)
+
+if __name__ == "__main__":
+    from sqlalchemy import select
+    from . import models
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the attachment blob store.")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--grace-hours", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        referenced = set(db.scalars(select(models.Attachment.sha256).distinct()))
+    removed = blob_store.collect_garbage(referenced, args.grace_hours * 3600)
+    print(f"Removed {removed} unreferenced file(s) from {blob_store.root}.")
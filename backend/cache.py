@@ -0,0 +1,147 @@
+"""In-process cache for rarely changing reference data (categories, phases, tags)
+and reports derived from it (the forecast, bumped on every expense write).
+
+Every cached namespace has a version counter. The crud write functions bump it
+after committing, which invalidates all cached bodies of that namespace. ETags
+combine a per-process epoch with the version, so a restarted process never
+confirms an ETag issued by a previous one.
+
+With several worker processes (BRICKBYBRICK_SHARED_CACHE=1, set by
+backend/serve.py) the versions live in the reference_versions table instead,
+so a write in one worker invalidates the bodies cached by all of them. That
+costs one primary-key SELECT per cached request.
+
+Each project (X-Project-Id header) gets its own bodies and ETags; a write
+invalidates the namespace for all projects.
+"""
+import os
+import threading
+import uuid
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select, update, insert
+
+MAX_ENTRIES_PER_NAMESPACE = 64
+
+SHARED_VERSIONS = os.getenv("BRICKBYBRICK_SHARED_CACHE") == "1"
+
+class DatabaseVersions:
+    def __init__(self, engine):
+        from .models import ReferenceVersion
+
+        self.engine = engine
+        self.table = ReferenceVersion.__table__
+
+    def get(self, name: str):
+        with self.engine.connect() as conn:
+            version = conn.execute(select(self.table.c.version).where(self.table.c.name == name)).scalar()
+        return version or 0
+
+    def bump(self, names):
+        with self.engine.begin() as conn:
+            for name in names:
+                result = conn.execute(
+                    update(self.table).where(self.table.c.name == name).values(version=self.table.c.version + 1)
+                )
+                if result.rowcount == 0:
+                    conn.execute(insert(self.table).values(name=name, version=1))
+
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        self._entries = {}
+        self._shared = None
+
+    def share_versions(self, engine):
+        """Keep the versions in the database so all worker processes see every bump."""
+        self._shared = DatabaseVersions(engine)
+        # Versions persist across restarts, so the ETags may too
+        self._epoch = "db"
+
+    def version(self, name: str):
+        if self._shared is not None:
+            return self._shared.get(name)
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def bump(self, *names: str):
+        if self._shared is not None:
+            self._shared.bump(names)
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                self._entries.pop(name, None)
+
+    def etag(self, name: str, version: int, variant: str = None):
+        suffix = f"-{variant}" if variant else ""
+        return f'"{name}-{self._epoch}-{version}{suffix}"'
+
+    def get(self, name: str, key, version: int):
+        """Return the cached (etag, body) for key, or None if missing or older than version."""
+        with self._lock:
+            entry = self._entries.get(name, {}).get(key)
+            if entry is None or entry[0] != version:
+                return None
+            return entry[1], entry[2]
+
+    def put(self, name: str, key, version: int, body: bytes, variant: str = None):
+        """Store a body built while the namespace was at the given version.
+
+        Pass the version read before querying: if a write lands in between, the
+        entry is stored under the old version and is simply never served.
+        """
+        etag = self.etag(name, version, variant)
+        with self._lock:
+            entries = self._entries.setdefault(name, {})
+            if len(entries) >= MAX_ENTRIES_PER_NAMESPACE:
+                entries.pop(next(iter(entries)))
+            entries[key] = (version, etag, body)
+        return etag, body
+
+reference_cache = ReferenceCache()
+
+def dump_json(schema_type, value):
+    adapter = TypeAdapter(schema_type)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+def etag_response(request: Request, etag: str, body: bytes):
+    # no-cache makes browsers revalidate with If-None-Match on every fetch
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "X-Project-Id"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _scoped(key, variant: str, scope):
+    """Key and ETag variant of one project's body."""
+    if scope is None:
+        return key, variant
+    return (scope, key), f"p{scope}-{variant}" if variant else f"p{scope}"
+
+def cached_json_response(request: Request, name: str, key, schema_type, load, variant: str = None, scope=None,
+                         version: int = None):
+    """Serve load() serialized as schema_type from the cache, honouring If-None-Match.
+
+    variant goes into the ETag for bodies that also change without a write,
+    e.g. the date for reports relative to today; include it in key as well.
+    scope (the project ID) keeps the bodies of different projects apart.
+    version is the namespace version read before load(), if the caller has it.
+    """
+    key, variant = _scoped(key, variant, scope)
+    if version is None:
+        version = reference_cache.version(name)
+    entry = reference_cache.get(name, key, version)
+    if entry is None:
+        entry = reference_cache.put(name, key, version, dump_json(schema_type, load()), variant)
+    return etag_response(request, *entry)
+
+async def cached_json_response_async(request: Request, name: str, key, schema_type, load, variant: str = None,
+                                     scope=None):
+    """Same as cached_json_response for an async load(), which is only awaited on a miss."""
+    version = reference_cache.version(name)
+    entry = reference_cache.get(name, _scoped(key, variant, scope)[0], version)
+    if entry is not None:
+        return etag_response(request, *entry)
+    value = await load()
+    return cached_json_response(request, name, key, schema_type, lambda: value, variant, scope, version)
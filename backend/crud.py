@@ -1,18 +1,114 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
+import base64
+import datetime
+import json
+from collections import namedtuple
+from sqlalchemy import func, Date, and_, or_, case, exists, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import models, projects, schemas, rollups, search, sync
+from .cache import reference_cache
 from fastapi import HTTPException
 
+# --- Eager loading ---
+# Relationships are lazy by default, so each serialized row would otherwise
+# issue its own SELECTs. These options load everything the read schemas touch
+# in a fixed number of queries per list call.
+def _category_load_options():
+    return [selectinload(models.Category.sub_categories)]
+
+def _expense_load_options():
+    return [
+        joinedload(models.Expense.category).selectinload(models.Category.sub_categories),
+        joinedload(models.Expense.sub_category),
+        joinedload(models.Expense.phase),
+        selectinload(models.Expense.tags),
+    ]
+
+# --- Delete guards ---
+def _has_expenses(db: Session, criterion):
+    # EXISTS stops at the first match instead of loading the whole collection
+    return db.query(exists().where(criterion)).scalar()
+
+def _reassign_expenses(db: Session, column: str, source_id: int, target_id: int):
+    """Point every expense of source_id at target_id with one UPDATE."""
+    rollups.reassign(db, column, source_id, target_id)
+    db.query(models.Expense).filter(getattr(models.Expense, column) == source_id) \
+        .update({column: target_id}, synchronize_session=False)
+
+# --- References ---
+REFERENCES = (
+    ("category_id", models.Category, "Category"),
+    ("sub_category_id", models.SubCategory, "Sub-category"),
+    ("phase_id", models.ConstructionPhase, "Phase"),
+)
+
+def check_references(db: Session, data: dict):
+    """Reject category / sub-category / phase IDs outside the session's project."""
+    for field, model, label in REFERENCES:
+        if data.get(field) is not None and not db.query(exists().where(model.id == data[field])).scalar():
+            raise HTTPException(status_code=400, detail=f"{label} {data[field]} not found in this project")
+
+# --- Project CRUD ---
+def get_project(db: Session, project_id: int):
+    return db.query(models.Project).filter(models.Project.id == project_id).first()
+
+def get_projects(db: Session, skip: int = 0, limit: int = 100):
+    return db.query(models.Project).order_by(models.Project.id).offset(skip).limit(limit).all()
+
+def create_project(db: Session, project: schemas.ProjectCreate):
+    db_project = models.Project(**project.dict())
+    db.add(db_project)
+    db.commit()
+    reference_cache.bump("projects")
+    db.refresh(db_project)
+    return db_project
+
+def update_project(db: Session, project_id: int, project: schemas.ProjectCreate):
+    db_project = get_project(db, project_id)
+    if not db_project:
+        return None
+    db_project.title = project.title
+    db_project.description = project.description
+    db.commit()
+    reference_cache.bump("projects")
+    db.refresh(db_project)
+    return db_project
+
+# Tables whose rows keep a project alive; the rest hang off these or are derived
+PROJECT_CONTENT = (models.Category, models.ConstructionPhase, models.Tag, models.Expense)
+
+def delete_project(db: Session, project_id: int):
+    """Delete an empty project. The session may be scoped to another project,
+    so the checks go through the tables, which the scoping does not filter."""
+    db_project = get_project(db, project_id)
+    if not db_project:
+        return False
+    if project_id == projects.DEFAULT_PROJECT_ID:
+        raise HTTPException(status_code=400, detail="The default project cannot be deleted.")
+    for model in PROJECT_CONTENT:
+        table = model.__table__
+        if db.execute(select(exists().where(table.c.project_id == project_id))).scalar():
+            raise HTTPException(status_code=400, detail="Could not delete project that still has data.")
+    for model in (models.ExpenseRollup, models.Tombstone):
+        table = model.__table__
+        db.execute(table.delete().where(table.c.project_id == project_id))
+    db.delete(db_project)
+    db.commit()
+    reference_cache.bump("projects")
+    return True
+
 # --- Category CRUD ---
 def get_category(db: Session, category_id: int):
     return db.query(models.Category).filter(models.Category.id == category_id).first()
 
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Category).offset(skip).limit(limit).all()
+    return db.query(models.Category).options(*_category_load_options()) \
+        .order_by(models.Category.id).offset(skip).limit(limit).all()
 
 def create_category(db: Session, category: schemas.CategoryCreate):
-    db_category = models.Category(title=category.title, description=category.description)
+    db_category = models.Category(title=category.title, description=category.description, budget=category.budget)
     db.add(db_category)
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     db.refresh(db_category)
     return db_category
 
@@ -22,19 +118,35 @@ def update_category(db: Session, category_id: int, category: schemas.CategoryCre
         return None
     db_category.title = category.title
     db_category.description = category.description
+    db_category.budget = category.budget
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     db.refresh(db_category)
     return db_category
 
-def delete_category(db: Session, category_id: int):
+def _delete_category(db: Session, category_id: int, reassign_to: int = None):
+    """Delete (or merge away) a category without committing."""
     db_category = get_category(db, category_id)
     if not db_category:
         return False
+    if reassign_to is not None:
+        if reassign_to == category_id or not get_category(db, reassign_to):
+            raise HTTPException(status_code=404, detail="Target category not found")
+        # Merge: sub-categories move along so their expenses stay consistent
+        _reassign_expenses(db, "category_id", category_id, reassign_to)
+        db.query(models.SubCategory).filter(models.SubCategory.category_id == category_id) \
+            .update({"category_id": reassign_to}, synchronize_session=False)
     # Check for active expenses
-    if db_category.expenses:
+    elif _has_expenses(db, models.Expense.category_id == category_id):
         raise HTTPException(status_code=400, detail="Could not delete category due to existing expenses.")
     db.delete(db_category)
+    return True
+
+def delete_category(db: Session, category_id: int, reassign_to: int = None):
+    if not _delete_category(db, category_id, reassign_to):
+        return False
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     return True
 
 # --- SubCategory CRUD ---
@@ -43,14 +155,17 @@ def get_sub_category(db: Session, sub_category_id: int):
 
 def get_sub_categories(db: Session, category_id: int = None, skip: int = 0, limit: int = 100):
     query = db.query(models.SubCategory)
-    if category_id:
+    if category_id is not None:
         query = query.filter(models.SubCategory.category_id == category_id)
-    return query.offset(skip).limit(limit).all()
+    # Pages need a stable order; the form and management pages read /taxonomy instead
+    return query.order_by(models.SubCategory.id).offset(skip).limit(limit).all()
 
 def create_sub_category(db: Session, sub_category: schemas.SubCategoryCreate):
+    check_references(db, sub_category.dict())
     db_sub_category = models.SubCategory(**sub_category.dict())
     db.add(db_sub_category)
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     db.refresh(db_sub_category)
     return db_sub_category
 
@@ -58,22 +173,38 @@ def update_sub_category(db: Session, sub_category_id: int, sub_category: schemas
     db_sub_category = get_sub_category(db, sub_category_id)
     if not db_sub_category:
         return None
+    check_references(db, sub_category.dict())
     db_sub_category.title = sub_category.title
     db_sub_category.description = sub_category.description
     db_sub_category.category_id = sub_category.category_id
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     db.refresh(db_sub_category)
     return db_sub_category
 
-def delete_sub_category(db: Session, sub_category_id: int):
+def _delete_sub_category(db: Session, sub_category_id: int, reassign_to: int = None):
+    """Delete (or merge away) a sub-category without committing."""
     db_sub_category = get_sub_category(db, sub_category_id)
     if not db_sub_category:
         return False
+    if reassign_to is not None:
+        target = get_sub_category(db, reassign_to)
+        if reassign_to == sub_category_id or not target:
+            raise HTTPException(status_code=404, detail="Target sub-category not found")
+        if target.category_id != db_sub_category.category_id:
+            raise HTTPException(status_code=400, detail="Target sub-category belongs to a different category.")
+        _reassign_expenses(db, "sub_category_id", sub_category_id, reassign_to)
     # Check for active expenses
-    if db_sub_category.expenses:
+    elif _has_expenses(db, models.Expense.sub_category_id == sub_category_id):
         raise HTTPException(status_code=400, detail="Could not delete sub-category due to existing expenses.")
     db.delete(db_sub_category)
+    return True
+
+def delete_sub_category(db: Session, sub_category_id: int, reassign_to: int = None):
+    if not _delete_sub_category(db, sub_category_id, reassign_to):
+        return False
     db.commit()
+    reference_cache.bump("categories", "sub_categories", "forecast", "taxonomy")
     return True
 
 # --- Construction Phase CRUD ---
@@ -81,12 +212,13 @@ def get_phase(db: Session, phase_id: int):
     return db.query(models.ConstructionPhase).filter(models.ConstructionPhase.id == phase_id).first()
 
 def get_phases(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ConstructionPhase).offset(skip).limit(limit).all()
+    return db.query(models.ConstructionPhase).order_by(models.ConstructionPhase.id).offset(skip).limit(limit).all()
 
 def create_phase(db: Session, phase: schemas.ConstructionPhaseCreate):
     db_phase = models.ConstructionPhase(**phase.dict())
     db.add(db_phase)
     db.commit()
+    reference_cache.bump("phases", "forecast", "taxonomy")
     db.refresh(db_phase)
     return db_phase
 
@@ -96,19 +228,32 @@ def update_phase(db: Session, phase_id: int, phase: schemas.ConstructionPhaseCre
         return None
     db_phase.title = phase.title
     db_phase.description = phase.description
+    db_phase.budget = phase.budget
     db.commit()
+    reference_cache.bump("phases", "forecast", "taxonomy")
     db.refresh(db_phase)
     return db_phase
 
-def delete_phase(db: Session, phase_id: int):
+def _delete_phase(db: Session, phase_id: int, reassign_to: int = None):
+    """Delete (or merge away) a phase without committing."""
     db_phase = get_phase(db, phase_id)
     if not db_phase:
         return False
+    if reassign_to is not None:
+        if reassign_to == phase_id or not get_phase(db, reassign_to):
+            raise HTTPException(status_code=404, detail="Target phase not found")
+        _reassign_expenses(db, "phase_id", phase_id, reassign_to)
     # Check for active expenses
-    if db_phase.expenses:
+    elif _has_expenses(db, models.Expense.phase_id == phase_id):
         raise HTTPException(status_code=400, detail="Could not delete phase due to existing expenses.")
     db.delete(db_phase)
+    return True
+
+def delete_phase(db: Session, phase_id: int, reassign_to: int = None):
+    if not _delete_phase(db, phase_id, reassign_to):
+        return False
     db.commit()
+    reference_cache.bump("phases", "forecast", "taxonomy")
     return True
 
 # --- Tag CRUD ---
@@ -116,12 +261,13 @@ def get_tag(db: Session, tag_id: int):
     return db.query(models.Tag).filter(models.Tag.id == tag_id).first()
 
 def get_tags(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Tag).offset(skip).limit(limit).all()
+    return db.query(models.Tag).order_by(models.Tag.id).offset(skip).limit(limit).all()
 
 def create_tag(db: Session, tag: schemas.TagCreate):
     db_tag = models.Tag(**tag.dict())
     db.add(db_tag)
     db.commit()
+    reference_cache.bump("tags", "taxonomy")
     db.refresh(db_tag)
     return db_tag
 
@@ -131,26 +277,224 @@ def update_tag(db: Session, tag_id: int, tag: schemas.TagCreate):
         return None
     db_tag.title = tag.title
     db.commit()
+    reference_cache.bump("tags", "taxonomy")
     db.refresh(db_tag)
     return db_tag
 
-def delete_tag(db: Session, tag_id: int):
+def _delete_tag(db: Session, tag_id: int, reassign_to: int = None):
+    """Delete (or merge away) a tag without committing."""
     db_tag = get_tag(db, tag_id)
     if not db_tag:
         return False
+    if reassign_to is not None:
+        if reassign_to == tag_id or not get_tag(db, reassign_to):
+            raise HTTPException(status_code=404, detail="Target tag not found")
+        expense_tag = models.ExpenseTag
+        sync.touch(db, models.Expense, models.Expense.id.in_(
+            select(expense_tag.expense_id).where(expense_tag.tag_id == tag_id)))
+        # Drop links to expenses that already carry the target tag, move the rest
+        already_tagged = select(expense_tag.expense_id).where(expense_tag.tag_id == reassign_to)
+        db.query(expense_tag).filter(expense_tag.tag_id == tag_id, expense_tag.expense_id.in_(already_tagged)) \
+            .delete(synchronize_session=False)
+        db.query(expense_tag).filter(expense_tag.tag_id == tag_id) \
+            .update({"tag_id": reassign_to}, synchronize_session=False)
     # Check for active expenses
-    if db_tag.expenses:
+    elif _has_expenses(db, models.ExpenseTag.tag_id == tag_id):
         raise HTTPException(status_code=400, detail="Could not delete tag due to existing expenses.")
     db.delete(db_tag)
+    return True
+
+def delete_tag(db: Session, tag_id: int, reassign_to: int = None):
+    if not _delete_tag(db, tag_id, reassign_to):
+        return False
     db.commit()
+    reference_cache.bump("tags", "taxonomy")
     return True
 
 # --- Expense CRUD ---
-def get_expenses(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Expense).offset(skip).limit(limit).all()
+def get_expense(db: Session, expense_id: int):
+    return db.query(models.Expense).options(*_expense_load_options()) \
+        .filter(models.Expense.id == expense_id).first()
+
+# Sortable columns; a leading "-" in the sort parameter means descending.
+# Every sort is tie-broken on id so keyset cursors are unambiguous.
+EXPENSE_SORT_FIELDS = {
+    "purchase_date": models.Expense.purchase_date,
+    "amount": models.Expense.amount,
+    "title": models.Expense.title,
+    "id": models.Expense.id,
+}
+DEFAULT_EXPENSE_SORT = "-purchase_date"
+
+def _parse_expense_sort(sort: str):
+    field = sort.lstrip("-")
+    if field not in EXPENSE_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort '{sort}'. Use one of: {', '.join(EXPENSE_SORT_FIELDS)}.")
+    return field, sort.startswith("-")
+
+def filter_expenses(query, filters: schemas.ExpenseFilter = None):
+    if filters is None:
+        return query
+    if filters.category_id is not None:
+        query = query.filter(models.Expense.category_id == filters.category_id)
+    if filters.sub_category_id is not None:
+        query = query.filter(models.Expense.sub_category_id == filters.sub_category_id)
+    if filters.phase_id is not None:
+        query = query.filter(models.Expense.phase_id == filters.phase_id)
+    if filters.tags:
+        # Match expenses carrying any of the requested tags
+        tagged = query.session.query(models.ExpenseTag.expense_id) \
+            .filter(models.ExpenseTag.tag_id.in_(filters.tags))
+        query = query.filter(models.Expense.id.in_(tagged))
+    query = _filter_date_range(query, filters.start_date, filters.end_date)
+    if filters.min_amount is not None:
+        query = query.filter(models.Expense.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.filter(models.Expense.amount <= filters.max_amount)
+    if filters.q:
+        query = query.filter(func.lower(models.Expense.title).contains(filters.q.lower(), autoescape=True))
+    return query
+
+def encode_expense_cursor(expense, sort: str = DEFAULT_EXPENSE_SORT):
+    """Cursor for the page after expense (an ORM object, schema or row dict)."""
+    field, _ = _parse_expense_sort(sort)
+    if isinstance(expense, dict):
+        value, expense_id = expense[field], expense["id"]
+    else:
+        value, expense_id = getattr(expense, field), expense.id
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    payload = json.dumps([value, expense_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def _decode_expense_cursor(cursor: str, field: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if field == "purchase_date" and value is not None:
+            value = datetime.date.fromisoformat(value)
+        return value, int(last_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def _after_cursor(column, value, last_id, descending: bool):
+    # NULLs sort first ascending and last descending (see the ORDER BY below)
+    id_column = models.Expense.id
+    if descending:
+        if value is None:
+            return and_(column.is_(None), id_column < last_id)
+        return or_(column < value, column.is_(None), and_(column == value, id_column < last_id))
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), id_column > last_id))
+    return or_(column > value, and_(column == value, id_column > last_id))
+
+def expense_order_by(sort: str = DEFAULT_EXPENSE_SORT):
+    field, descending = _parse_expense_sort(sort)
+    column = EXPENSE_SORT_FIELDS[field]
+    if field == "id":
+        return [column.desc() if descending else column.asc()]
+    if descending:
+        return [column.desc().nulls_last(), models.Expense.id.desc()]
+    return [column.asc().nulls_first(), models.Expense.id.asc()]
+
+def _expense_page(query, skip: int = 0, limit: int = 100, filters: schemas.ExpenseFilter = None,
+                  sort: str = DEFAULT_EXPENSE_SORT, cursor: str = None):
+    field, descending = _parse_expense_sort(sort)
+    query = filter_expenses(query, filters)
+    if cursor:
+        value, last_id = _decode_expense_cursor(cursor, field)
+        query = query.filter(_after_cursor(EXPENSE_SORT_FIELDS[field], value, last_id, descending))
+        skip = 0
+    return query.order_by(*expense_order_by(sort)).offset(skip).limit(limit)
+
+def get_expenses(db: Session, skip: int = 0, limit: int = 100, filters: schemas.ExpenseFilter = None,
+                 sort: str = DEFAULT_EXPENSE_SORT, cursor: str = None):
+    query = db.query(models.Expense).options(*_expense_load_options())
+    return _expense_page(query, skip, limit, filters, sort, cursor).all()
+
+# --- Expense rows without ORM hydration ---
+# The functions below select plain column tuples and assemble response dicts
+# directly, skipping identity-map bookkeeping and relationship loading.
+EXPENSE_ROW_COLUMNS = (
+    "id", "title", "amount", "description", "purchase_date", "creation_date", "notes",
+    "category_id", "sub_category_id", "phase_id",
+)
+
+def _expense_rows(db: Session, skip: int = 0, limit: int = 100, filters: schemas.ExpenseFilter = None,
+                  sort: str = DEFAULT_EXPENSE_SORT, cursor: str = None):
+    """Page of expenses as dicts with a list of tag IDs under "tags"."""
+    query = db.query(*[getattr(models.Expense, name) for name in EXPENSE_ROW_COLUMNS])
+    rows = [dict(zip(EXPENSE_ROW_COLUMNS, row)) for row in _expense_page(query, skip, limit, filters, sort, cursor)]
+    tag_ids = {}
+    if rows:
+        links = db.query(models.ExpenseTag.expense_id, models.ExpenseTag.tag_id) \
+            .filter(models.ExpenseTag.expense_id.in_([row["id"] for row in rows]))
+        for expense_id, tag_id in links:
+            tag_ids.setdefault(expense_id, []).append(tag_id)
+    for row in rows:
+        row["tags"] = tag_ids.get(row["id"], [])
+    return rows
+
+def _rows_by_id(db: Session, model, columns, criterion):
+    return {
+        row[0]: dict(zip(columns, row))
+        for row in db.query(*[getattr(model, name) for name in columns]).filter(criterion)
+    }
+
+def _referenced(rows, key):
+    return {row[key] for row in rows if row[key] is not None}
+
+def _next_cursor(rows, limit: int, sort: str):
+    return encode_expense_cursor(rows[-1], sort) if rows and len(rows) == limit else None
+
+def get_expenses_compact(db: Session, skip: int = 0, limit: int = 100, filters: schemas.ExpenseFilter = None,
+                         sort: str = DEFAULT_EXPENSE_SORT, cursor: str = None):
+    """Page of expenses with ID references plus each referenced entity once."""
+    rows = _expense_rows(db, skip, limit, filters, sort, cursor)
+    tag_ids = {tag_id for row in rows for tag_id in row["tags"]}
+    return {
+        "expenses": rows,
+        "categories": _rows_by_id(db, models.Category, ("id", "title", "description"),
+                                  models.Category.id.in_(_referenced(rows, "category_id"))),
+        "sub_categories": _rows_by_id(db, models.SubCategory, ("id", "title", "description", "category_id"),
+                                      models.SubCategory.id.in_(_referenced(rows, "sub_category_id"))),
+        "phases": _rows_by_id(db, models.ConstructionPhase, ("id", "title", "description"),
+                              models.ConstructionPhase.id.in_(_referenced(rows, "phase_id"))),
+        "tags": _rows_by_id(db, models.Tag, ("id", "title"), models.Tag.id.in_(tag_ids)),
+        "next_cursor": _next_cursor(rows, limit, sort),
+    }
+
+def get_expense_rows(db: Session, skip: int = 0, limit: int = 100, filters: schemas.ExpenseFilter = None,
+                     sort: str = DEFAULT_EXPENSE_SORT, cursor: str = None):
+    """Same page and shape as get_expenses serialized through schemas.Expense."""
+    rows = _expense_rows(db, skip, limit, filters, sort, cursor)
+    category_ids = _referenced(rows, "category_id")
+    categories = _rows_by_id(db, models.Category, ("id", "title", "description"), models.Category.id.in_(category_ids))
+    sub_categories = _rows_by_id(
+        db, models.SubCategory, ("id", "title", "description", "category_id"),
+        or_(models.SubCategory.category_id.in_(category_ids),
+            models.SubCategory.id.in_(_referenced(rows, "sub_category_id"))),
+    )
+    for category in categories.values():
+        category["sub_categories"] = []
+    for sub_category in sorted(sub_categories.values(), key=lambda sub: sub["id"]):
+        if sub_category["category_id"] in categories:
+            categories[sub_category["category_id"]]["sub_categories"].append(sub_category)
+    phases = _rows_by_id(db, models.ConstructionPhase, ("id", "title", "description"),
+                         models.ConstructionPhase.id.in_(_referenced(rows, "phase_id")))
+    tags = _rows_by_id(db, models.Tag, ("id", "title"),
+                       models.Tag.id.in_({tag_id for row in rows for tag_id in row["tags"]}))
+
+    for row in rows:
+        row["category"] = categories.get(row["category_id"])
+        row["sub_category"] = sub_categories.get(row["sub_category_id"])
+        row["phase"] = phases.get(row["phase_id"])
+        row["tags"] = [tags[tag_id] for tag_id in row["tags"] if tag_id in tags]
+    return rows
 
 def create_expense(db: Session, expense: schemas.ExpenseCreate):
     expense_data = expense.dict()
+    check_references(db, expense_data)
     tag_ids = expense_data.pop('tags', [])
     
     db_expense = models.Expense(**expense_data)
@@ -160,14 +504,17 @@ def create_expense(db: Session, expense: schemas.ExpenseCreate):
         db_expense.tags = tags
 
     db.add(db_expense)
+    # Flush first so column defaults (purchase_date) are applied to the key
+    db.flush()
+    rollups.apply_deltas(db, {rollups.expense_key(db_expense): (db_expense.amount, 1)})
     db.commit()
-    db.refresh(db_expense)
-    return db_expense
+    return get_expense(db, db_expense.id)
 
 def delete_expense(db: Session, expense_id: int):
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
     if not db_expense:
         return False
+    rollups.apply_deltas(db, {rollups.expense_key(db_expense): (-db_expense.amount, -1)})
     db.delete(db_expense)
     db.commit()
     return True
@@ -176,6 +523,9 @@ def update_expense(db: Session, expense_id: int, expense: schemas.ExpenseCreate)
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
     if not db_expense:
         return None
+    check_references(db, expense.dict())
+    deltas = {}
+    rollups.add_delta(deltas, rollups.expense_key(db_expense), -db_expense.amount, -1)
     
     # Update fields
     db_expense.title = expense.title
@@ -192,6 +542,405 @@ def update_expense(db: Session, expense_id: int, expense: schemas.ExpenseCreate)
     tags = db.query(models.Tag).filter(models.Tag.id.in_(tag_ids)).all()
     db_expense.tags = tags
     
+    rollups.add_delta(deltas, rollups.expense_key(db_expense), db_expense.amount, 1)
+    rollups.apply_deltas(db, deltas)
     db.commit()
-    db.refresh(db_expense)
-    return db_expense
+    return get_expense(db, expense_id)
+
+# --- Attachments ---
+def expense_exists(db: Session, expense_id: int):
+    return _has_expenses(db, models.Expense.id == expense_id)
+
+def get_attachment(db: Session, attachment_id: int):
+    return db.query(models.Attachment).filter(models.Attachment.id == attachment_id).first()
+
+def get_attachments(db: Session, expense_id: int):
+    return db.query(models.Attachment).filter(models.Attachment.expense_id == expense_id) \
+        .order_by(models.Attachment.id).all()
+
+def create_attachment(db: Session, expense_id: int, filename: str, content_type: str, size: int, sha256: str):
+    """Record an attachment whose bytes are already in the blob store."""
+    db_attachment = models.Attachment(expense_id=expense_id, filename=filename, content_type=content_type,
+                                      size=size, sha256=sha256)
+    db.add(db_attachment)
+    db.commit()
+    db.refresh(db_attachment)
+    return db_attachment
+
+def delete_attachment(db: Session, attachment_id: int):
+    db_attachment = get_attachment(db, attachment_id)
+    if not db_attachment:
+        return False
+    db.delete(db_attachment)
+    db.commit()
+    return True
+
+# --- Sync ---
+SYNC_COLUMNS = {
+    "categories": (models.Category, ("id", "title", "description", "budget")),
+    "sub_categories": (models.SubCategory, ("id", "title", "description", "category_id")),
+    "phases": (models.ConstructionPhase, ("id", "title", "description", "budget")),
+    "tags": (models.Tag, ("id", "title")),
+}
+
+def get_changes(db: Session, since: int = 0):
+    """Rows changed and deleted after the change token `since`.
+
+    since=0, or a token from another database (higher than the current one),
+    returns every row with full=True: the client replaces its copy. Apply
+    "deleted" before the rows, since SQLite may reuse the ID of a deleted row.
+    """
+    # Read the token first: rows committed meanwhile are sent again next time
+    # at worst, never skipped
+    token = sync.current_token(db)
+    full = since <= 0 or since > token
+
+    def changed(model):
+        return [] if full else [model.change_seq > since]
+
+    changes = {"token": token, "full": full, "deleted": []}
+    for entity, (model, columns) in SYNC_COLUMNS.items():
+        query = db.query(*[getattr(model, name) for name in columns]).filter(*changed(model)).order_by(model.id)
+        changes[entity] = [dict(zip(columns, row)) for row in query]
+
+    expense = models.Expense
+    rows = [
+        dict(zip(EXPENSE_ROW_COLUMNS, row))
+        for row in db.query(*[getattr(expense, name) for name in EXPENSE_ROW_COLUMNS])
+            .filter(*changed(expense)).order_by(expense.id)
+    ]
+    tag_ids = {}
+    # Join the expenses even for a full sync: expense_tags has no project_id of
+    # its own, so the join is what limits the links to the session's project
+    links = db.query(models.ExpenseTag.expense_id, models.ExpenseTag.tag_id) \
+        .join(expense, expense.id == models.ExpenseTag.expense_id).filter(*changed(expense))
+    for expense_id, tag_id in links:
+        tag_ids.setdefault(expense_id, []).append(tag_id)
+    for row in rows:
+        row["tags"] = tag_ids.get(row["id"], [])
+    changes["expenses"] = rows
+
+    if not full:
+        present = {(entity, row["id"]) for entity in sync.ENTITIES.values() for row in changes[entity]}
+        tombstones = db.query(models.Tombstone.entity, models.Tombstone.row_id) \
+            .filter(models.Tombstone.change_seq > since) \
+            .distinct()
+        changes["deleted"] = [
+            {"entity": entity, "id": row_id}
+            for entity, row_id in tombstones
+            if (entity, row_id) not in present
+        ]
+    return changes
+
+# --- Search ---
+def search_expenses(db: Session, q: str, skip: int = 0, limit: int = 20):
+    """Ranked full-text matches, each with the expense and highlighted text."""
+    hits = search.search_expenses(db, q, skip=skip, limit=limit)
+    if not hits:
+        return []
+    expenses = {
+        expense.id: expense
+        for expense in db.query(models.Expense).options(*_expense_load_options())
+            .filter(models.Expense.id.in_([hit[0] for hit in hits]))
+    }
+    return [
+        {"expense": expenses[expense_id], "rank": rank, "title_highlight": title, "snippet": snippet or ""}
+        for expense_id, rank, title, snippet in hits
+        if expense_id in expenses
+    ]
+
+# --- Reports ---
+DATE_BUCKETS = ("day", "week", "month")
+
+def _date_bucket(db: Session, bucket: str):
+    column = models.Expense.purchase_date
+    if bucket == "day":
+        return column
+    if db.bind.dialect.name == "postgresql":
+        return func.date_trunc(bucket, column).cast(Date)
+    # SQLite: snap to the Monday of the week / first day of the month
+    if bucket == "week":
+        return func.date(column, "-6 days", "weekday 1", type_=Date)
+    return func.date(column, "start of month", type_=Date)
+
+def _date_range_criteria(start_date=None, end_date=None):
+    criteria = []
+    if start_date is not None:
+        criteria.append(models.Expense.purchase_date >= start_date)
+    if end_date is not None:
+        criteria.append(models.Expense.purchase_date <= end_date)
+    return criteria
+
+def _filter_date_range(query, start_date=None, end_date=None):
+    return query.filter(*_date_range_criteria(start_date, end_date))
+
+# Reports read the rollup table instead of the expenses whenever the date range
+# covers whole months; tag totals and day/week buckets always need the expenses.
+SummarySource = namedtuple("SummarySource", "model total count category_id sub_category_id phase_id criteria")
+
+def _covers_whole_months(start_date=None, end_date=None):
+    if start_date is not None and start_date.day != 1:
+        return False
+    if end_date is not None and (end_date + datetime.timedelta(days=1)).day != 1:
+        return False
+    return True
+
+def _summary_source(start_date=None, end_date=None):
+    if _covers_whole_months(start_date, end_date):
+        rollup = models.ExpenseRollup
+        criteria = []
+        if start_date is not None:
+            criteria.append(rollup.month >= rollups.month_key(start_date))
+        if end_date is not None:
+            criteria += [rollup.month <= rollups.month_key(end_date), rollup.month != ""]
+        return SummarySource(
+            rollup, func.sum(rollup.total), func.sum(rollup.count),
+            rollup.category_id, rollup.sub_category_id, rollup.phase_id, criteria,
+        )
+    expense = models.Expense
+    return SummarySource(
+        expense, func.sum(expense.amount), func.count(expense.id),
+        expense.category_id, expense.sub_category_id, expense.phase_id,
+        _date_range_criteria(start_date, end_date),
+    )
+
+def _summary_groups(db: Session, source: SummarySource, entity, foreign_key):
+    rows = db.query(entity.id, entity.title, source.total, source.count) \
+        .select_from(source.model) \
+        .outerjoin(entity, entity.id == foreign_key) \
+        .filter(*source.criteria) \
+        .group_by(entity.id, entity.title) \
+        .order_by(source.total.desc()) \
+        .all()
+    return [
+        {"id": id_, "title": title or "Uncategorized", "total": total or 0.0, "count": count or 0}
+        for id_, title, total, count in rows
+    ]
+
+def get_expense_summary(db: Session, start_date=None, end_date=None, bucket: str = "day"):
+    if bucket not in DATE_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket '{bucket}'. Use one of: {', '.join(DATE_BUCKETS)}.")
+    source = _summary_source(start_date, end_date)
+
+    total, count = db.query(source.total, source.count).select_from(source.model).filter(*source.criteria).one()
+
+    by_tag_query = db.query(
+        models.Tag.id,
+        models.Tag.title,
+        func.sum(models.Expense.amount),
+        func.count(models.Expense.id),
+    ).select_from(models.Expense) \
+        .join(models.ExpenseTag, models.ExpenseTag.expense_id == models.Expense.id) \
+        .join(models.Tag, models.Tag.id == models.ExpenseTag.tag_id)
+    by_tag_rows = _filter_date_range(by_tag_query, start_date, end_date) \
+        .group_by(models.Tag.id, models.Tag.title) \
+        .order_by(func.sum(models.Expense.amount).desc()) \
+        .all()
+    by_tag = [
+        {"id": id_, "title": title, "total": tag_total or 0.0, "count": tag_count}
+        for id_, title, tag_total, tag_count in by_tag_rows
+    ]
+
+    if bucket == "month" and source.model is models.ExpenseRollup:
+        month = models.ExpenseRollup.month
+        by_date_rows = db.query(month, source.total, source.count) \
+            .filter(*source.criteria, month != "") \
+            .group_by(month).order_by(month).all()
+        by_date_rows = [
+            (datetime.date.fromisoformat(f"{bucket_month}-01"), bucket_total, bucket_count)
+            for bucket_month, bucket_total, bucket_count in by_date_rows
+        ]
+    else:
+        date_bucket = _date_bucket(db, bucket).label("bucket")
+        by_date_rows = _filter_date_range(
+            db.query(date_bucket, func.sum(models.Expense.amount), func.count(models.Expense.id)),
+            start_date, end_date,
+        ).filter(models.Expense.purchase_date.isnot(None)).group_by(date_bucket).order_by(date_bucket).all()
+    by_date = [
+        {"date": bucket_date, "total": bucket_total or 0.0, "count": bucket_count}
+        for bucket_date, bucket_total, bucket_count in by_date_rows
+    ]
+
+    return {
+        "total": total or 0.0,
+        "count": count or 0,
+        "by_category": _summary_groups(db, source, models.Category, source.category_id),
+        "by_sub_category": _summary_groups(db, source, models.SubCategory, source.sub_category_id),
+        "by_phase": _summary_groups(db, source, models.ConstructionPhase, source.phase_id),
+        "by_tag": by_tag,
+        "by_date": by_date,
+    }
+
+# --- Forecast ---
+FORECAST_WINDOW_DAYS = 90
+
+def _burn(spent, recent_spent, first_purchase, today, window_days):
+    """Average daily spend over the whole history and over the trailing window."""
+    if first_purchase is None:
+        return 0.0, 0.0
+    days = max((today - first_purchase).days + 1, 1)
+    average = spent / days
+    recent = recent_spent / min(window_days, days)
+    return average, recent
+
+def _projection(spent, budget, burn_rate, today, until):
+    remaining = budget - spent if budget is not None else None
+    exhausted_on = None
+    if remaining is not None:
+        if remaining <= 0:
+            exhausted_on = today
+        elif burn_rate > 0:
+            exhausted_on = today + datetime.timedelta(days=int(remaining // burn_rate))
+    projected_total = None
+    if until is not None:
+        projected_total = spent + burn_rate * max((until - today).days, 0)
+    return remaining, exhausted_on, projected_total
+
+def _forecast_groups(db: Session, entity, foreign_key, criteria, window_start, today, window_days, until):
+    amount = models.Expense.amount
+    recent = func.sum(case((models.Expense.purchase_date >= window_start, amount), else_=0.0))
+    rows = db.query(entity.id, entity.title, entity.budget, func.sum(amount), recent,
+                    func.min(models.Expense.purchase_date)) \
+        .select_from(models.Expense) \
+        .outerjoin(entity, entity.id == foreign_key) \
+        .filter(*criteria) \
+        .group_by(entity.id, entity.title, entity.budget) \
+        .order_by(func.sum(amount).desc()) \
+        .all()
+    groups = []
+    for id_, title, budget, spent, recent_spent, first_purchase in rows:
+        _, burn_rate = _burn(spent or 0.0, recent_spent or 0.0, first_purchase, today, window_days)
+        remaining, exhausted_on, projected_total = _projection(spent or 0.0, budget, burn_rate, today, until)
+        groups.append({
+            "id": id_, "title": title or "Unassigned", "budget": budget, "spent": spent or 0.0,
+            "remaining": remaining, "daily_burn_rate": burn_rate,
+            "budget_exhausted_on": exhausted_on, "projected_total": projected_total,
+        })
+    return groups
+
+def get_expense_forecast(db: Session, category_id: int = None, phase_id: int = None, bucket: str = "month",
+                         until: datetime.date = None, window_days: int = FORECAST_WINDOW_DAYS, today: datetime.date = None):
+    """Cumulative spend, burn rate and budget projection, aggregated in SQL.
+
+    The burn rate is the average daily spend over the trailing window_days; it
+    projects when the budget runs out and, given an expected completion date
+    (until), the total cost by then.
+    """
+    if bucket not in DATE_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket '{bucket}'. Use one of: {', '.join(DATE_BUCKETS)}.")
+    if window_days < 1:
+        raise HTTPException(status_code=400, detail="window_days must be positive")
+    today = today or datetime.date.today()
+    window_start = today - datetime.timedelta(days=window_days - 1)
+
+    criteria = []
+    if category_id is not None:
+        criteria.append(models.Expense.category_id == category_id)
+    if phase_id is not None:
+        criteria.append(models.Expense.phase_id == phase_id)
+
+    # Budget of the scope: the selected category / phase, or all category budgets
+    if category_id is not None:
+        budget = db.query(models.Category.budget).filter(models.Category.id == category_id).scalar()
+    elif phase_id is not None:
+        budget = db.query(models.ConstructionPhase.budget).filter(models.ConstructionPhase.id == phase_id).scalar()
+    else:
+        budget = db.query(func.sum(models.Category.budget)).scalar()
+
+    amount = models.Expense.amount
+    spent, recent_spent, first_purchase, last_purchase = db.query(
+        func.sum(amount),
+        func.sum(case((models.Expense.purchase_date >= window_start, amount), else_=0.0)),
+        func.min(models.Expense.purchase_date),
+        func.max(models.Expense.purchase_date),
+    ).filter(*criteria).one()
+    spent = spent or 0.0
+    average, burn_rate = _burn(spent, recent_spent or 0.0, first_purchase, today, window_days)
+    remaining, exhausted_on, projected_total = _projection(spent, budget, burn_rate, today, until)
+
+    # Running total and a 3-bucket moving average as window aggregates over the buckets
+    date_bucket = _date_bucket(db, bucket).label("bucket")
+    bucket_spent = func.sum(amount)
+    series_rows = db.query(
+        date_bucket,
+        bucket_spent,
+        func.sum(bucket_spent).over(order_by=date_bucket),
+        # AVG defaults to a plain float, which would skip the cents-to-units conversion
+        func.avg(bucket_spent, type_=models.Money).over(order_by=date_bucket, rows=(-2, 0)),
+    ).filter(*criteria, models.Expense.purchase_date.isnot(None)) \
+        .group_by(date_bucket).order_by(date_bucket).all()
+
+    return {
+        "as_of": today,
+        "until": until,
+        "window_days": window_days,
+        "budget": budget,
+        "spent": spent,
+        "remaining": remaining,
+        "first_purchase": first_purchase,
+        "last_purchase": last_purchase,
+        "average_daily_spend": average,
+        "daily_burn_rate": burn_rate,
+        "budget_exhausted_on": exhausted_on,
+        "projected_total": projected_total,
+        "series": [
+            {"date": bucket_date, "spent": total, "cumulative": cumulative, "rolling_average": rolling}
+            for bucket_date, total, cumulative, rolling in series_rows
+        ],
+        "by_category": _forecast_groups(db, models.Category, models.Expense.category_id, criteria,
+                                        window_start, today, window_days, until),
+        "by_phase": _forecast_groups(db, models.ConstructionPhase, models.Expense.phase_id, criteria,
+                                     window_start, today, window_days, until),
+    }
+
+# --- Taxonomy ---
+def _rollup_totals(db: Session, column):
+    """{id: (count, total)} of the expenses per value of one rollup key column."""
+    rollup = models.ExpenseRollup
+    rows = db.query(column, func.sum(rollup.count), func.sum(rollup.total)).group_by(column)
+    return {id_: (count, total) for id_, count, total in rows}
+
+def _tag_totals(db: Session):
+    rows = db.query(models.ExpenseTag.tag_id, func.count(models.Expense.id), func.sum(models.Expense.amount)) \
+        .select_from(models.Expense) \
+        .join(models.ExpenseTag, models.ExpenseTag.expense_id == models.Expense.id) \
+        .group_by(models.ExpenseTag.tag_id)
+    return {id_: (count, total) for id_, count, total in rows}
+
+def _taxonomy_node(row, fields, totals):
+    count, total = totals.get(row.id, (0, 0.0))
+    return {"id": row.id, **{field: getattr(row, field) for field in fields}, "count": count, "total": total or 0.0}
+
+def get_taxonomy(db: Session):
+    """Categories with their sub-categories, phases and tags, each with its expense count and total.
+
+    Node totals come from the rollup table (tags from one join over
+    expense_tags), so the whole tree costs a fixed number of grouped queries.
+    """
+    rollup = models.ExpenseRollup
+    count, total = db.query(func.sum(rollup.count), func.sum(rollup.total)).one()
+    by_category = _rollup_totals(db, rollup.category_id)
+    by_sub_category = _rollup_totals(db, rollup.sub_category_id)
+    by_phase = _rollup_totals(db, rollup.phase_id)
+    by_tag = _tag_totals(db)
+
+    sub_categories = {}
+    for sub in db.query(models.SubCategory).order_by(models.SubCategory.id):
+        sub_categories.setdefault(sub.category_id, []).append(
+            _taxonomy_node(sub, ("title", "description", "category_id"), by_sub_category)
+        )
+    categories = [
+        {**_taxonomy_node(category, ("title", "description", "budget"), by_category),
+         "sub_categories": sub_categories.get(category.id, [])}
+        for category in db.query(models.Category).order_by(models.Category.id)
+    ]
+    return {
+        "count": count or 0,
+        "total": total or 0.0,
+        "categories": categories,
+        "phases": [
+            _taxonomy_node(phase, ("title", "description", "budget"), by_phase)
+            for phase in db.query(models.ConstructionPhase).order_by(models.ConstructionPhase.id)
+        ],
+        "tags": [_taxonomy_node(tag, ("title",), by_tag) for tag in db.query(models.Tag).order_by(models.Tag.id)],
+    }
@@ -1,12 +1,59 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from . import metrics
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./brickbybrick.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("BRICKBYBRICK_DATABASE_URL", "sqlite:///./brickbybrick.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# "production" applies the SQLite pragmas below on every new connection,
+# "default" leaves SQLite's stock settings (rollback journal, synchronous=FULL)
+DB_PROFILE = os.getenv("BRICKBYBRICK_DB_PROFILE", "production")
+
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+# WAL lets readers run alongside a writer, and synchronous=NORMAL is durable
+# in WAL mode except for the last transactions on power loss.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("BRICKBYBRICK_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("BRICKBYBRICK_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": _env_int("BRICKBYBRICK_SQLITE_BUSY_TIMEOUT_MS", 5000),
+    # Negative cache_size is in KiB: 64 MiB page cache per connection
+    "cache_size": _env_int("BRICKBYBRICK_SQLITE_CACHE_SIZE", -64000),
+    "mmap_size": _env_int("BRICKBYBRICK_SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+    "temp_store": os.getenv("BRICKBYBRICK_SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+def _pool_kwargs():
+    # Only pass what was configured so each dialect keeps its own pool defaults
+    settings = {
+        "pool_size": _env_int("BRICKBYBRICK_DB_POOL_SIZE"),
+        "max_overflow": _env_int("BRICKBYBRICK_DB_MAX_OVERFLOW"),
+        "pool_timeout": _env_int("BRICKBYBRICK_DB_POOL_TIMEOUT"),
+        "pool_recycle": _env_int("BRICKBYBRICK_DB_POOL_RECYCLE"),
+    }
+    return {key: value for key, value in settings.items() if value is not None}
+
+def _apply_sqlite_profile(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DB_PROFILE):
+    is_sqlite = url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+    db_engine = create_engine(url, connect_args=connect_args, **_pool_kwargs())
+    if is_sqlite and profile == "production":
+        _apply_sqlite_profile(db_engine)
+    metrics.instrument_engine(db_engine)
+    return db_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -17,3 +64,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# --- Async engine ---
+# Created on first use so the sync app doesn't need the async drivers installed.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str = SQLALCHEMY_DATABASE_URL):
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}://{rest}"
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DB_PROFILE):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(async_database_url(url), **_pool_kwargs())
+    if url.startswith("sqlite") and profile == "production":
+        _apply_sqlite_profile(async_engine.sync_engine)
+    metrics.instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        _async_sessionmaker = sessionmaker(
+            bind=create_async_db_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
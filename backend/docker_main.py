@@ -1,8 +1,12 @@
 import os
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from .main import app
+from fastapi import HTTPException, Request
+from .static_files import StaticIndex
+
+# BRICKBYBRICK_ASYNC=1 serves the async routes (backend/async_main.py)
+if os.getenv("BRICKBYBRICK_ASYNC") == "1":
+    from .async_main import app
+else:
+    from .main import app
 
 # Remove the existing root route to allow serving index.html at /
 # We filter out the route that matches path '/' and method 'GET'
@@ -18,21 +22,21 @@ DIST_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend",
 
 # Check if dist directory exists (it should in the container)
 if os.path.exists(DIST_DIR):
-    # Mount assets folder
-    # Vite typically puts assets in 'assets' folder
-    app.mount("/assets", StaticFiles(directory=os.path.join(DIST_DIR, "assets")), name="assets")
-    
+    # Index the build once; requests are then served from memory lookups
+    static_index = StaticIndex(DIST_DIR)
+
     # Catch-all route for SPA
     # We place this after all other routes so API routes take precedence
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        # Check if specific file exists first (e.g. favicon.ico, etc.)
-        file_path = os.path.join(DIST_DIR, full_path)
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-            
-        # Fallback to index.html for React routing
-        return FileResponse(os.path.join(DIST_DIR, "index.html"))
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_spa(full_path: str, request: Request):
+        static_file = static_index.get(full_path)
+        if static_file is None:
+            # Missing hashed assets are real 404s, not the SPA shell
+            if full_path.startswith("assets/"):
+                raise HTTPException(status_code=404, detail="Not found")
+            # Fallback to index.html for React routing
+            static_file = static_index.get("index.html")
+        return static_index.response(request, static_file)
 else:
     print(f"WARNING: Frontend build directory not found at {DIST_DIR}. Serving API only.")
 
@@ -0,0 +1,133 @@
+import csv
+import io
+import json
+from . import models, schemas, crud, database, projects
+
+FORMATS = ("csv", "ndjson", "columnar")
+# Columnar lines are NDJSON too, but hold one array per column instead of one
+# object per row; the layout parameter and file suffix tell the two apart
+COLUMNAR_MEDIA_TYPE = "application/x-ndjson; layout=columnar"
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "columnar": COLUMNAR_MEDIA_TYPE,
+}
+FILE_EXTENSIONS = {
+    "csv": "csv",
+    "ndjson": "ndjson",
+    "columnar": "columnar.ndjson",
+}
+DEFAULT_BATCH_SIZE = 1000
+
+# Same column names the importer understands, so an export can be re-imported
+COLUMNS = [
+    "id", "title", "amount", "description", "purchase_date", "creation_date", "notes",
+    "category", "sub_category", "phase", "tags",
+]
+
+def _expense_rows_query(db, filters: schemas.ExpenseFilter = None, sort: str = crud.DEFAULT_EXPENSE_SORT):
+    # Plain column tuples: no ORM identity map, so memory doesn't grow with the table
+    query = db.query(
+        models.Expense.id,
+        models.Expense.title,
+        models.Expense.amount,
+        models.Expense.description,
+        models.Expense.purchase_date,
+        models.Expense.creation_date,
+        models.Expense.notes,
+        models.Category.title,
+        models.SubCategory.title,
+        models.ConstructionPhase.title,
+    ).select_from(models.Expense) \
+        .join(models.Category, models.Category.id == models.Expense.category_id) \
+        .outerjoin(models.SubCategory, models.SubCategory.id == models.Expense.sub_category_id) \
+        .outerjoin(models.ConstructionPhase, models.ConstructionPhase.id == models.Expense.phase_id)
+    return crud.filter_expenses(query, filters).order_by(*crud.expense_order_by(sort))
+
+def _iter_batches(db, query, batch_size: int):
+    """Yield lists of row dicts, fetching tag titles once per batch."""
+    batch = []
+
+    def with_tags(rows):
+        tags = {}
+        tag_rows = db.query(models.ExpenseTag.expense_id, models.Tag.title) \
+            .join(models.Tag, models.Tag.id == models.ExpenseTag.tag_id) \
+            .filter(models.ExpenseTag.expense_id.in_([row[0] for row in rows])) \
+            .order_by(models.Tag.title)
+        for expense_id, title in tag_rows:
+            tags.setdefault(expense_id, []).append(title)
+        return [dict(zip(COLUMNS, (*row, tags.get(row[0], [])))) for row in rows]
+
+    for row in query.yield_per(batch_size):
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            yield with_tags(batch)
+            batch = []
+    if batch:
+        yield with_tags(batch)
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def _encode_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            writer.writerow([
+                ";".join(row[column]) if column == "tags" else _json_value(row[column])
+                for column in COLUMNS
+            ])
+        yield buffer.getvalue()
+
+def _encode_ndjson(batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps({column: _json_value(value) for column, value in row.items()}) + "\n"
+            for row in batch
+        )
+
+def _encode_columnar(batches):
+    # One header line with the column names, then one line per batch holding
+    # a value array per column: keys are sent once per batch, not once per row
+    yield json.dumps({"columns": COLUMNS}) + "\n"
+    for batch in batches:
+        yield json.dumps({
+            column: [_json_value(row[column]) for row in batch]
+            for column in COLUMNS
+        }) + "\n"
+
+ENCODERS = {
+    "csv": _encode_csv,
+    "ndjson": _encode_ndjson,
+    "columnar": _encode_columnar,
+}
+
+def export_expenses(fmt: str = "csv", filters: schemas.ExpenseFilter = None,
+                    sort: str = crud.DEFAULT_EXPENSE_SORT, batch_size: int = DEFAULT_BATCH_SIZE,
+                    project_id: int = None):
+    """Return an iterator of encoded chunks for a StreamingResponse.
+
+    Arguments are validated here, before streaming starts. The iterator owns
+    its own session, scoped to project_id (every project when None), because
+    it keeps running after the request handler returns.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    crud.expense_order_by(sort)
+
+    def generate():
+        db = database.SessionLocal()
+        try:
+            if project_id is not None:
+                projects.scope(db, project_id)
+            query = _expense_rows_query(db, filters, sort)
+            yield from ENCODERS[fmt](_iter_batches(db, query, batch_size))
+        finally:
+            db.close()
+
+    return generate()
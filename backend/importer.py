@@ -0,0 +1,250 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import time
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from . import models, projects, schemas, rollups
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+
+def detect_format(fmt: str = None, content_type: str = None):
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+        return fmt
+    if content_type and "layout=columnar" in content_type:
+        raise ValueError("Columnar exports cannot be imported. Export with format=ndjson instead.")
+    if content_type and ("ndjson" in content_type or "jsonl" in content_type or "json" in content_type):
+        return "ndjson"
+    return "csv"
+
+# --- Parsing ---
+# Both parsers yield (row_number, record) pairs, where record is a dict or the
+# exception raised while parsing that row. Row numbers count data rows from 1.
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    for row_number, row in enumerate(reader, start=1):
+        if None in row:
+            yield row_number, ValueError("Too many fields in row")
+            continue
+        record = {key.strip(): (value.strip() if value is not None else None) for key, value in row.items() if key}
+        tags = record.get("tags")
+        record["tags"] = [tag.strip() for tag in tags.split(";") if tag.strip()] if tags else []
+        yield row_number, record
+
+def parse_ndjson(lines):
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+            continue
+        if not isinstance(record, dict):
+            yield row_number, ValueError("Expected a JSON object")
+            continue
+        yield row_number, record
+
+# --- Reference resolution ---
+class ReferenceLookup:
+    """In-memory title -> id maps for categories, sub-categories, phases and tags."""
+
+    def __init__(self, db: Session):
+        self.categories = {title: id_ for id_, title in db.query(models.Category.id, models.Category.title)}
+        self.category_ids = set(self.categories.values())
+        # Sub-category titles are only unique within their category
+        self.sub_categories = {
+            (category_id, title): id_
+            for id_, category_id, title in db.query(
+                models.SubCategory.id, models.SubCategory.category_id, models.SubCategory.title
+            )
+        }
+        self.sub_category_ids = {id_: category_id for (category_id, _), id_ in self.sub_categories.items()}
+        self.phases = {title: id_ for id_, title in db.query(models.ConstructionPhase.id, models.ConstructionPhase.title)}
+        self.phase_ids = set(self.phases.values())
+        self.tags = {title: id_ for id_, title in db.query(models.Tag.id, models.Tag.title)}
+        self.tag_ids = set(self.tags.values())
+
+    @staticmethod
+    def _resolve(record, key, by_title, ids, label):
+        id_value = record.get(f"{key}_id")
+        if id_value not in (None, ""):
+            id_value = int(id_value)
+            if id_value not in ids:
+                raise ValueError(f"Unknown {label} id {id_value}")
+            return id_value
+        title = record.get(key)
+        if title in (None, ""):
+            return None
+        if title not in by_title:
+            raise ValueError(f"Unknown {label} '{title}'")
+        return by_title[title]
+
+    def resolve(self, record):
+        category_id = self._resolve(record, "category", self.categories, self.category_ids, "category")
+        if category_id is None:
+            raise ValueError("Missing category")
+
+        sub_category_id = record.get("sub_category_id")
+        if sub_category_id not in (None, ""):
+            sub_category_id = int(sub_category_id)
+            if self.sub_category_ids.get(sub_category_id) != category_id:
+                raise ValueError(f"Unknown sub-category id {sub_category_id} for this category")
+        elif record.get("sub_category"):
+            key = (category_id, record["sub_category"])
+            if key not in self.sub_categories:
+                raise ValueError(f"Unknown sub-category '{record['sub_category']}' for this category")
+            sub_category_id = self.sub_categories[key]
+        else:
+            sub_category_id = None
+
+        phase_id = self._resolve(record, "phase", self.phases, self.phase_ids, "phase")
+
+        tag_ids = []
+        for tag in record.get("tags") or []:
+            if isinstance(tag, int):
+                if tag not in self.tag_ids:
+                    raise ValueError(f"Unknown tag id {tag}")
+                tag_ids.append(tag)
+            elif tag in self.tags:
+                tag_ids.append(self.tags[tag])
+            else:
+                raise ValueError(f"Unknown tag '{tag}'")
+
+        data = {
+            "title": record.get("title"),
+            "amount": record.get("amount"),
+            "description": record.get("description") or None,
+            "notes": record.get("notes") or None,
+            "category_id": category_id,
+            "sub_category_id": sub_category_id,
+            "phase_id": phase_id,
+            "tags": list(dict.fromkeys(tag_ids)),
+        }
+        if record.get("purchase_date"):
+            data["purchase_date"] = record["purchase_date"]
+        return schemas.ExpenseCreate(**data)
+
+# --- Insertion ---
+def _insert_batch(db: Session, batch):
+    # Bulk inserts skip the flush hooks that fill in the project
+    project_id = projects.project_for_insert(db)
+    mappings = []
+    for _, expense in batch:
+        mapping = expense.dict(exclude={"tags"})
+        mapping["project_id"] = project_id
+        # Leave blank dates to the column default, as the single-row path does
+        if mapping["purchase_date"] is None:
+            del mapping["purchase_date"]
+        mappings.append(mapping)
+
+    db.bulk_insert_mappings(models.Expense, mappings, return_defaults=True)
+    deltas = {}
+    for mapping in mappings:
+        key = rollups.rollup_key(
+            mapping["project_id"], mapping["category_id"], mapping["sub_category_id"], mapping["phase_id"],
+            mapping.get("purchase_date", datetime.date.today()),
+        )
+        rollups.add_delta(deltas, key, mapping["amount"], 1)
+    rollups.apply_deltas(db, deltas)
+    tag_rows = [
+        {"expense_id": mapping["id"], "tag_id": tag_id}
+        for mapping, (_, expense) in zip(mappings, batch)
+        for tag_id in expense.tags
+    ]
+    if tag_rows:
+        db.execute(models.ExpenseTag.__table__.insert(), tag_rows)
+    db.commit()
+
+def import_expenses(db: Session, records, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Resolve and insert parsed records in batches of one transaction each."""
+    started = time.perf_counter()
+    lookup = ReferenceLookup(db)
+    total_rows = 0
+    imported = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal imported
+        try:
+            _insert_batch(db, batch)
+            imported += len(batch)
+        except SQLAlchemyError as e:
+            db.rollback()
+            message = str(getattr(e, "orig", e))
+            errors.extend({"row": row_number, "error": message} for row_number, _ in batch)
+        batch.clear()
+
+    for row_number, record in records:
+        total_rows += 1
+        if isinstance(record, Exception):
+            errors.append({"row": row_number, "error": str(record)})
+            continue
+        try:
+            batch.append((row_number, lookup.resolve(record)))
+        except ValidationError as e:
+            errors.append({"row": row_number, "error": "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )})
+        except (ValueError, TypeError) as e:
+            errors.append({"row": row_number, "error": str(e)})
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total_rows": total_rows,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(total_rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+def import_file(db: Session, binary_file, fmt: str = "csv", batch_size: int = DEFAULT_BATCH_SIZE):
+    lines = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        records = parse_ndjson(lines) if fmt == "ndjson" else parse_csv(lines)
+        return import_expenses(db, records, batch_size=batch_size)
+    finally:
+        # Don't let the wrapper close the caller's file
+        lines.detach()
+
+if __name__ == "__main__":
+    from . import startup
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk import expenses from a CSV or NDJSON file.")
+    parser.add_argument("path", help="File to import")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--project", type=int, default=projects.DEFAULT_PROJECT_ID,
+                        help="Project to import into; titles are resolved within it")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    startup.prepare_database()
+    db = SessionLocal()
+    try:
+        projects.scope(db, args.project)
+        with open(args.path, "rb") as f:
+            report = import_file(db, f, fmt, batch_size=args.batch_size)
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"Row {error['row']}: {error['error']}")
+    print(f"Imported {report['imported']} of {report['total_rows']} rows "
+          f"({report['failed']} failed) in {report['elapsed_seconds']}s, "
+          f"{report['rows_per_second']} rows/s")
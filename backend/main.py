@@ -1,12 +1,22 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import mimetypes
+import os
+import tempfile
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from . import models, schemas, crud, database
+from typing import List, Optional
+from . import schemas, crud, database, importer, exporter, responses, metrics, startup, cache, blobs, projects, routes
+from .cache import reference_cache
 from fastapi.middleware.cors import CORSMiddleware
 
-models.Base.metadata.create_all(bind=database.engine)
+# backend/serve.py prepares the database once before starting its workers
+if not startup.SKIP_DB_SETUP:
+    startup.prepare_database()
+if cache.SHARED_VERSIONS:
+    reference_cache.share_versions(database.engine)
 
-app = FastAPI(title="BrickByBrick API")
+app = FastAPI(title="BrickByBrick API", default_response_class=responses.DefaultResponse)
 
 # CORS Setup
 app.add_middleware(
@@ -15,11 +25,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
-def get_db():
+def get_db(x_project_id: int = Header(projects.DEFAULT_PROJECT_ID)):
+    """Session scoped to the project named by the X-Project-Id header."""
     db = database.SessionLocal()
     try:
+        projects.scope(db, x_project_id)
         yield db
     finally:
         db.close()
@@ -28,123 +42,114 @@ def get_db():
 def read_root():
     return {"message": "Welcome to BrickByBrick API"}
 
-# --- Categories ---
-@app.post("/categories/", response_model=schemas.Category)
-def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    return crud.create_category(db=db, category=category)
-
-@app.get("/categories/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_categories(db, skip=skip, limit=limit)
-
-@app.put("/categories/{category_id}", response_model=schemas.Category)
-def update_category(category_id: int, category: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    db_category = crud.update_category(db, category_id, category)
-    if db_category is None:
-        raise HTTPException(status_code=404, detail="Category not found")
-    return db_category
-
-@app.delete("/categories/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_category(db, category_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="Category not found")
+# --- Projects ---
+@app.post("/projects/", response_model=schemas.Project)
+def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+    return crud.create_project(db=db, project=project)
+
+@app.get("/projects/", response_model=List[schemas.Project])
+def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return crud.get_projects(db, skip=skip, limit=limit)
+
+@app.put("/projects/{project_id}", response_model=schemas.Project)
+def update_project(project_id: int, project: schemas.ProjectCreate, db: Session = Depends(get_db)):
+    db_project = crud.update_project(db, project_id, project)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_project
+
+@app.delete("/projects/{project_id}")
+def delete_project(project_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_project(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
     return {"ok": True}
 
-# --- SubCategories ---
-@app.post("/sub_categories/", response_model=schemas.SubCategory)
-def create_sub_category(sub_category: schemas.SubCategoryCreate, db: Session = Depends(get_db)):
-    return crud.create_sub_category(db=db, sub_category=sub_category)
-
-@app.get("/sub_categories/", response_model=List[schemas.SubCategory])
-def read_sub_categories(category_id: int = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_sub_categories(db, category_id=category_id, skip=skip, limit=limit)
-
-@app.put("/sub_categories/{sub_category_id}", response_model=schemas.SubCategory)
-def update_sub_category(sub_category_id: int, sub_category: schemas.SubCategoryCreate, db: Session = Depends(get_db)):
-    db_sub = crud.update_sub_category(db, sub_category_id, sub_category)
-    if db_sub is None:
-        raise HTTPException(status_code=404, detail="SubCategory not found")
-    return db_sub
-
-@app.delete("/sub_categories/{sub_category_id}")
-def delete_sub_category(sub_category_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_sub_category(db, sub_category_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="SubCategory not found")
-    return {"ok": True}
-
-# --- Phases ---
-@app.post("/phases/", response_model=schemas.ConstructionPhase)
-def create_phase(phase: schemas.ConstructionPhaseCreate, db: Session = Depends(get_db)):
-    return crud.create_phase(db=db, phase=phase)
-
-@app.get("/phases/", response_model=List[schemas.ConstructionPhase])
-def read_phases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_phases(db, skip=skip, limit=limit)
-
-@app.put("/phases/{phase_id}", response_model=schemas.ConstructionPhase)
-def update_phase(phase_id: int, phase: schemas.ConstructionPhaseCreate, db: Session = Depends(get_db)):
-    db_phase = crud.update_phase(db, phase_id, phase)
-    if db_phase is None:
-        raise HTTPException(status_code=404, detail="Phase not found")
-    return db_phase
-
-@app.delete("/phases/{phase_id}")
-def delete_phase(phase_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_phase(db, phase_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="Phase not found")
-    return {"ok": True}
-
-
-
-# --- Tags ---
-@app.post("/tags/", response_model=schemas.Tag)
-def create_tag(tag: schemas.TagCreate, db: Session = Depends(get_db)):
-    return crud.create_tag(db=db, tag=tag)
-
-@app.get("/tags/", response_model=List[schemas.Tag])
-def read_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_tags(db, skip=skip, limit=limit)
-
-@app.put("/tags/{tag_id}", response_model=schemas.Tag)
-def update_tag(tag_id: int, tag: schemas.TagCreate, db: Session = Depends(get_db)):
-    db_tag = crud.update_tag(db, tag_id, tag)
-    if db_tag is None:
-        raise HTTPException(status_code=404, detail="Tag not found")
-    return db_tag
-
-@app.delete("/tags/{tag_id}")
-def delete_tag(tag_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_tag(db, tag_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="Tag not found")
-    return {"ok": True}
+# Reference data, expenses, sync, batch and reports (shared with async_main.py)
+app.include_router(routes.build_router(get_db, routes.ThreadPoolCalls))
 
 # --- Expenses ---
-@app.post("/expenses/", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
-    return crud.create_expense(db=db, expense=expense)
-
-@app.get("/expenses/", response_model=List[schemas.Expense])
-def read_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_expenses(db, skip=skip, limit=limit)
-
-@app.put("/expenses/{expense_id}", response_model=schemas.Expense)
-def update_expense(expense_id: int, expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
-    db_expense = crud.update_expense(db, expense_id, expense)
-    if db_expense is None:
+@app.post("/expenses/bulk", response_model=schemas.BulkImportReport)
+async def bulk_import_expenses(request: Request, format: Optional[str] = None, batch_size: int = importer.DEFAULT_BATCH_SIZE, db: Session = Depends(get_db)):
+    """Import a CSV or NDJSON request body; titles are resolved to IDs."""
+    try:
+        fmt = importer.detect_format(format, request.headers.get("content-type"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    # Spool the body so large uploads go to disk instead of memory
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(importer.import_file, db, spool, fmt, batch_size)
+
+@app.get("/expenses/export")
+def export_expenses(format: str = "csv", sort: str = crud.DEFAULT_EXPENSE_SORT, filters: schemas.ExpenseFilter = Depends(routes.expense_filters),
+                    db: Session = Depends(get_db)):
+    """Stream every matching expense; memory use does not depend on the row count.
+
+    format=columnar is sent as expenses.columnar.ndjson with the media type
+    application/x-ndjson; layout=columnar, since its lines hold column arrays
+    rather than rows.
+    """
+    try:
+        chunks = exporter.export_expenses(format, filters=filters, sort=sort, project_id=projects.current(db))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=exporter.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="expenses.{exporter.FILE_EXTENSIONS[format]}"'},
+    )
+
+# --- Attachments ---
+@app.post("/expenses/{expense_id}/attachments", response_model=schemas.Attachment)
+async def upload_attachment(expense_id: int, request: Request, filename: str = Query("attachment", min_length=1),
+                            db: Session = Depends(get_db)):
+    """Store the raw request body as an attachment; identical files are stored once."""
+    if not await run_in_threadpool(crud.expense_exists, db, expense_id):
         raise HTTPException(status_code=404, detail="Expense not found")
-    return db_expense
-
-@app.delete("/expenses/{expense_id}")
-def delete_expense(expense_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_expense(db, expense_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="Expense not found")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > blobs.MAX_ATTACHMENT_BYTES:
+        raise HTTPException(status_code=413, detail="Attachment too large")
+    content_type = request.headers.get("content-type") or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    with blobs.blob_store.writer() as blob:
+        try:
+            async for chunk in request.stream():
+                blob.write(chunk)
+        except blobs.BlobTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        sha256 = blob.commit()
+    return await run_in_threadpool(crud.create_attachment, db, expense_id, os.path.basename(filename),
+                                   content_type, blob.size, sha256)
+
+@app.get("/expenses/{expense_id}/attachments", response_model=List[schemas.Attachment])
+def read_attachments(expense_id: int, db: Session = Depends(get_db)):
+    if not crud.expense_exists(db, expense_id):
+        raise HTTPException(status_code=404, detail="Expense not found")
+    return crud.get_attachments(db, expense_id)
+
+@app.api_route("/attachments/{attachment_id}", methods=["GET", "HEAD"])
+def download_attachment(attachment_id: int, request: Request, db: Session = Depends(get_db)):
+    """Stream the file; supports Range requests for partial downloads."""
+    attachment = crud.get_attachment(db, attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return blobs.blob_response(request, attachment.sha256, attachment.size, attachment.content_type, attachment.filename)
+
+@app.delete("/attachments/{attachment_id}")
+def delete_attachment(attachment_id: int, db: Session = Depends(get_db)):
+    if not crud.delete_attachment(db, attachment_id):
+        raise HTTPException(status_code=404, detail="Attachment not found")
     return {"ok": True}
 
+# --- Metrics ---
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Prometheus text format: per-route latency and SQL statement histograms."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
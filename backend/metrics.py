@@ -0,0 +1,190 @@
+"""Request and SQL instrumentation, exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware times every request per route template and counts the SQL
+statements it ran; the statement timings come from cursor events on the
+engines (see instrument_engine). Set BRICKBYBRICK_SLOW_QUERY_MS to log every
+statement slower than that many milliseconds.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+
+SLOW_QUERY_MS = os.getenv("BRICKBYBRICK_SLOW_QUERY_MS")
+SLOW_QUERY_SECONDS = float(SLOW_QUERY_MS) / 1000 if SLOW_QUERY_MS not in (None, "") else None
+
+slow_query_logger = logging.getLogger("brickbybrick.slow_query")
+
+# Monotonic clock for all timings; tests replace it
+_clock = time.perf_counter
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value: float, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self, labels=()):
+        """Return (sum, count) of the observations for one label set."""
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[1], series[2]) if series else (0.0, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            pairs = list(zip(self.labelnames, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(pairs + [('le', _number(bound))])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(pairs + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(list(zip(self.labelnames, labels)))} {_number(value)}")
+        return lines
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+REQUEST_LABELS = ("method", "route")
+
+requests_total = Counter(
+    "brickbybrick_http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+request_duration = Histogram(
+    "brickbybrick_http_request_duration_seconds", "HTTP request latency by route.", LATENCY_BUCKETS, REQUEST_LABELS)
+request_sql_statements = Histogram(
+    "brickbybrick_http_request_sql_statements", "SQL statements executed per request.", STATEMENT_BUCKETS, REQUEST_LABELS)
+request_sql_duration = Histogram(
+    "brickbybrick_http_request_sql_duration_seconds", "Total SQL time per request.", LATENCY_BUCKETS, REQUEST_LABELS)
+sql_duration = Histogram(
+    "brickbybrick_sql_statement_duration_seconds", "Duration of individual SQL statements.", LATENCY_BUCKETS)
+slow_queries_total = Counter(
+    "brickbybrick_sql_slow_statements_total", "SQL statements slower than BRICKBYBRICK_SLOW_QUERY_MS.")
+
+METRICS = (requests_total, request_duration, request_sql_statements, request_sql_duration, sql_duration, slow_queries_total)
+
+# --- SQL statement tracking ---
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+# Holds a mutable RequestStats so sync handlers in the threadpool, which run
+# on a copy of the request's context, still update the same object.
+current_request = contextvars.ContextVar("brickbybrick_request_stats", default=None)
+
+# The start time lives on the statement's execution context rather than on the
+# connection: a statement that raises never reaches after_cursor_execute, and
+# its context is simply dropped instead of leaving a start time behind.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = _clock()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = _clock() - context._query_start
+    sql_duration.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    if SLOW_QUERY_SECONDS is not None and elapsed >= SLOW_QUERY_SECONDS:
+        slow_queries_total.inc()
+        slow_query_logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split()))
+
+def instrument_engine(sync_engine):
+    """Time every statement run on the engine (pass async_engine.sync_engine for async engines)."""
+    from sqlalchemy import event
+
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- Middleware ---
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed until the last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = _clock()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = _clock() - started
+            current_request.reset(token)
+            # Label by route template (/expenses/{expense_id}) to keep the series count bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = (scope["method"], route)
+            requests_total.inc((scope["method"], route, str(status)))
+            request_duration.observe(elapsed, labels)
+            request_sql_statements.observe(stats.statements, labels)
+            request_sql_duration.observe(stats.sql_seconds, labels)
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,20 +1,81 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, Text
-from sqlalchemy.orm import relationship
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, Date, DateTime, Text, Index, UniqueConstraint
+from sqlalchemy.orm import declared_attr, relationship
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 import datetime
 
-class Category(Base):
-    __tablename__ = "categories"
+CENT = Decimal("0.01")
+
+def to_cents(value):
+    """Round a currency amount half-up to whole cents."""
+    return int((Decimal(str(value)) / CENT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+class Money(TypeDecorator):
+    """Currency amount stored as integer cents.
+
+    Python and the API keep working in currency units; values are rounded to
+    cents when bound and divided back on load, so SUMs run exactly on integers
+    in the database.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        # Postgres returns SUM/AVG of bigint as Decimal; callers mix results with floats
+        return None if value is None else float(value) / 100
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def _change_token(context):
+    from .sync import transaction_token
+    return transaction_token(context.connection)
+
+class SyncedMixin:
+    """Change tracking for GET /sync: every INSERT or UPDATE, ORM or Core,
+    stamps the row with the change token of its transaction."""
+    updated_at = Column(DateTime, nullable=True, default=utcnow, onupdate=utcnow)
+    change_seq = Column(BigInteger, nullable=True, index=True, default=_change_token, onupdate=_change_token)
+
+class Project(Base):
+    """A construction project; every ProjectScoped row belongs to exactly one."""
+    __tablename__ = "projects"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, unique=True, index=True, nullable=False)
     description = Column(String, nullable=True)
 
+class ProjectScoped:
+    """Rows of one project; queries and inserts are scoped in backend/projects.py.
+
+    Each table indexes project_id first, so one project's queries never scan
+    the rows of the others.
+    """
+    @declared_attr
+    def project_id(cls):
+        return Column(Integer, ForeignKey("projects.id"), nullable=False)
+
+class Category(ProjectScoped, SyncedMixin, Base):
+    __tablename__ = "categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    budget = Column("budget_cents", Money, key="budget", nullable=True)
+
     # Relationships
     sub_categories = relationship("SubCategory", back_populates="category", cascade="all, delete-orphan")
     expenses = relationship("Expense", back_populates="category")
 
-class SubCategory(Base):
+    __table_args__ = (
+        Index("uq_categories_project_title", "project_id", "title", unique=True),
+    )
+
+class SubCategory(ProjectScoped, SyncedMixin, Base):
     __tablename__ = "sub_categories"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -26,22 +87,31 @@ class SubCategory(Base):
     category = relationship("Category", back_populates="sub_categories")
     expenses = relationship("Expense", back_populates="sub_category")
 
-class ConstructionPhase(Base):
+    __table_args__ = (
+        Index("ix_sub_categories_project_category", "project_id", "category_id"),
+    )
+
+class ConstructionPhase(ProjectScoped, SyncedMixin, Base):
     __tablename__ = "construction_phases"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, unique=True, index=True, nullable=False)
+    title = Column(String, nullable=False)
     description = Column(String, nullable=True)
+    budget = Column("budget_cents", Money, key="budget", nullable=True)
 
     # Relationships
     expenses = relationship("Expense", back_populates="phase")
 
-class Expense(Base):
+    __table_args__ = (
+        Index("uq_construction_phases_project_title", "project_id", "title", unique=True),
+    )
+
+class Expense(ProjectScoped, SyncedMixin, Base):
     __tablename__ = "expenses"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column("amount_cents", Money, key="amount", nullable=False)
     description = Column(String, nullable=True)
     creation_date = Column(Date, default=datetime.date.today)
     purchase_date = Column(Date, default=datetime.date.today)
@@ -57,6 +127,19 @@ class Expense(Base):
     sub_category = relationship("SubCategory", back_populates="expenses")
     phase = relationship("ConstructionPhase", back_populates="expenses")
     tags = relationship("Tag", secondary="expense_tags", back_populates="expenses")
+    attachments = relationship("Attachment", back_populates="expense", cascade="all, delete-orphan")
+
+    # Composite indexes for keyset pagination on (project, sort column, id)
+    # and for the equality filters combined with the default purchase_date
+    # ordering (category / sub-category / phase IDs already imply the project)
+    __table_args__ = (
+        Index("ix_expenses_project_purchase_date", "project_id", "purchase_date", "id"),
+        Index("ix_expenses_project_amount", "project_id", "amount", "id"),
+        Index("ix_expenses_project_title", "project_id", "title", "id"),
+        Index("ix_expenses_category_purchase_date", "category_id", "purchase_date", "id"),
+        Index("ix_expenses_sub_category_purchase_date", "sub_category_id", "purchase_date", "id"),
+        Index("ix_expenses_phase_purchase_date", "phase_id", "purchase_date", "id"),
+    )
 
 # Association Table
 class ExpenseTag(Base):
@@ -64,11 +147,85 @@ class ExpenseTag(Base):
     expense_id = Column(Integer, ForeignKey("expenses.id"), primary_key=True)
     tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
 
-class Tag(Base):
+    # The primary key covers lookups by expense; this one covers lookups by tag
+    __table_args__ = (
+        Index("ix_expense_tags_tag_expense", "tag_id", "expense_id"),
+    )
+
+class Tag(ProjectScoped, SyncedMixin, Base):
     __tablename__ = "tags"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, unique=True, index=True, nullable=False)
+    title = Column(String, nullable=False)
 
     # Relationships
     expenses = relationship("Expense", secondary="expense_tags", back_populates="tags")
+
+    __table_args__ = (
+        Index("uq_tags_project_title", "project_id", "title", unique=True),
+    )
+
+class Attachment(ProjectScoped, Base):
+    """File metadata; the bytes live in the blob store (backend/blobs.py) under sha256."""
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    expense_id = Column(Integer, ForeignKey("expenses.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+
+    expense = relationship("Expense", back_populates="attachments")
+
+class ExpenseRollup(ProjectScoped, Base):
+    """Running totals per (project, category, sub-category, phase, month), kept in step
+    with expense writes so reports read O(groups) rows instead of all expenses.
+
+    The key columns are NOT NULL so the unique constraint can back an upsert:
+    0 stands for "no sub-category" / "no phase" and "" for "no purchase date".
+    """
+    __tablename__ = "expense_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    category_id = Column(Integer, nullable=False)
+    sub_category_id = Column(Integer, nullable=False, default=0)
+    phase_id = Column(Integer, nullable=False, default=0)
+    month = Column(String(7), nullable=False, default="")
+    total = Column("total_cents", Money, key="total", nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("project_id", "category_id", "sub_category_id", "phase_id", "month",
+                         name="uq_expense_rollups_key"),
+        Index("ix_expense_rollups_project_month", "project_id", "month"),
+    )
+
+class ReferenceVersion(Base):
+    """Cache version per reference namespace, shared by all worker processes."""
+    __tablename__ = "reference_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SyncState(Base):
+    """Single-row counter handing out the change tokens used by GET /sync."""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    token = Column(BigInteger, nullable=False)
+
+class Tombstone(ProjectScoped, Base):
+    """A deleted synced row, kept so /sync can tell clients to drop it."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_project_change_seq", "project_id", "change_seq"),
+    )
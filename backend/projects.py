@@ -0,0 +1,72 @@
+"""Project tenancy.
+
+Every table with a project_id (models.ProjectScoped) belongs to one project.
+A session is bound to a project with scope(); from then on
+
+- ORM queries, bulk updates and deletes only see that project's rows
+  (with_loader_criteria, added in the do_orm_execute hook below),
+- objects added to the session get its project_id on flush.
+
+Statements on Table objects and raw SQL bypass the ORM: their callers filter
+on, and insert, current(db) themselves. Unscoped sessions (startup, CLI
+tools) see every project and create rows in the default project.
+
+The API picks the project from the X-Project-Id header, defaulting to the
+project that databases from before projects were migrated into.
+"""
+from fastapi import HTTPException
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, with_loader_criteria
+from . import models
+from .cache import reference_cache
+
+DEFAULT_PROJECT_ID = 1
+DEFAULT_PROJECT_TITLE = "Default project"
+
+PROJECT_KEY = "brickbybrick_project_id"
+
+def current(db: Session):
+    """The project the session is scoped to, or None when unscoped."""
+    return db.info.get(PROJECT_KEY)
+
+def project_for_insert(db: Session):
+    return current(db) or DEFAULT_PROJECT_ID
+
+# Project IDs are checked on every request; cache them until a project write
+_known_ids = (None, frozenset())
+
+def _project_ids(db: Session):
+    global _known_ids
+    version = reference_cache.version("projects")
+    if _known_ids[0] != version:
+        _known_ids = (version, frozenset(db.scalars(select(models.Project.id))))
+    return _known_ids[1]
+
+def scope(db: Session, project_id: int):
+    """Bind the session to an existing project; 404 for unknown IDs."""
+    if project_id not in _project_ids(db):
+        raise HTTPException(status_code=404, detail="Project not found")
+    db.info[PROJECT_KEY] = project_id
+
+def ensure_default(engine):
+    """Create the default project, which owns rows from before projects existed."""
+    table = models.Project.__table__
+    with engine.begin() as conn:
+        if conn.execute(select(table.c.id).where(table.c.id == DEFAULT_PROJECT_ID)).first() is None:
+            conn.execute(insert(table).values(id=DEFAULT_PROJECT_ID, title=DEFAULT_PROJECT_TITLE))
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_statement(execute_state):
+    project_id = current(execute_state.session)
+    if project_id is None or execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        execute_state.statement = execute_state.statement.options(with_loader_criteria(
+            models.ProjectScoped, lambda cls: cls.project_id == project_id, include_aliases=True,
+        ))
+
+@event.listens_for(Session, "before_flush")
+def _assign_project(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, models.ProjectScoped) and obj.project_id is None:
+            obj.project_id = project_for_insert(session)
@@ -0,0 +1,27 @@
+"""Opt-in fast JSON responses, enabled with BRICKBYBRICK_FAST_JSON=1.
+
+When enabled, responses are rendered with orjson, and the expense list routes
+return rows assembled straight from SQL result tuples (crud.get_expense_rows,
+crud.get_expenses_compact) without ORM hydration or response_model validation.
+"""
+import os
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON = os.getenv("BRICKBYBRICK_FAST_JSON") == "1"
+
+if FAST_JSON and orjson is None:
+    print("WARNING: BRICKBYBRICK_FAST_JSON=1 requires orjson (pip install orjson). Using the default JSON path.")
+    FAST_JSON = False
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+DefaultResponse = FastJSONResponse if FAST_JSON else JSONResponse
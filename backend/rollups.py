@@ -0,0 +1,164 @@
+"""Incremental maintenance of the expense_rollups table.
+
+Writers collect (amount, count) deltas per rollup key and apply them with an
+atomic upsert in the same transaction as the expense change. rebuild()
+recomputes the table from scratch for repair:
+
+    python -m backend.rollups rebuild
+"""
+import argparse
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from . import models, projects
+from .cache import reference_cache
+
+# Every expense write goes through apply_deltas or rebuild, so they also flag
+# the session; caches derived from expenses (the forecast, the taxonomy
+# counts) are invalidated once that transaction commits.
+EXPENSES_CHANGED = "brickbybrick_expenses_changed"
+
+def _mark_expenses_changed(db: Session):
+    db.info[EXPENSES_CHANGED] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_expense_caches(session):
+    if session.info.pop(EXPENSES_CHANGED, False):
+        reference_cache.bump("forecast", "taxonomy")
+
+@event.listens_for(Session, "after_rollback")
+def _forget_expense_changes(session):
+    session.info.pop(EXPENSES_CHANGED, None)
+
+# Rows are kept per project. A key starts with the expense row's project_id
+# rather than the session's, so unscoped sessions (CLI tools) file every
+# expense under its own project.
+KEY_COLUMNS = ("project_id", "category_id", "sub_category_id", "phase_id", "month")
+
+def month_key(value):
+    return value.strftime("%Y-%m") if value else ""
+
+def rollup_key(project_id, category_id, sub_category_id, phase_id, purchase_date):
+    return (project_id, category_id, sub_category_id or 0, phase_id or 0, month_key(purchase_date))
+
+def expense_key(expense):
+    return rollup_key(expense.project_id, expense.category_id, expense.sub_category_id, expense.phase_id, expense.purchase_date)
+
+def add_delta(deltas: dict, key, amount: float, count: int):
+    current = deltas.get(key, (0.0, 0))
+    deltas[key] = (current[0] + amount, current[1] + count)
+
+def _upsert(db: Session, rows):
+    table = models.ExpenseRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        key_filter = [table.c[column] == row[column] for column in KEY_COLUMNS]
+        result = db.execute(
+            table.update().where(*key_filter)
+            .values(total=table.c.total + row["total"], count=table.c.count + row["count"])
+        )
+        if result.rowcount == 0:
+            db.execute(table.insert().values(**row))
+
+def apply_deltas(db: Session, deltas: dict):
+    """Add the collected deltas to the rollup table; the caller commits."""
+    if not deltas:
+        return
+    # Flag even when the deltas cancel out: a tag-only edit still changes tag counts
+    _mark_expenses_changed(db)
+    rows = [
+        dict(zip(KEY_COLUMNS, key), total=amount, count=count)
+        for key, (amount, count) in deltas.items()
+        if count or amount
+    ]
+    if not rows:
+        return
+    _upsert(db, rows)
+    emptied = {row["project_id"] for row in rows if row["count"] < 0}
+    if emptied:
+        table = models.ExpenseRollup.__table__
+        db.execute(table.delete().where(table.c.project_id.in_(emptied), table.c.count <= 0))
+
+def reassign(db: Session, column: str, source_id: int, target_id: int):
+    """Move the totals of one category / sub-category / phase onto another."""
+    rollup = models.ExpenseRollup
+    index = KEY_COLUMNS.index(column)
+    deltas = {}
+    rows = db.query(rollup.project_id, rollup.category_id, rollup.sub_category_id, rollup.phase_id, rollup.month, rollup.total, rollup.count) \
+        .filter(getattr(rollup, column) == source_id)
+    for *key, total, count in rows:
+        add_delta(deltas, tuple(key), -total, -count)
+        key[index] = target_id
+        add_delta(deltas, tuple(key), total, count)
+    apply_deltas(db, deltas)
+
+def _month_expr(db: Session):
+    column = models.Expense.purchase_date
+    if db.get_bind().dialect.name == "postgresql":
+        return func.coalesce(func.to_char(column, "YYYY-MM"), "")
+    return func.coalesce(func.strftime("%Y-%m", column), "")
+
+def rebuild(db: Session):
+    """Recompute the rollup rows from the expenses table: those of the session's
+    project, or of every project when the session is unscoped."""
+    table = models.ExpenseRollup.__table__
+    month = _month_expr(db)
+    sub_category_id = func.coalesce(models.Expense.sub_category_id, 0)
+    phase_id = func.coalesce(models.Expense.phase_id, 0)
+    totals = select(
+        models.Expense.project_id,
+        models.Expense.category_id,
+        sub_category_id,
+        phase_id,
+        month,
+        func.sum(models.Expense.amount),
+        func.count(models.Expense.id),
+    ).group_by(models.Expense.project_id, models.Expense.category_id, sub_category_id, phase_id, month)
+
+    stale = table.delete()
+    project_id = projects.current(db)
+    if project_id is not None:
+        # INSERT ... SELECT is a Core statement, so the project scope does not reach the SELECT
+        totals = totals.where(models.Expense.project_id == project_id)
+        stale = stale.where(table.c.project_id == project_id)
+    db.execute(stale)
+    db.execute(table.insert().from_select([*KEY_COLUMNS, "total", "count"], totals))
+    _mark_expenses_changed(db)
+    db.commit()
+
+def ensure_built(db: Session):
+    """Populate the rollups once for databases that predate the table."""
+    has_rollups = db.query(models.ExpenseRollup.id).first() is not None
+    if not has_rollups and db.query(models.Expense.id).first() is not None:
+        rebuild(db)
+
+if __name__ == "__main__":
+    from . import startup
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the expense rollup table.")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    startup.prepare_database()
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        print(f"Rebuilt {db.query(models.ExpenseRollup).count()} rollup rows.")
+    finally:
+        db.close()
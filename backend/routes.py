@@ -0,0 +1,272 @@
+"""Routes shared by the sync (main.py) and async (async_main.py) apps.
+
+build_router() defines every handler once as `async def`. The handlers name
+the sync crud function to call, and a calls object decides how to run it:
+
+- ThreadPoolCalls runs it on the thread pool against a Session, as FastAPI
+  does for `def` routes,
+- AsyncSessionCalls awaits its async_crud variant on an AsyncSession.
+
+Both convert ORM results to the read schemas before returning, so no lazy
+load runs on the event loop.
+"""
+import functools
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from . import async_crud, batch, crud, projects, responses, schemas
+from .cache import cached_json_response, cached_json_response_async
+
+class ThreadPoolCalls:
+    @staticmethod
+    async def run(fn, db, *args, **kwargs):
+        return await run_in_threadpool(async_crud.call_as_schema, fn, db, *args, **kwargs)
+
+    @staticmethod
+    async def cached(request: Request, name: str, key, schema_type, load, variant: str = None, scope=None):
+        return await run_in_threadpool(cached_json_response, request, name, key, schema_type, load, variant, scope)
+
+class AsyncSessionCalls:
+    @staticmethod
+    async def run(fn, db, *args, **kwargs):
+        return await async_crud.variant_of(fn)(db, *args, **kwargs)
+
+    @staticmethod
+    async def cached(request: Request, name: str, key, schema_type, load, variant: str = None, scope=None):
+        return await cached_json_response_async(
+            request, name, key, schema_type,
+            lambda: AsyncSessionCalls.run(load.func, *load.args, **load.keywords), variant, scope,
+        )
+
+def expense_filters(
+    category_id: Optional[int] = None,
+    sub_category_id: Optional[int] = None,
+    phase_id: Optional[int] = None,
+    tags: List[int] = Query([]),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    q: Optional[str] = None,
+):
+    return schemas.ExpenseFilter(
+        category_id=category_id, sub_category_id=sub_category_id, phase_id=phase_id, tags=tags,
+        start_date=start_date, end_date=end_date, min_amount=min_amount, max_amount=max_amount, q=q,
+    )
+
+def build_router(get_db, calls) -> APIRouter:
+    """The reference data, expense, sync, batch and report routes on sessions from get_db."""
+    router = APIRouter()
+    run, cached = calls.run, calls.cached
+
+    # --- Categories ---
+    @router.post("/categories/", response_model=schemas.Category)
+    async def create_category(category: schemas.CategoryCreate, db=Depends(get_db)):
+        return await run(crud.create_category, db, category=category)
+
+    @router.get("/categories/", response_model=List[schemas.Category])
+    async def read_categories(request: Request, skip: int = 0, limit: int = 100, db=Depends(get_db)):
+        return await cached(request, "categories", (skip, limit), List[schemas.Category],
+                            functools.partial(crud.get_categories, db, skip=skip, limit=limit),
+                            scope=projects.current(db))
+
+    @router.put("/categories/{category_id}", response_model=schemas.Category)
+    async def update_category(category_id: int, category: schemas.CategoryCreate, db=Depends(get_db)):
+        db_category = await run(crud.update_category, db, category_id, category)
+        if db_category is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return db_category
+
+    @router.delete("/categories/{category_id}")
+    async def delete_category(category_id: int, reassign_to: Optional[int] = None, db=Depends(get_db)):
+        success = await run(crud.delete_category, db, category_id, reassign_to=reassign_to)
+        if not success:
+             raise HTTPException(status_code=404, detail="Category not found")
+        return {"ok": True}
+
+    # --- SubCategories ---
+    @router.post("/sub_categories/", response_model=schemas.SubCategory)
+    async def create_sub_category(sub_category: schemas.SubCategoryCreate, db=Depends(get_db)):
+        return await run(crud.create_sub_category, db, sub_category=sub_category)
+
+    @router.get("/sub_categories/", response_model=List[schemas.SubCategory])
+    async def read_sub_categories(request: Request, category_id: int = None, skip: int = 0, limit: int = 100,
+                                  db=Depends(get_db)):
+        return await cached(request, "sub_categories", (category_id, skip, limit), List[schemas.SubCategory],
+                            functools.partial(crud.get_sub_categories, db, category_id=category_id, skip=skip, limit=limit),
+                            scope=projects.current(db))
+
+    @router.put("/sub_categories/{sub_category_id}", response_model=schemas.SubCategory)
+    async def update_sub_category(sub_category_id: int, sub_category: schemas.SubCategoryCreate, db=Depends(get_db)):
+        db_sub = await run(crud.update_sub_category, db, sub_category_id, sub_category)
+        if db_sub is None:
+            raise HTTPException(status_code=404, detail="SubCategory not found")
+        return db_sub
+
+    @router.delete("/sub_categories/{sub_category_id}")
+    async def delete_sub_category(sub_category_id: int, reassign_to: Optional[int] = None, db=Depends(get_db)):
+        success = await run(crud.delete_sub_category, db, sub_category_id, reassign_to=reassign_to)
+        if not success:
+             raise HTTPException(status_code=404, detail="SubCategory not found")
+        return {"ok": True}
+
+    # --- Phases ---
+    @router.post("/phases/", response_model=schemas.ConstructionPhase)
+    async def create_phase(phase: schemas.ConstructionPhaseCreate, db=Depends(get_db)):
+        return await run(crud.create_phase, db, phase=phase)
+
+    @router.get("/phases/", response_model=List[schemas.ConstructionPhase])
+    async def read_phases(request: Request, skip: int = 0, limit: int = 100, db=Depends(get_db)):
+        return await cached(request, "phases", (skip, limit), List[schemas.ConstructionPhase],
+                            functools.partial(crud.get_phases, db, skip=skip, limit=limit),
+                            scope=projects.current(db))
+
+    @router.put("/phases/{phase_id}", response_model=schemas.ConstructionPhase)
+    async def update_phase(phase_id: int, phase: schemas.ConstructionPhaseCreate, db=Depends(get_db)):
+        db_phase = await run(crud.update_phase, db, phase_id, phase)
+        if db_phase is None:
+            raise HTTPException(status_code=404, detail="Phase not found")
+        return db_phase
+
+    @router.delete("/phases/{phase_id}")
+    async def delete_phase(phase_id: int, reassign_to: Optional[int] = None, db=Depends(get_db)):
+        success = await run(crud.delete_phase, db, phase_id, reassign_to=reassign_to)
+        if not success:
+             raise HTTPException(status_code=404, detail="Phase not found")
+        return {"ok": True}
+
+    # --- Tags ---
+    @router.post("/tags/", response_model=schemas.Tag)
+    async def create_tag(tag: schemas.TagCreate, db=Depends(get_db)):
+        return await run(crud.create_tag, db, tag=tag)
+
+    @router.get("/tags/", response_model=List[schemas.Tag])
+    async def read_tags(request: Request, skip: int = 0, limit: int = 100, db=Depends(get_db)):
+        return await cached(request, "tags", (skip, limit), List[schemas.Tag],
+                            functools.partial(crud.get_tags, db, skip=skip, limit=limit),
+                            scope=projects.current(db))
+
+    @router.put("/tags/{tag_id}", response_model=schemas.Tag)
+    async def update_tag(tag_id: int, tag: schemas.TagCreate, db=Depends(get_db)):
+        db_tag = await run(crud.update_tag, db, tag_id, tag)
+        if db_tag is None:
+            raise HTTPException(status_code=404, detail="Tag not found")
+        return db_tag
+
+    @router.delete("/tags/{tag_id}")
+    async def delete_tag(tag_id: int, reassign_to: Optional[int] = None, db=Depends(get_db)):
+        success = await run(crud.delete_tag, db, tag_id, reassign_to=reassign_to)
+        if not success:
+             raise HTTPException(status_code=404, detail="Tag not found")
+        return {"ok": True}
+
+    # --- Taxonomy ---
+    @router.get("/taxonomy", response_model=schemas.Taxonomy)
+    async def read_taxonomy(request: Request, db=Depends(get_db)):
+        """Categories, sub-categories, phases and tags with expense counts and totals; cached until the next write."""
+        return await cached(request, "taxonomy", "taxonomy", schemas.Taxonomy,
+                            functools.partial(crud.get_taxonomy, db), scope=projects.current(db))
+
+    # --- Expenses ---
+    @router.post("/expenses/", response_model=schemas.Expense)
+    async def create_expense(expense: schemas.ExpenseCreate, db=Depends(get_db)):
+        return await run(crud.create_expense, db, expense=expense)
+
+    @router.get("/expenses/", response_model=List[schemas.Expense])
+    async def read_expenses(
+        response: Response,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sort: str = crud.DEFAULT_EXPENSE_SORT,
+        filters: schemas.ExpenseFilter = Depends(expense_filters),
+        db=Depends(get_db),
+    ):
+        if responses.FAST_JSON:
+            rows = await run(crud.get_expense_rows, db, skip=skip, limit=limit, filters=filters, sort=sort, cursor=cursor)
+            next_cursor = crud.encode_expense_cursor(rows[-1], sort) if rows and len(rows) == limit else None
+            return responses.FastJSONResponse(rows, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+        expenses = await run(crud.get_expenses, db, skip=skip, limit=limit, filters=filters, sort=sort, cursor=cursor)
+        # A full page means there may be more; pass the cursor for the next one
+        if expenses and len(expenses) == limit:
+            response.headers["X-Next-Cursor"] = crud.encode_expense_cursor(expenses[-1], sort)
+        return expenses
+
+    @router.get("/expenses/compact", response_model=schemas.ExpenseListCompact)
+    async def read_expenses_compact(
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sort: str = crud.DEFAULT_EXPENSE_SORT,
+        filters: schemas.ExpenseFilter = Depends(expense_filters),
+        db=Depends(get_db),
+    ):
+        """Same page as /expenses/, with referenced entities side-loaded once."""
+        page = await run(crud.get_expenses_compact, db, skip=skip, limit=limit, filters=filters, sort=sort, cursor=cursor)
+        if responses.FAST_JSON:
+            return responses.FastJSONResponse(page)
+        return page
+
+    @router.get("/sync", response_model=schemas.SyncChanges)
+    async def sync_changes(since: int = Query(0, ge=0), db=Depends(get_db)):
+        """Rows changed or deleted after the change token `since`; 0 fetches everything.
+
+        Pass the returned token as `since` on the next call.
+        """
+        changes = await run(crud.get_changes, db, since=since)
+        if responses.FAST_JSON:
+            return responses.FastJSONResponse(changes)
+        return changes
+
+    @router.get("/expenses/search", response_model=List[schemas.ExpenseSearchHit])
+    async def search_expenses(q: str = Query(..., min_length=1), skip: int = 0, limit: int = 20, db=Depends(get_db)):
+        """Full-text search over title, description, notes and tag titles; words match as prefixes."""
+        return await run(crud.search_expenses, db, q, skip=skip, limit=limit)
+
+    @router.put("/expenses/{expense_id}", response_model=schemas.Expense)
+    async def update_expense(expense_id: int, expense: schemas.ExpenseCreate, db=Depends(get_db)):
+        db_expense = await run(crud.update_expense, db, expense_id, expense)
+        if db_expense is None:
+            raise HTTPException(status_code=404, detail="Expense not found")
+        return db_expense
+
+    @router.delete("/expenses/{expense_id}")
+    async def delete_expense(expense_id: int, db=Depends(get_db)):
+        success = await run(crud.delete_expense, db, expense_id)
+        if not success:
+             raise HTTPException(status_code=404, detail="Expense not found")
+        return {"ok": True}
+
+    # --- Batch ---
+    @router.post("/batch", response_model=schemas.BatchResponse)
+    async def apply_batch(request: schemas.BatchRequest, db=Depends(get_db)):
+        """Apply create/update/delete operations across entities in one transaction."""
+        return await run(batch.apply_batch, db, request.operations)
+
+    # --- Reports ---
+    @router.get("/reports/summary", response_model=schemas.ExpenseSummary)
+    async def read_expense_summary(start_date: Optional[date] = None, end_date: Optional[date] = None, bucket: str = "day",
+                                   db=Depends(get_db)):
+        return await run(crud.get_expense_summary, db, start_date=start_date, end_date=end_date, bucket=bucket)
+
+    @router.get("/reports/forecast", response_model=schemas.ExpenseForecast)
+    async def read_expense_forecast(
+        request: Request,
+        category_id: Optional[int] = None,
+        phase_id: Optional[int] = None,
+        bucket: str = "month",
+        until: Optional[date] = None,
+        window_days: int = crud.FORECAST_WINDOW_DAYS,
+        db=Depends(get_db),
+    ):
+        """Cumulative spend, burn rate and budget projection; cached until the next expense or budget write."""
+        today = date.today()
+        return await cached(
+            request, "forecast", (category_id, phase_id, bucket, until, window_days, today), schemas.ExpenseForecast,
+            functools.partial(crud.get_expense_forecast, db, category_id=category_id, phase_id=phase_id, bucket=bucket,
+                              until=until, window_days=window_days, today=today),
+            variant=today.isoformat(), scope=projects.current(db),
+        )
+
+    return router
@@ -1,11 +1,16 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import date
+from typing import Optional, List, Dict, Any, Literal, Union
+from datetime import date, datetime
 
 # --- Base Schemas ---
+class ProjectBase(BaseModel):
+    title: str
+    description: Optional[str] = None
+
 class CategoryBase(BaseModel):
     title: str
     description: Optional[str] = None
+    budget: Optional[float] = None
 
 class SubCategoryBase(BaseModel):
     title: str
@@ -15,6 +20,7 @@ class SubCategoryBase(BaseModel):
 class ConstructionPhaseBase(BaseModel):
     title: str
     description: Optional[str] = None
+    budget: Optional[float] = None
 
 class ExpenseBase(BaseModel):
     title: str
@@ -39,6 +45,9 @@ class Tag(TagBase):
         from_attributes = True
 
 # --- Create Schemas ---
+class ProjectCreate(ProjectBase):
+    pass
+
 class CategoryCreate(CategoryBase):
     pass
 
@@ -52,6 +61,11 @@ class ExpenseCreate(ExpenseBase):
     pass
 
 # --- Read Schemas ---
+class Project(ProjectBase):
+    id: int
+    class Config:
+        from_attributes = True
+
 class SubCategory(SubCategoryBase):
     id: int
     class Config:
@@ -78,3 +92,193 @@ class Expense(ExpenseBase):
 
     class Config:
         from_attributes = True
+
+# --- Compact Read Schemas ---
+# Rows carry only foreign-key and tag IDs; each referenced entity is sent once
+# in the side-loaded dictionaries instead of being nested into every row.
+class ExpenseCompact(ExpenseBase):
+    id: int
+    creation_date: date
+    class Config:
+        from_attributes = True
+
+class CategoryCompact(CategoryBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+class ExpenseListCompact(BaseModel):
+    expenses: List[ExpenseCompact] = []
+    categories: Dict[int, CategoryCompact] = {}
+    sub_categories: Dict[int, SubCategory] = {}
+    phases: Dict[int, ConstructionPhase] = {}
+    tags: Dict[int, Tag] = {}
+    next_cursor: Optional[str] = None
+
+# --- Attachment Schemas ---
+class Attachment(BaseModel):
+    id: int
+    expense_id: int
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+# --- Sync Schemas ---
+class SyncDeleted(BaseModel):
+    entity: Literal["expenses", "categories", "sub_categories", "phases", "tags"]
+    id: int
+
+class SyncChanges(BaseModel):
+    token: int
+    full: bool
+    expenses: List[ExpenseCompact] = []
+    categories: List[CategoryCompact] = []
+    sub_categories: List[SubCategory] = []
+    phases: List[ConstructionPhase] = []
+    tags: List[Tag] = []
+    deleted: List[SyncDeleted] = []
+
+# --- Query Schemas ---
+class ExpenseFilter(BaseModel):
+    category_id: Optional[int] = None
+    sub_category_id: Optional[int] = None
+    phase_id: Optional[int] = None
+    tags: List[int] = []
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    q: Optional[str] = None
+
+# --- Bulk Import Schemas ---
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportReport(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[BulkImportError] = []
+    elapsed_seconds: float
+    rows_per_second: float
+
+# --- Batch Schemas ---
+# IDs in a batch operation may be "@ref" strings naming an earlier operation's ref
+BatchId = Union[int, str]
+
+class BatchOperation(BaseModel):
+    entity: Literal["category", "sub_category", "phase", "tag", "expense"]
+    action: Literal["create", "update", "delete"]
+    id: Optional[BatchId] = None
+    data: Optional[Dict[str, Any]] = None
+    reassign_to: Optional[BatchId] = None
+    ref: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchResult(BaseModel):
+    index: int
+    entity: str
+    action: str
+    id: int
+    ref: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+# --- Search Schemas ---
+class ExpenseSearchHit(BaseModel):
+    expense: Expense
+    rank: float
+    title_highlight: str
+    snippet: str
+
+    class Config:
+        from_attributes = True
+
+# --- Report Schemas ---
+class SummaryGroup(BaseModel):
+    id: Optional[int] = None
+    title: str
+    total: float
+    count: int
+
+class SummaryBucket(BaseModel):
+    date: date
+    total: float
+    count: int
+
+class ExpenseSummary(BaseModel):
+    total: float
+    count: int
+    by_category: List[SummaryGroup] = []
+    by_sub_category: List[SummaryGroup] = []
+    by_phase: List[SummaryGroup] = []
+    by_tag: List[SummaryGroup] = []
+    by_date: List[SummaryBucket] = []
+
+class ForecastPoint(BaseModel):
+    date: date
+    spent: float
+    cumulative: float
+    rolling_average: float
+
+class ForecastGroup(BaseModel):
+    id: Optional[int] = None
+    title: str
+    budget: Optional[float] = None
+    spent: float
+    remaining: Optional[float] = None
+    daily_burn_rate: float
+    budget_exhausted_on: Optional[date] = None
+    projected_total: Optional[float] = None
+
+class ExpenseForecast(BaseModel):
+    as_of: date
+    until: Optional[date] = None
+    window_days: int
+    budget: Optional[float] = None
+    spent: float
+    remaining: Optional[float] = None
+    first_purchase: Optional[date] = None
+    last_purchase: Optional[date] = None
+    average_daily_spend: float
+    daily_burn_rate: float
+    budget_exhausted_on: Optional[date] = None
+    projected_total: Optional[float] = None
+    series: List[ForecastPoint] = []
+    by_category: List[ForecastGroup] = []
+    by_phase: List[ForecastGroup] = []
+
+# --- Taxonomy Schemas ---
+class TaxonomySubCategory(SubCategory):
+    count: int
+    total: float
+
+class TaxonomyCategory(CategoryBase):
+    id: int
+    count: int
+    total: float
+    sub_categories: List[TaxonomySubCategory] = []
+
+class TaxonomyPhase(ConstructionPhase):
+    count: int
+    total: float
+
+class TaxonomyTag(Tag):
+    count: int
+    total: float
+
+class Taxonomy(BaseModel):
+    count: int
+    total: float
+    categories: List[TaxonomyCategory] = []
+    phases: List[TaxonomyPhase] = []
+    tags: List[TaxonomyTag] = []
@@ -0,0 +1,200 @@
+"""Full-text search over expense title, description, notes and tag titles.
+
+On SQLite the text lives in an FTS5 table keyed by expense id, kept in sync by
+triggers on expenses, expense_tags and tags, so every write path (ORM, bulk
+import, reassignments) stays covered. Other databases, or SQLite builds
+without FTS5, fall back to a case-insensitive substring match.
+
+    python -m backend.search rebuild
+"""
+import argparse
+import contextlib
+import html
+import re
+from sqlalchemy import text, func, or_, case
+from sqlalchemy.orm import Session
+from . import models, projects
+
+FTS_TABLE = "expenses_fts"
+
+# Tag titles of one expense, space separated
+_TAGS_OF = """(SELECT group_concat(t.title, ' ') FROM expense_tags et
+    JOIN tags t ON t.id = et.tag_id WHERE et.expense_id = {expense_id})"""
+
+_REFRESH_TAGS = f"UPDATE {FTS_TABLE} SET tags = {_TAGS_OF} WHERE rowid = {{expense_id}};"
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, notes, tags,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, notes, tags)
+        VALUES (new.id, new.title, new.description, new.notes, {_TAGS_OF.format(expense_id="new.id")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF title, description, notes ON expenses BEGIN
+        UPDATE {FTS_TABLE} SET title = new.title, description = new.description, notes = new.notes
+        WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_tags_fts_insert AFTER INSERT ON expense_tags BEGIN
+        {_REFRESH_TAGS.format(expense_id="new.expense_id")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_tags_fts_update AFTER UPDATE ON expense_tags BEGIN
+        {_REFRESH_TAGS.format(expense_id="old.expense_id")}
+        {_REFRESH_TAGS.format(expense_id="new.expense_id")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expense_tags_fts_delete AFTER DELETE ON expense_tags BEGIN
+        {_REFRESH_TAGS.format(expense_id="old.expense_id")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tags_fts_update AFTER UPDATE OF title ON tags BEGIN
+        UPDATE {FTS_TABLE} SET tags = {_TAGS_OF.format(expense_id=f"{FTS_TABLE}.rowid")}
+        WHERE rowid IN (SELECT expense_id FROM expense_tags WHERE tag_id = new.id);
+    END""",
+]
+
+_TRIGGERS = re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)", " ".join(_SCHEMA))
+
+_POPULATE = f"""INSERT INTO {FTS_TABLE}(rowid, title, description, notes, tags)
+    SELECT e.id, e.title, e.description, e.notes, {_TAGS_OF.format(expense_id="e.id")} FROM expenses e"""
+
+def fts_available(db: Session):
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+def ensure_index(engine):
+    """Create the FTS table and triggers, filling the table when it is new."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        compile_options = {row[0] for row in conn.execute(text("PRAGMA compile_options"))}
+        if "ENABLE_FTS5" not in compile_options:
+            print("WARNING: SQLite was built without FTS5. Expense search falls back to substring matching.")
+            return
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first() is not None
+        for statement in _SCHEMA:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(_POPULATE))
+
+def rebuild_index(engine):
+    """Refill the FTS table from the expenses and tags tables."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        conn.execute(text(_POPULATE))
+
+@contextlib.contextmanager
+def bulk_load(engine):
+    """Drop the triggers for a bulk insert, then recreate them and refill the index once.
+
+    Refilling is much cheaper than updating the index row by row. Meant for
+    offline loads such as seed_data.py: search results miss the rows written
+    until the block ends.
+    """
+    with engine.begin() as conn:
+        indexed = engine.dialect.name == "sqlite" and conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first() is not None
+        if indexed:
+            for name in _TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    try:
+        yield
+    finally:
+        if indexed:
+            ensure_index(engine)
+            rebuild_index(engine)
+
+# highlight() and snippet() mark matches with these control characters; the
+# text is HTML-escaped before they become <mark> tags
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+def _render_marks(value: str):
+    return html.escape(value or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def _highlight_substring(value: str, pattern: str):
+    """HTML-escape value and wrap every case-insensitive occurrence of pattern in <mark>."""
+    parts = re.split(f"({re.escape(pattern)})", value or "", flags=re.IGNORECASE)
+    return "".join(f"<mark>{html.escape(part)}</mark>" if i % 2 else html.escape(part) for i, part in enumerate(parts))
+
+def to_match_query(q: str):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)
+    return " ".join(f'"{term}"*' for term in terms)
+
+def search_expenses(db: Session, q: str, skip: int = 0, limit: int = 20):
+    """Return (expense_id, rank, highlighted title, snippet) tuples, best first.
+
+    The title and snippet are HTML-escaped, with matches wrapped in <mark>.
+    """
+    if not fts_available(db):
+        return _search_fallback(db, q, skip, limit)
+    match = to_match_query(q)
+    if not match:
+        return []
+    params = {"match": match, "limit": limit, "skip": skip, "mark_start": _MARK_START, "mark_end": _MARK_END}
+    project_filter = ""
+    if projects.current(db) is not None:
+        # The index spans all projects; keep the matches of the session's one
+        project_filter = "AND rowid IN (SELECT id FROM expenses WHERE project_id = :project_id)"
+        params["project_id"] = projects.current(db)
+    # bm25 weights per column (title, description, notes, tags); lower rank is better
+    rows = db.execute(text(f"""
+        SELECT rowid,
+               bm25({FTS_TABLE}, 10.0, 3.0, 1.0, 5.0) AS rank,
+               highlight({FTS_TABLE}, 0, :mark_start, :mark_end),
+               snippet({FTS_TABLE}, -1, :mark_start, :mark_end, '…', 12)
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :match {project_filter}
+        ORDER BY rank
+        LIMIT :limit OFFSET :skip
+    """), params)
+    return [(id_, rank, _render_marks(title), _render_marks(snippet)) for id_, rank, title, snippet in rows]
+
+def _search_fallback(db: Session, q: str, skip: int = 0, limit: int = 20):
+    pattern = q.lower()
+
+    def matches(column):
+        return func.lower(column).contains(pattern, autoescape=True)
+
+    expense = models.Expense
+    tagged = expense.id.in_(
+        db.query(models.ExpenseTag.expense_id)
+        .join(models.Tag, models.Tag.id == models.ExpenseTag.tag_id)
+        .filter(matches(models.Tag.title))
+    )
+    # Same column weights as the bm25() ranking; lower rank is better
+    weighted = [(matches(expense.title), 10.0), (matches(expense.description), 3.0),
+                (matches(expense.notes), 1.0), (tagged, 5.0)]
+    rank = -sum(case((criterion, weight), else_=0.0) for criterion, weight in weighted)
+    rows = db.query(expense.id, rank, expense.title, expense.description, expense.notes) \
+        .filter(or_(*[criterion for criterion, _ in weighted])) \
+        .order_by(rank, expense.id.desc()) \
+        .offset(skip).limit(limit)
+    hits = []
+    for id_, rank, title, description, notes in rows:
+        snippet = next((value for value in (description, notes) if value and pattern in value.lower()), description)
+        hits.append((id_, rank, _highlight_substring(title, q), _highlight_substring(snippet, q)))
+    return hits
+
+if __name__ == "__main__":
+    from . import startup
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Maintain the expense full-text index.")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    # Creates the FTS table and triggers along with the rest of the schema
+    startup.prepare_database(engine)
+    rebuild_index(engine)
+    print("Rebuilt the expense search index.")
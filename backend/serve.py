@@ -0,0 +1,45 @@
+"""Production launcher: prepare the database once, then start N uvicorn workers.
+
+    python -m backend.serve [--workers 4] [--host 0.0.0.0] [--port 8000] [--app backend.docker_main:app]
+
+Workers default to BRICKBYBRICK_WORKERS (1 if unset). They skip the schema
+step (BRICKBYBRICK_SKIP_DB_SETUP=1) and, with more than one worker, share the
+reference cache versions through the database (BRICKBYBRICK_SHARED_CACHE=1).
+"""
+import argparse
+import os
+import time
+
+DEFAULT_APP = "backend.docker_main:app"
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the BrickByBrick API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=_env_int("BRICKBYBRICK_WORKERS", 1))
+    parser.add_argument("--host", default=os.getenv("BRICKBYBRICK_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("BRICKBYBRICK_PORT", 8000))
+    parser.add_argument("--app", default=os.getenv("BRICKBYBRICK_APP", DEFAULT_APP))
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    import uvicorn
+    from . import database, startup
+
+    started = time.perf_counter()
+    startup.prepare_database()
+    # Workers open their own connections; don't hand them the parent's pool
+    database.engine.dispose()
+    print(f"Database ready ({time.perf_counter() - started:.2f}s), starting {args.workers} worker(s).")
+
+    # Inherited by the worker processes, which import the app fresh
+    os.environ["BRICKBYBRICK_SKIP_DB_SETUP"] = "1"
+    if args.workers > 1:
+        os.environ["BRICKBYBRICK_SHARED_CACHE"] = "1"
+    uvicorn.run(args.app, host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""One-time database preparation: tables, indexes added since, derived tables.
+
+The production launcher (backend/serve.py) runs this once before starting its
+workers, so they do not race on schema creation. It can also be run on its
+own, e.g. as a release step before the app starts:
+
+    python -m backend.startup
+
+Single-process runs (uvicorn backend.main:app, python -m backend.main) still
+prepare the database on import unless BRICKBYBRICK_SKIP_DB_SETUP=1.
+"""
+import os
+import time
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from . import models, database, projects, rollups, search, sync
+
+SKIP_DB_SETUP = os.getenv("BRICKBYBRICK_SKIP_DB_SETUP") == "1"
+
+def _add_missing_columns(engine):
+    """create_all skips existing tables, so add nullable columns introduced later."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+# Money columns that used to hold floats and now hold integer cents:
+# (table, float column, cents column)
+CENTS_COLUMNS = (
+    ("expenses", "amount", "amount_cents"),
+    ("categories", "budget", "budget_cents"),
+    ("construction_phases", "budget", "budget_cents"),
+)
+
+def _migrate_money_to_cents(engine):
+    """Convert float amounts and budgets of older databases to integer cents.
+
+    Each step checks the current columns, so an interrupted run resumes.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        if "expense_rollups" in tables and \
+                "total" in {column["name"] for column in inspector.get_columns("expense_rollups")}:
+            # Derived data: recreated by create_all and refilled by rollups.ensure_built
+            conn.execute(text("DROP TABLE expense_rollups"))
+        for table, old, new in CENTS_COLUMNS:
+            if table not in tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            if old not in existing:
+                continue
+            column = models.Base.metadata.tables[table].c[old]
+            if new not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                constraint = "" if column.nullable else " NOT NULL DEFAULT 0"
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {new} {column_type}{constraint}"))
+            conn.execute(text(f"UPDATE {table} SET {new} = CAST(ROUND({old} * 100) AS BIGINT)"))
+            for index in inspector.get_indexes(table):
+                if old in index["column_names"]:
+                    conn.execute(text(f"DROP INDEX {index['name']}"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {old}"))
+
+# Indexes replaced by project-leading ones; the title indexes were unique
+# across all projects
+SUPERSEDED_INDEXES = (
+    "ix_categories_title",
+    "ix_construction_phases_title",
+    "ix_tags_title",
+    "ix_expenses_purchase_date_id",
+    "ix_expenses_amount_id",
+    "ix_expenses_title_id",
+    "ix_expense_rollups_month",
+    "ix_sync_tombstones_change_seq",
+)
+
+def _migrate_to_projects(engine):
+    """Move the rows of a database from before projects into the default project."""
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        if "expense_rollups" in tables and \
+                "project_id" not in {column["name"] for column in inspector.get_columns("expense_rollups")}:
+            # Its unique key lacks the project; rebuilt by rollups.ensure_built
+            conn.execute(text("DROP TABLE expense_rollups"))
+            tables.discard("expense_rollups")
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in tables or "project_id" not in table.c:
+                continue
+            if "project_id" in {column["name"] for column in inspector.get_columns(table.name)}:
+                continue
+            # SQLite only adds a REFERENCES column with a NULL default, so the
+            # foreign key applies to tables created from now on
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN project_id INTEGER NOT NULL "
+                              f"DEFAULT {projects.DEFAULT_PROJECT_ID}"))
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def prepare_database(engine=None):
+    """Idempotently bring the database up to the current schema."""
+    engine = engine or database.engine
+    _migrate_money_to_cents(engine)
+    _migrate_to_projects(engine)
+    models.Base.metadata.create_all(bind=engine)
+    projects.ensure_default(engine)
+    _add_missing_columns(engine)
+    # create_all skips tables that already exist, so add indexes introduced later
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with Session(bind=engine) as db:
+        rollups.ensure_built(db)
+    search.ensure_index(engine)
+    sync.ensure_state(engine)
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    prepare_database()
+    print(f"Database ready ({time.perf_counter() - started:.2f}s).")
@@ -0,0 +1,111 @@
+"""Serving of the built frontend (frontend/dist) for the Docker image.
+
+The dist directory is indexed once at startup, so requests are answered from a
+dict lookup instead of filesystem checks. Each file gets an ETag from its
+content hash and, when compressible, gzip / brotli variants: precompressed
+siblings (app.js.gz, app.js.br) are used when the build produced them, gzip is
+otherwise generated in memory at startup. Vite's hashed files under /assets
+are cached as immutable; index.html is revalidated with ETag / If-None-Match.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from collections import namedtuple
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT_LIVED = "public, max-age=3600"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/manifest+json")
+MIN_COMPRESS_SIZE = 1024
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+# path / stat: the file on disk; body: in-memory bytes for generated variants
+Variant = namedtuple("Variant", ["path", "stat", "body", "etag"])
+StaticFile = namedtuple("StaticFile", ["media_type", "cache_control", "variants"])
+
+def _file_hash(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+def _is_compressible(media_type: str):
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+def accepted_encodings(accept_encoding: str):
+    """Encodings the client accepts, ignoring those sent with q=0."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+class StaticIndex:
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        self.files = {}
+        for root, _, names in os.walk(dist_dir):
+            for name in names:
+                if name.endswith(tuple(ENCODINGS.values())) and os.path.splitext(name)[0] in names:
+                    continue  # precompressed sibling, attached to its source file below
+                path = os.path.join(root, name)
+                url_path = os.path.relpath(path, dist_dir).replace(os.sep, "/")
+                self.files[url_path] = self._index_file(path, url_path)
+
+    def _index_file(self, path: str, url_path: str):
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if url_path.startswith("assets/"):
+            cache_control = IMMUTABLE
+        elif url_path == "index.html":
+            cache_control = REVALIDATE
+        else:
+            cache_control = SHORT_LIVED
+
+        content_hash = _file_hash(path)
+        variants = {"identity": Variant(path, os.stat(path), None, f'"{content_hash}"')}
+        if _is_compressible(media_type) and os.path.getsize(path) >= MIN_COMPRESS_SIZE:
+            for encoding, suffix in ENCODINGS.items():
+                etag = f'"{content_hash}-{encoding}"'
+                if os.path.isfile(path + suffix):
+                    variants[encoding] = Variant(path + suffix, os.stat(path + suffix), None, etag)
+                    continue
+                with open(path, "rb") as f:
+                    raw = f.read()
+                if encoding == "gzip":
+                    variants[encoding] = Variant(None, None, gzip.compress(raw, compresslevel=9, mtime=0), etag)
+                elif brotli is not None:
+                    variants[encoding] = Variant(None, None, brotli.compress(raw), etag)
+        return StaticFile(media_type, cache_control, variants)
+
+    def get(self, full_path: str):
+        """The indexed file for a URL path, or None."""
+        return self.files.get(full_path.lstrip("/") or "index.html")
+
+    def response(self, request: Request, static_file: StaticFile):
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((name for name in ENCODINGS if name in accepted and name in static_file.variants), "identity")
+        variant = static_file.variants[encoding]
+
+        headers = {"Cache-Control": static_file.cache_control, "ETag": variant.etag}
+        if len(static_file.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if variant.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if variant.body is not None:
+            return Response(content=variant.body, media_type=static_file.media_type, headers=headers)
+        return FileResponse(variant.path, media_type=static_file.media_type, headers=headers, stat_result=variant.stat)
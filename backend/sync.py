@@ -0,0 +1,91 @@
+"""Change tracking behind GET /sync.
+
+Each write transaction takes one change token from the single-row sync_state
+counter, on its first insert, update or delete of a synced row. The counter
+row stays locked until commit, so tokens become visible in commit order and a
+client that has seen token N can ask for everything with change_seq > N.
+
+Rows carry the token in change_seq (see models.SyncedMixin); deleted rows
+leave a Tombstone with the token of the deleting transaction. Core statements
+get the column defaults like ORM flushes do; Core DELETEs call bury().
+"""
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from . import models
+
+TOKEN_KEY = "brickbybrick_sync_token"
+
+# Token of a database before its first change; since=0 asks for everything
+FIRST_TOKEN = 1
+
+# Entity name used in /sync responses and tombstones, per synced model
+ENTITIES = {
+    models.Expense: "expenses",
+    models.Category: "categories",
+    models.SubCategory: "sub_categories",
+    models.ConstructionPhase: "phases",
+    models.Tag: "tags",
+}
+
+def transaction_token(connection):
+    """The change token of the connection's current transaction, taken on first use."""
+    transaction = connection.get_transaction()
+    cached = connection.info.get(TOKEN_KEY)
+    if cached is not None and cached[0] is transaction:
+        return cached[1]
+    table = models.SyncState.__table__
+    token = connection.execute(
+        update(table).where(table.c.id == 1).values(token=table.c.token + 1).returning(table.c.token)
+    ).scalar()
+    if token is None:
+        # No counter row yet (tables made without startup.prepare_database)
+        token = FIRST_TOKEN + 1
+        connection.execute(insert(table).values(id=1, token=token))
+    connection.info[TOKEN_KEY] = (transaction, token)
+    return token
+
+def current_token(db: Session):
+    """The highest committed token."""
+    return db.execute(select(models.SyncState.token).where(models.SyncState.id == 1)).scalar() or FIRST_TOKEN
+
+def ensure_state(engine):
+    """Create the counter row up front so concurrent first writers don't race on it."""
+    table = models.SyncState.__table__
+    with engine.begin() as conn:
+        if conn.execute(select(table.c.id).where(table.c.id == 1)).first() is None:
+            conn.execute(insert(table).values(id=1, token=FIRST_TOKEN))
+
+def bury(connection, entity: str, row_ids, project_id: int):
+    """Record tombstones for rows of one project deleted outside the ORM."""
+    row_ids = list(row_ids)
+    if not row_ids:
+        return
+    token = transaction_token(connection)
+    connection.execute(
+        insert(models.Tombstone.__table__),
+        [
+            {"project_id": project_id, "entity": entity, "row_id": row_id, "change_seq": token,
+             "deleted_at": models.utcnow()}
+            for row_id in row_ids
+        ],
+    )
+
+def touch(db: Session, model, criterion):
+    """Mark rows as changed without changing their columns, e.g. when their tag links move."""
+    db.query(model).filter(criterion).update({"updated_at": models.utcnow()}, synchronize_session=False)
+
+def _bury_deleted(entity):
+    def after_delete(mapper, connection, target):
+        bury(connection, entity, [target.id], target.project_id)
+    return after_delete
+
+for _model, _entity in ENTITIES.items():
+    event.listen(_model, "after_delete", _bury_deleted(_entity))
+
+@event.listens_for(Session, "before_flush")
+def _stamp_collection_changes(session, flush_context, instances):
+    # Changing only a relationship (an expense's tags) issues no UPDATE of the
+    # row itself, so force one to move its change_seq
+    for obj in session.dirty:
+        if type(obj) in ENTITIES and session.is_modified(obj):
+            obj.updated_at = models.utcnow()
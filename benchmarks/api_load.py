@@ -0,0 +1,73 @@
+"""Requests per second and latency of the sync (main.py) vs async (async_main.py) API.
+
+Requests are driven in-process through httpx's ASGI transport, so the numbers
+measure the application and database path without network overhead.
+
+Usage: python -m benchmarks.api_load [--requests 2000] [--concurrency 64] [--expenses 10000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.common import percentile, seed_database
+
+ROUTES = ["/expenses/?limit=50", "/categories/", "/reports/summary?bucket=month", "/tags/"]
+
+async def drive(app, total_requests: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(ROUTES[i % len(ROUTES)])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                path = queue.get_nowait()
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(total_requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--expenses", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The backend reads its database URL at import time
+        db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["BRICKBYBRICK_DATABASE_URL"] = db_url
+        from backend import database
+
+        seed_database(database.engine, args.expenses)
+
+        from backend import main, async_main
+
+        results = []
+        for mode, app in (("sync", main.app), ("async", async_main.app)):
+            result = asyncio.run(drive(app, args.requests, args.concurrency))
+            results.append({"mode": mode, **result})
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,23 @@
+"""Helpers shared by the benchmark scripts.
+
+The backend binds its default database URL on import, so scripts that set
+BRICKBYBRICK_DATABASE_URL import this module's backend dependencies lazily.
+"""
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def seed_database(engine, expenses: int, seed: int = 42):
+    """Bring the database up to the current schema and fill the default project
+    with seed_data.py's reference data and synthetic expenses."""
+    import seed_data
+    from sqlalchemy.orm import Session
+    from backend import models, projects, search, startup
+
+    startup.prepare_database(engine)
+    with search.bulk_load(engine), Session(bind=engine) as db:
+        projects.scope(db, projects.DEFAULT_PROJECT_ID)
+        if not db.query(models.Category.id).first():
+            seed_data.seed_reference_data(db)
+        seed_data.generate_expenses(db, expenses, seed=seed)
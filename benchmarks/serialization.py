@@ -0,0 +1,57 @@
+"""Time to load and serialize 10k expenses: ORM + pydantic vs SQL tuples + orjson.
+
+Usage: python -m benchmarks.serialization [--expenses 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+from backend import schemas, crud
+from backend.database import create_db_engine
+from benchmarks.common import seed_database
+
+def default_path(db, limit: int):
+    # What FastAPI does for response_model=List[schemas.Expense]
+    expenses = crud.get_expenses(db, limit=limit)
+    validated = TypeAdapter(List[schemas.Expense]).validate_python(expenses, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def fast_path(db, limit: int):
+    import orjson
+
+    return orjson.dumps(crud.get_expense_rows(db, limit=limit), option=orjson.OPT_NON_STR_KEYS)
+
+def measure(Session, path, limit: int, repeat: int):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.perf_counter()
+            size = len(path(db, limit))
+            timings.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(timings) * 1000, 1), "bytes": size}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed_database(engine, args.expenses)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        results = {
+            "expenses": args.expenses,
+            "orm_pydantic": measure(Session, default_path, args.expenses, args.repeat),
+            "sql_rows_orjson": measure(Session, fast_path, args.expenses, args.repeat),
+        }
+        engine.dispose()
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,93 @@
+"""Mixed read/write throughput of the "default" vs "production" SQLite profiles.
+
+Usage: python -m benchmarks.sqlite_profile [--seconds 5] [--writers 4] [--readers 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from backend import models
+from backend.database import create_db_engine
+from benchmarks.common import seed_database
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int, seed_rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile)
+        seed_database(engine, seed_rows)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        with Session() as db:
+            category_id = db.query(models.Category.id).order_by(models.Category.id).first()[0]
+
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def writer():
+            done = errors = 0
+            with Session() as db:
+                while time.perf_counter() < deadline:
+                    try:
+                        db.add(models.Expense(title="Write", amount=1.0, category_id=category_id))
+                        db.commit()
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        errors += 1
+            with lock:
+                counts["writes"] += done
+                counts["errors"] += errors
+
+        def reader():
+            done = errors = 0
+            with Session() as db:
+                while time.perf_counter() < deadline:
+                    try:
+                        db.query(models.Expense.category_id, func.sum(models.Expense.amount)) \
+                            .group_by(models.Expense.category_id).all()
+                        db.query(models.Expense).order_by(models.Expense.id.desc()).limit(50).all()
+                        db.rollback()
+                        done += 1
+                    except OperationalError:
+                        db.rollback()
+                        errors += 1
+            with lock:
+                counts["reads"] += done
+                counts["errors"] += errors
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "profile": profile,
+        "seconds": round(elapsed, 2),
+        "writes_per_second": round(counts["writes"] / elapsed, 1),
+        "reads_per_second": round(counts["reads"] / elapsed, 1),
+        "errors": counts["errors"],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = [
+        run_profile(profile, args.seconds, args.writers, args.readers, args.seed_rows)
+        for profile in ("default", "production")
+    ]
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,328 @@
+"""Load-test every route of backend/main.py against seeded datasets.
+
+Each dataset size runs in its own process, because the backend binds its
+database when it is imported: the process seeds a fresh SQLite file with
+seed_data.generate_expenses, imports the app and drives each route in-process
+through httpx's ASGI transport. Per route it reports throughput, latency
+percentiles, SQL statements and SQL time per request (from backend.metrics)
+and the peak Python allocation of one request. The JSON output can be passed
+back as --baseline to a later run to get the relative changes.
+
+Usage: python -m benchmarks.suite [--sizes 1000 100000 1000000] [--requests 200]
+           [--concurrency 16] [--seed 42] [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from benchmarks.common import percentile, seed_database
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# A scenario issues requests against one route; build(i, ctx) returns the
+# path and the httpx keyword arguments of the i-th request. Heavy scenarios
+# (full exports, bulk imports) are capped at max_requests. Creates record the
+# new IDs under "created"; deletes issue one request per recorded ID.
+Scenario = namedtuple("Scenario", ["method", "route", "build", "max_requests", "created", "deletes"],
+                      defaults=(None, None, None))
+
+def _get(path):
+    return lambda i, ctx: (path, {})
+
+def _created(key):
+    return lambda ctx, i: ctx["created"][key][i % len(ctx["created"][key])]
+
+def _delete(key, prefix):
+    return lambda i, ctx: (f"{prefix}{ctx['created'][key][i]}", {})
+
+def _bulk_csv(i, ctx):
+    lines = ["title,amount,purchase_date,category_id,tags"]
+    lines += [f"Bulk {i}-{row},{row + 0.5},2024-05-{row % 28 + 1:02d},{ctx['category_id']},Invoice" for row in range(100)]
+    return "/expenses/bulk", {"content": "\n".join(lines), "headers": {"content-type": "text/csv"}}
+
+def _batch(i, ctx):
+    operations = [{"entity": "tag", "action": "create", "data": {"title": f"Batch tag {i}"}, "ref": "tag"}]
+    operations += [
+        {"entity": "expense", "action": "create",
+         "data": {"title": f"Batch {i}-{part}", "amount": 20.0, "category_id": ctx["category_id"], "tags": ["@tag"]}}
+        for part in range(5)
+    ]
+    return "/batch", {"json": {"operations": operations}}
+
+ATTACHMENT = os.urandom(256 * 1024)
+
+def _upload(i, ctx):
+    expense_id = _created("expenses")(ctx, i)
+    # Every fourth upload repeats a file, exercising deduplication
+    body = ATTACHMENT if i % 4 == 0 else ATTACHMENT[:-8] + i.to_bytes(8, "big")
+    return f"/expenses/{expense_id}/attachments?filename=receipt-{i}.pdf", \
+        {"content": body, "headers": {"content-type": "application/pdf"}}
+
+def _download(headers=None):
+    return lambda i, ctx: (f"/attachments/{_created('attachments')(ctx, i)}", {"headers": headers or {}})
+
+def _expense_body(i, ctx):
+    return {"title": f"Bench expense {i}", "amount": 12.5 + i, "category_id": ctx["category_id"],
+            "sub_category_id": ctx["sub_category_id"], "phase_id": ctx["phase_id"], "tags": [ctx["tag_id"]]}
+
+SCENARIOS = [
+    # Reads
+    Scenario("GET", "/", _get("/")),
+    Scenario("GET", "/projects/", _get("/projects/")),
+    Scenario("GET", "/categories/", _get("/categories/")),
+    Scenario("GET", "/sub_categories/", _get("/sub_categories/")),
+    Scenario("GET", "/phases/", _get("/phases/")),
+    Scenario("GET", "/tags/", _get("/tags/")),
+    Scenario("GET", "/taxonomy", _get("/taxonomy")),
+    Scenario("GET", "/expenses/", _get("/expenses/?limit=100")),
+    Scenario("GET", "/expenses/compact", _get("/expenses/compact?limit=100")),
+    Scenario("GET", "/expenses/search", _get("/expenses/search?q=concrete%20deliv")),
+    Scenario("GET", "/expenses/export", _get("/expenses/export?format=ndjson"), max_requests=3),
+    Scenario("GET", "/sync", _get("/sync?since=0"), max_requests=3),
+    Scenario("GET", "/reports/summary", _get("/reports/summary?bucket=month"), max_requests=50),
+    Scenario("GET", "/reports/forecast", _get("/reports/forecast")),
+    Scenario("GET", "/metrics", _get("/metrics")),
+    # Writes: creates record their IDs for the updates and deletes that follow
+    Scenario("POST", "/projects/", lambda i, ctx: ("/projects/", {"json": {"title": f"Bench project {i}"}}),
+             created="projects"),
+    Scenario("PUT", "/projects/{project_id}",
+             lambda i, ctx: (f"/projects/{_created('projects')(ctx, i)}", {"json": {"title": f"Bench project {i}*"}})),
+    Scenario("POST", "/categories/", lambda i, ctx: ("/categories/", {"json": {"title": f"Bench category {i}"}}),
+             created="categories"),
+    Scenario("PUT", "/categories/{category_id}",
+             lambda i, ctx: (f"/categories/{_created('categories')(ctx, i)}", {"json": {"title": f"Bench category {i}*"}})),
+    Scenario("POST", "/sub_categories/",
+             lambda i, ctx: ("/sub_categories/", {"json": {"title": f"Bench sub {i}", "category_id": ctx["category_id"]}}),
+             created="sub_categories"),
+    Scenario("PUT", "/sub_categories/{sub_category_id}",
+             lambda i, ctx: (f"/sub_categories/{_created('sub_categories')(ctx, i)}",
+                             {"json": {"title": f"Bench sub {i}*", "category_id": ctx["category_id"]}})),
+    Scenario("POST", "/phases/", lambda i, ctx: ("/phases/", {"json": {"title": f"Bench phase {i}"}}), created="phases"),
+    Scenario("PUT", "/phases/{phase_id}",
+             lambda i, ctx: (f"/phases/{_created('phases')(ctx, i)}", {"json": {"title": f"Bench phase {i}*"}})),
+    Scenario("POST", "/tags/", lambda i, ctx: ("/tags/", {"json": {"title": f"Bench tag {i}"}}), created="tags"),
+    Scenario("PUT", "/tags/{tag_id}",
+             lambda i, ctx: (f"/tags/{_created('tags')(ctx, i)}", {"json": {"title": f"Bench tag {i}*"}})),
+    Scenario("POST", "/expenses/", lambda i, ctx: ("/expenses/", {"json": _expense_body(i, ctx)}), created="expenses"),
+    Scenario("PUT", "/expenses/{expense_id}",
+             lambda i, ctx: (f"/expenses/{_created('expenses')(ctx, i)}", {"json": _expense_body(i, ctx)})),
+    Scenario("POST", "/expenses/{expense_id}/attachments", _upload, max_requests=50, created="attachments"),
+    Scenario("GET", "/expenses/{expense_id}/attachments",
+             lambda i, ctx: (f"/expenses/{_created('expenses')(ctx, i)}/attachments", {})),
+    Scenario("GET", "/attachments/{attachment_id}", _download()),
+    Scenario("HEAD", "/attachments/{attachment_id}", _download({"range": "bytes=1024-4095"})),
+    Scenario("POST", "/expenses/bulk", _bulk_csv, max_requests=20),
+    Scenario("POST", "/batch", _batch),
+    Scenario("DELETE", "/attachments/{attachment_id}", _delete("attachments", "/attachments/"), deletes="attachments"),
+    Scenario("DELETE", "/expenses/{expense_id}", _delete("expenses", "/expenses/"), deletes="expenses"),
+    Scenario("DELETE", "/categories/{category_id}", _delete("categories", "/categories/"), deletes="categories"),
+    Scenario("DELETE", "/sub_categories/{sub_category_id}", _delete("sub_categories", "/sub_categories/"),
+             deletes="sub_categories"),
+    Scenario("DELETE", "/phases/{phase_id}", _delete("phases", "/phases/"), deletes="phases"),
+    Scenario("DELETE", "/tags/{tag_id}", _delete("tags", "/tags/"), deletes="tags"),
+    Scenario("DELETE", "/projects/{project_id}", _delete("projects", "/projects/"), deletes="projects"),
+]
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int, ctx: dict):
+    from backend import metrics
+
+    if scenario.max_requests:
+        requests = min(requests, scenario.max_requests)
+    if scenario.deletes:
+        requests = len(ctx["created"].get(scenario.deletes, []))
+        if not requests:
+            return {"requests": 0, "errors": 0}
+    labels = (scenario.method, scenario.route)
+    sql_before = metrics.request_sql_statements.totals(labels)
+    sql_time_before = metrics.request_sql_duration.totals(labels)
+    errors = 0
+
+    async def issue(i):
+        nonlocal errors
+        path, kwargs = scenario.build(i, ctx)
+        response = await client.request(scenario.method, path, **kwargs)
+        if response.status_code >= 400:
+            errors += 1
+        elif scenario.created:
+            ctx["created"].setdefault(scenario.created, []).append(response.json()["id"])
+
+    # The first request runs alone under tracemalloc; it is left out of the latencies
+    tracemalloc.start()
+    await issue(0)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    pending = iter(range(1, requests))
+
+    async def worker():
+        for i in pending:
+            started = time.perf_counter()
+            await issue(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    sql_statements, sql_requests = metrics.request_sql_statements.totals(labels)
+    sql_seconds, _ = metrics.request_sql_duration.totals(labels)
+    sql_requests -= sql_before[1]
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "peak_alloc_kib": round(peak_bytes / 1024, 1),
+        "sql_statements_per_request": round((sql_statements - sql_before[0]) / sql_requests, 2) if sql_requests else None,
+        "sql_ms_per_request": round((sql_seconds - sql_time_before[0]) * 1000 / sql_requests, 3) if sql_requests else None,
+    }
+    if latencies:
+        result.update({
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(max(latencies) * 1000, 2),
+        })
+    return result
+
+async def drive(app, requests: int, concurrency: int):
+    import httpx
+    from fastapi.routing import APIRoute
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        category = (await client.get("/categories/")).json()[0]
+        ctx = {
+            "category_id": category["id"],
+            "sub_category_id": category["sub_categories"][0]["id"],
+            "phase_id": (await client.get("/phases/")).json()[0]["id"],
+            "tag_id": (await client.get("/tags/")).json()[0]["id"],
+            "created": {},
+        }
+        routes = {}
+        for scenario in SCENARIOS:
+            routes[f"{scenario.method} {scenario.route}"] = await run_scenario(client, scenario, requests, concurrency, ctx)
+
+    served = {
+        f"{method} {route.path}"
+        for route in app.router.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    return routes, sorted(served - set(routes))
+
+def run_size(expenses: int, requests: int, concurrency: int, seed: int):
+    """Seed one dataset and benchmark it; runs in a process of its own."""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BRICKBYBRICK_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["BRICKBYBRICK_BLOB_DIR"] = os.path.join(tmp, "blobs")
+        from backend import database
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stderr):
+            seed_database(database.engine, expenses, seed=seed)
+        seed_seconds = time.perf_counter() - started
+
+        # Importing the app creates indexes and fills the search index
+        started = time.perf_counter()
+        from backend import main
+        startup_seconds = time.perf_counter() - started
+
+        routes, uncovered = asyncio.run(drive(main.app, requests, concurrency))
+        main.database.engine.dispose()
+    return {
+        "expenses": expenses,
+        "seed_seconds": round(seed_seconds, 2),
+        "seed_rows_per_second": round(expenses / seed_seconds, 1),
+        "startup_seconds": round(startup_seconds, 2),
+        # ru_maxrss is in KiB on Linux
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "routes": routes,
+        "uncovered_routes": uncovered,
+    }
+
+def _change(new, old):
+    if new is None or not old:
+        return None
+    return round((new - old) / old * 100, 1)
+
+def compare(results: dict, baseline: dict):
+    """Percent change per size and route against a previous run."""
+    previous = {run["expenses"]: run for run in baseline.get("runs", [])}
+    changes = []
+    for run in results["runs"]:
+        old_run = previous.get(run["expenses"])
+        if old_run is None:
+            continue
+        for route, stats in run["routes"].items():
+            old = old_run["routes"].get(route)
+            if old is None:
+                continue
+            changes.append({
+                "expenses": run["expenses"],
+                "route": route,
+                "requests_per_second_pct": _change(stats.get("requests_per_second"), old.get("requests_per_second")),
+                "p50_ms_pct": _change(stats.get("p50_ms"), old.get("p50_ms")),
+                "p99_ms_pct": _change(stats.get("p99_ms"), old.get("p99_ms")),
+                "sql_statements_per_request_pct": _change(stats.get("sql_statements_per_request"),
+                                                      old.get("sql_statements_per_request")),
+            })
+    return changes
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="JSON of a previous run to compare against")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        print(json.dumps(run_size(args.run_size, max(args.requests, 2), args.concurrency, args.seed)))
+        sys.exit(0)
+
+    runs = []
+    for size in args.sizes:
+        print(f"Benchmarking {size} expenses...", file=sys.stderr)
+        command = [sys.executable, "-m", "benchmarks.suite", "--run-size", str(size), "--requests", str(args.requests),
+                   "--concurrency", str(args.concurrency), "--seed", str(args.seed)]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, text=True, check=True)
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    results = {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "seed": args.seed},
+        "runs": runs,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            results["comparison"] = compare(results, json.load(baseline_file))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
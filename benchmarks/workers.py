@@ -0,0 +1,127 @@
+"""Throughput of the production launcher (backend/serve.py) by worker count.
+
+For every database URL and worker count, starts `python -m backend.serve` as a
+subprocess, waits until it answers, and drives a read/write mix over real HTTP
+with httpx. SQLite URLs get a fresh seeded file; other URLs (e.g. Postgres,
+which needs `pip install psycopg2-binary asyncpg`) must point to an empty
+database, which is seeded once on first use.
+
+Usage: python -m benchmarks.workers [--workers 1 2 4] [--database-url sqlite ...]
+           [--expenses 100000] [--requests 4000] [--concurrency 64] [--write-ratio 0.1]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import percentile, seed_database
+from backend.database import create_db_engine
+
+READ_PATHS = ["/expenses/?limit=50", "/expenses/compact?limit=50", "/categories/", "/tags/",
+              "/reports/summary?bucket=month", "/expenses/search?q=concrete"]
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextlib.contextmanager
+def server(db_url: str, workers: int):
+    import httpx
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.serve", "--workers", str(workers), "--host", "127.0.0.1",
+         "--port", str(port), "--app", "backend.main:app"],
+        env={**os.environ, "BRICKBYBRICK_DATABASE_URL": db_url},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(base_url + "/").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline or process.poll() is not None:
+                raise RuntimeError(f"Server with {workers} worker(s) did not start")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+async def drive(base_url: str, total_requests: int, concurrency: int, write_ratio: float, seed: int):
+    import httpx
+
+    rng = random.Random(seed)
+    plan = [("POST", None) if rng.random() < write_ratio else ("GET", rng.choice(READ_PATHS))
+            for _ in range(total_requests)]
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        category_id = (await client.get("/categories/")).json()[0]["id"]
+        pending = iter(enumerate(plan))
+
+        async def worker():
+            nonlocal errors
+            for i, (method, path) in pending:
+                started = time.perf_counter()
+                if method == "POST":
+                    response = await client.post("/expenses/", json={
+                        "title": f"Load test {i}", "amount": 10.0, "category_id": category_id})
+                else:
+                    response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "requests_per_second": round(total_requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--database-url", nargs="+", default=["sqlite"],
+                        help='"sqlite" for a temporary file, or full SQLAlchemy URLs')
+    parser.add_argument("--expenses", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = {"cpu_count": os.cpu_count(), "expenses": args.expenses, "write_ratio": args.write_ratio, "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for url in args.database_url:
+            db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}" if url == "sqlite" else url
+            print(f"Seeding {args.expenses} expenses into {db_url.split('://')[0]}...", file=sys.stderr)
+            engine = create_db_engine(db_url)
+            with contextlib.redirect_stdout(sys.stderr):
+                seed_database(engine, args.expenses, seed=args.seed)
+            engine.dispose()
+            for workers in args.workers:
+                print(f"  {workers} worker(s)...", file=sys.stderr)
+                with server(db_url, workers) as base_url:
+                    result = asyncio.run(drive(base_url, args.requests, args.concurrency, args.write_ratio, args.seed))
+                results["runs"].append({"backend": db_url.split("://")[0], "workers": workers, **result})
+    print(json.dumps(results, indent=2))
@@ -7,4 +7,25 @@ const api = axios.create({
     },
 });
 
+// The backend scopes every request to the project named in X-Project-Id;
+// without it, requests go to the default project.
+const PROJECT_STORAGE_KEY = 'brickbybrick.projectId';
+
+// Same as projects.DEFAULT_PROJECT_ID in the backend
+export const DEFAULT_PROJECT_ID = 1;
+
+export const getProjectId = () => localStorage.getItem(PROJECT_STORAGE_KEY);
+
+// Switching projects changes every response, so reload to drop cached state.
+export const setProjectId = (projectId) => {
+    localStorage.setItem(PROJECT_STORAGE_KEY, String(projectId));
+    window.location.reload();
+};
+
+api.interceptors.request.use(config => {
+    const projectId = getProjectId();
+    if (projectId) config.headers['X-Project-Id'] = projectId;
+    return config;
+});
+
 export default api;
@@ -0,0 +1,46 @@
+// Local copy of expenses and reference data, kept current through GET /sync.
+const ENTITIES = ['expenses', 'categories', 'sub_categories', 'phases', 'tags'];
+
+export const emptyStore = () => ({
+    token: 0,
+    ...Object.fromEntries(ENTITIES.map(entity => [entity, new Map()])),
+});
+
+// Merge a /sync response into a store; returns a new store object.
+export const applyChanges = (store, changes) => {
+    const next = changes.full ? emptyStore() : { ...store };
+    ENTITIES.forEach(entity => {
+        if (!changes.full) next[entity] = new Map(store[entity]);
+    });
+    // Deletions first: a deleted ID may already be reused by a new row
+    changes.deleted.forEach(({ entity, id }) => next[entity].delete(id));
+    ENTITIES.forEach(entity => {
+        changes[entity].forEach(row => next[entity].set(row.id, row));
+    });
+    next.token = changes.token;
+    return next;
+};
+
+export const fetchChanges = async (api, store) => {
+    const response = await api.get('/sync', { params: { since: store.token } });
+    return applyChanges(store, response.data);
+};
+
+// Expenses shaped like GET /expenses/ rows, with nested category, phase and tags.
+export const hydrateExpenses = (store) => {
+    const subCategoriesByCategory = new Map();
+    store.sub_categories.forEach(sub => {
+        if (!subCategoriesByCategory.has(sub.category_id)) subCategoriesByCategory.set(sub.category_id, []);
+        subCategoriesByCategory.get(sub.category_id).push(sub);
+    });
+    return Array.from(store.expenses.values(), expense => {
+        const category = store.categories.get(expense.category_id);
+        return {
+            ...expense,
+            category: category && { ...category, sub_categories: subCategoriesByCategory.get(category.id) || [] },
+            sub_category: store.sub_categories.get(expense.sub_category_id) || null,
+            phase: store.phases.get(expense.phase_id) || null,
+            tags: expense.tags.map(id => store.tags.get(id)).filter(Boolean),
+        };
+    });
+};
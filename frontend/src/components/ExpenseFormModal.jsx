@@ -52,14 +52,11 @@ const ExpenseForm = ({ isOpen, onClose, onSuccess, expense = null }) => {
 
     const fetchOptions = async () => {
         try {
-            const [catsRes, phasesRes, tagsRes] = await Promise.all([
-                api.get('/categories/'),
-                api.get('/phases/'),
-                api.get('/tags/'),
-            ]);
-            setCategories(catsRes.data);
-            setPhases(phasesRes.data);
-            setTags(tagsRes.data);
+            // One cached request for the whole category / phase / tag tree
+            const { data } = await api.get('/taxonomy');
+            setCategories(data.categories);
+            setPhases(data.phases);
+            setTags(data.tags);
         } catch (error) {
             console.error('Error fetching options:', error);
         }
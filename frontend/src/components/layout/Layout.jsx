@@ -2,6 +2,7 @@ import React from 'react';
 import { Link, useLocation } from 'react-router-dom';
 import { clsx } from 'clsx';
 import { Home, CreditCard, FileText, Grid, User } from 'lucide-react';
+import ProjectSelector from './ProjectSelector';
 
 const SidebarItem = ({ icon: Icon, label, to, active }) => {
     return (
@@ -92,6 +93,7 @@ const Layout = ({ children }) => {
                     </div>
 
                     <div className="flex items-center gap-3">
+                        <ProjectSelector />
                         <span className="text-sm font-medium text-[var(--color-text-primary)] hidden sm:block">Marvin Gärtner</span>
                         <div className="w-8 h-8 rounded-full bg-[var(--color-primary-light)] flex items-center justify-center text-[var(--color-primary)]">
                             <User size={18} />
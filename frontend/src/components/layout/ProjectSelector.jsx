@@ -0,0 +1,45 @@
+import React, { useEffect, useState } from 'react';
+import { Building2 } from 'lucide-react';
+import api, { DEFAULT_PROJECT_ID, getProjectId, setProjectId } from '../../api/api';
+
+const ProjectSelector = () => {
+    const [projects, setProjects] = useState([]);
+    const currentId = String(getProjectId() || DEFAULT_PROJECT_ID);
+
+    useEffect(() => {
+        fetchProjects();
+    }, []);
+
+    const fetchProjects = async () => {
+        try {
+            const response = await api.get('/projects/');
+            setProjects(response.data);
+        } catch (error) {
+            // The stored project was deleted: every request answers 404, so fall back to the default one
+            if (error.response?.status === 404 && currentId !== String(DEFAULT_PROJECT_ID)) {
+                setProjectId(DEFAULT_PROJECT_ID);
+                return;
+            }
+            console.error('Error fetching projects:', error);
+        }
+    };
+
+    if (projects.length < 2) return null;
+
+    return (
+        <label className="flex items-center gap-2 text-sm text-[var(--color-text-secondary)]">
+            <Building2 size={18} />
+            <select
+                value={currentId}
+                onChange={(e) => setProjectId(e.target.value)}
+                className="bg-white border border-[var(--color-border)] rounded-lg px-2 py-1 text-[var(--color-text-primary)] focus:outline-none focus:ring-2 focus:ring-[var(--color-primary)]"
+            >
+                {projects.map((project) => (
+                    <option key={project.id} value={String(project.id)}>{project.title}</option>
+                ))}
+            </select>
+        </label>
+    );
+};
+
+export default ProjectSelector;
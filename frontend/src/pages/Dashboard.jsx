@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import api from '../api/api';
+import { emptyStore, fetchChanges, hydrateExpenses } from '../api/sync';
 import ExpenseTable from '../components/ExpenseTable';
 import SummaryBar from '../components/SummaryBar';
 import ExpenseForm from '../components/ExpenseFormModal';
@@ -11,7 +12,8 @@ import ConfirmationModal from '../components/ui/ConfirmationModal';
 import { useNotification } from '../context/NotificationContext';
 
 const Dashboard = () => {
-    const [expenses, setExpenses] = useState([]);
+    const [store, setStore] = useState(emptyStore);
+    const storeRef = useRef(store);
     const [viewMode, setViewMode] = useState('timeline'); // 'timeline', 'category', 'phase'
     const [loading, setLoading] = useState(true);
     const [editingExpense, setEditingExpense] = useState(null);
@@ -28,12 +30,12 @@ const Dashboard = () => {
         fetchExpenses();
     }, []);
 
+    // The first call loads everything; later ones fetch only what changed since
     const fetchExpenses = async () => {
         try {
-            const response = await api.get('/expenses/');
-            // Sort by date desc by default
-            const sorted = response.data.sort((a, b) => new Date(b.purchase_date) - new Date(a.purchase_date));
-            setExpenses(sorted);
+            const next = await fetchChanges(api, storeRef.current);
+            storeRef.current = next;
+            setStore(next);
         } catch (error) {
             console.error('Error fetching expenses:', error);
         } finally {
@@ -41,6 +43,12 @@ const Dashboard = () => {
         }
     };
 
+    // Sort by date desc by default
+    const expenses = useMemo(
+        () => hydrateExpenses(store).sort((a, b) => new Date(b.purchase_date) - new Date(a.purchase_date)),
+        [store]
+    );
+
     const confirmDelete = (id) => {
         const expense = expenses.find(e => e.id === id);
         setDeleteConfig({
@@ -56,7 +64,7 @@ const Dashboard = () => {
         const id = deleteConfig.id;
         try {
             await api.delete(`/expenses/${id}`);
-            setExpenses(expenses.filter(e => e.id !== id));
+            await fetchExpenses();
             showNotification("Expense deleted successfully", 'success');
         } catch (error) {
             console.error("Error deleting expense:", error);
@@ -39,14 +39,11 @@ const Management = () => {
 
     const fetchData = async () => {
         try {
-            const [catsRes, phasesRes, tagsRes] = await Promise.all([
-                api.get('/categories/'),
-                api.get('/phases/'),
-                api.get('/tags/'),
-            ]);
-            setCategories(catsRes.data);
-            setPhases(phasesRes.data);
-            setTags(tagsRes.data);
+            // One cached request for the whole category / phase / tag tree
+            const { data } = await api.get('/taxonomy');
+            setCategories(data.categories);
+            setPhases(data.phases);
+            setTags(data.tags);
         } catch (error) {
             console.error('Error fetching data:', error);
         }
@@ -82,7 +79,7 @@ const Management = () => {
                     await api.post('/categories/', { title: inputValue });
                     break;
                 case 'EDIT_CATEGORY':
-                    await api.put(`/categories/${data.id}`, { title: inputValue, description: data.description });
+                    await api.put(`/categories/${data.id}`, { title: inputValue, description: data.description, budget: data.budget });
                     break;
                 case 'SUB_CATEGORY':
                     await api.post('/sub_categories/', { title: inputValue, category_id: data });
@@ -94,7 +91,7 @@ const Management = () => {
                     await api.post('/phases/', { title: inputValue });
                     break;
                 case 'EDIT_PHASE':
-                    await api.put(`/phases/${data.id}`, { title: inputValue });
+                    await api.put(`/phases/${data.id}`, { title: inputValue, description: data.description, budget: data.budget });
                     break;
                 case 'TAG':
                     await api.post('/tags/', { title: inputValue });
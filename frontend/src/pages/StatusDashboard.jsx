@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import api from '../api/api';
-import { PieChart, Pie, Cell, Tooltip, Legend, ResponsiveContainer, LineChart, Line, XAxis, YAxis, CartesianGrid } from 'recharts';
+import { PieChart, Pie, Cell, Tooltip, Legend, ResponsiveContainer, LineChart, Line, XAxis, YAxis, CartesianGrid, ReferenceLine } from 'recharts';
 import { formatCurrency } from '../utils';
 import Layout from '../components/layout/Layout';
 import Card from '../components/ui/Card';
@@ -9,16 +9,21 @@ import Card from '../components/ui/Card';
 const COLORS = ['#005EA8', '#0F9D58', '#004C8A', '#6B7280', '#D1E4F9', '#82ca9d', '#8884d8'];
 
 const StatusDashboard = () => {
-    const [expenses, setExpenses] = useState([]);
+    const [summary, setSummary] = useState(null);
+    const [forecast, setForecast] = useState(null);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const response = await api.get('/expenses/');
-                setExpenses(response.data);
+                const [summaryResponse, forecastResponse] = await Promise.all([
+                    api.get('/reports/summary'),
+                    api.get('/reports/forecast'),
+                ]);
+                setSummary(summaryResponse.data);
+                setForecast(forecastResponse.data);
             } catch (error) {
-                console.error('Error fetching expenses:', error);
+                console.error('Error fetching summary:', error);
             } finally {
                 setLoading(false);
             }
@@ -26,30 +31,23 @@ const StatusDashboard = () => {
         fetchData();
     }, []);
 
-    const processData = (key, nestedKey) => {
-        const data = {};
-        expenses.forEach(item => {
-            const label = nestedKey ? (item[key]?.[nestedKey] || 'Uncategorized') : (item[key] || 'Uncategorized');
-            data[label] = (data[label] || 0) + item.amount;
-        });
-        return Object.entries(data).map(([name, value]) => ({ name, value }));
-    };
+    const toChartData = (groups) => (groups || []).map(({ title, total }) => ({ name: title, value: total }));
 
-    const categoryData = useMemo(() => processData('category', 'title'), [expenses]);
-    const phaseData = useMemo(() => processData('phase', 'title'), [expenses]);
-    const subCategoryData = useMemo(() => processData('sub_category', 'title'), [expenses]);
+    const categoryData = useMemo(() => toChartData(summary?.by_category), [summary]);
+    const phaseData = useMemo(() => toChartData(summary?.by_phase), [summary]);
+    const subCategoryData = useMemo(() => toChartData(summary?.by_sub_category), [summary]);
 
-    const timeSeriesData = useMemo(() => {
-        const data = {};
-        expenses.forEach(item => {
-            const date = item.purchase_date; // Assuming YYYY-MM-DD
-            data[date] = (data[date] || 0) + item.amount;
-        });
-        // Sort by date
-        return Object.entries(data)
-            .sort((a, b) => new Date(a[0]) - new Date(b[0]))
-            .map(([date, amount]) => ({ date, amount }));
-    }, [expenses]);
+    // Buckets are already grouped and sorted by date on the server
+    const timeSeriesData = useMemo(
+        () => (summary?.by_date || []).map(({ date, total }) => ({ date, amount: total })),
+        [summary]
+    );
+
+    // Monthly running total from the forecast endpoint
+    const cumulativeData = useMemo(
+        () => (forecast?.series || []).map(({ date, cumulative }) => ({ date, cumulative })),
+        [forecast]
+    );
 
     if (loading) return (
         <Layout>
@@ -116,6 +114,45 @@ const StatusDashboard = () => {
                     </div>
                 </Card>
 
+                {/* Budget */}
+                {forecast && (
+                    <Card>
+                        <div className="flex flex-wrap items-baseline justify-between gap-4 mb-4">
+                            <h3 className="text-lg font-semibold text-[var(--color-text-primary)]">Budget Burn</h3>
+                            <div className="flex flex-wrap gap-6 text-sm text-[var(--color-text-secondary)]">
+                                <span>Spent: {formatCurrency(forecast.spent)}</span>
+                                {forecast.budget != null && <span>Budget: {formatCurrency(forecast.budget)}</span>}
+                                <span>Burn rate: {formatCurrency(forecast.daily_burn_rate * 30)} / month</span>
+                                {forecast.budget_exhausted_on && <span>Budget used up by: {forecast.budget_exhausted_on}</span>}
+                            </div>
+                        </div>
+                        <div className="h-[300px] w-full">
+                            <ResponsiveContainer width="100%" height="100%">
+                                <LineChart data={cumulativeData}>
+                                    <CartesianGrid strokeDasharray="3 3" stroke="var(--color-border)" />
+                                    <XAxis dataKey="date" stroke="var(--color-text-secondary)" />
+                                    <YAxis stroke="var(--color-text-secondary)" />
+                                    <Tooltip
+                                        formatter={(value) => formatCurrency(value)}
+                                        contentStyle={{ borderRadius: '8px', border: '1px solid var(--color-border)' }}
+                                    />
+                                    <Legend />
+                                    {forecast.budget != null && (
+                                        <ReferenceLine y={forecast.budget} stroke="#0F9D58" strokeDasharray="6 4" label="Budget" />
+                                    )}
+                                    <Line
+                                        type="monotone"
+                                        dataKey="cumulative"
+                                        stroke="var(--color-primary)"
+                                        strokeWidth={2}
+                                        activeDot={{ r: 6, fill: 'var(--color-primary)' }}
+                                    />
+                                </LineChart>
+                            </ResponsiveContainer>
+                        </div>
+                    </Card>
+                )}
+
                 {/* Pie Charts */}
                 <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                     {renderPieChart("Investments by Category", categoryData)}
@@ -1,64 +1,283 @@
+"""Demo data and a synthetic data generator for capacity tests.
+
+    python seed_data.py
+    python seed_data.py --projects 5 --expenses 1000000 --seed 7
+
+Without options it gives the default project the reference data below
+(phases, categories, sub-categories, tags). --projects N fills the first N
+projects, creating missing ones, and --expenses adds that many synthetic
+expenses to each. Rows are bulk inserted, one executemany and one transaction
+per batch, and the achieved rows per second are printed. The same seed always
+produces the same rows.
+"""
+import argparse
+import datetime
+import itertools
+import random
+import time
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 from backend.database import SessionLocal, engine
-from backend import models
+from backend import cache, crud, models, projects, rollups, schemas, search, startup, sync
+from backend.cache import reference_cache
 
-def seed_data():
-    db = SessionLocal()
-    
-    # Ensure tables exist
-    models.Base.metadata.create_all(bind=engine)
-
-    # Check if data exists
-    if db.query(models.Category).first():
-        print("Data already exists.")
-        return
-
-    print("Seeding data...")
-
-    # Phases
-    phases_data = [
-        {"title": "Planning", "description": "Blueprints, permits, land survey"},
-        {"title": "Foundation", "description": "Excavation, concrete, waterproofing"},
-        {"title": "Structure", "description": "Framing, roofing, windows"},
-        {"title": "Utilities", "description": "Electrical, plumbing, HVAC"},
-        {"title": "Finishing", "description": "Drywall, flooring, painting"},
-        {"title": "Landscaping", "description": "Garden, driveway, fencing"},
+# (title, description, share of the project's duration)
+PHASES = [
+    ("Planning", "Blueprints, permits, land survey", 0.08),
+    ("Foundation", "Excavation, concrete, waterproofing", 0.12),
+    ("Structure", "Framing, roofing, windows", 0.25),
+    ("Utilities", "Electrical, plumbing, HVAC", 0.20),
+    ("Finishing", "Drywall, flooring, painting", 0.25),
+    ("Landscaping", "Garden, driveway, fencing", 0.10),
+]
+
+# title: (sub-categories, median amount, share of the expenses)
+CATEGORIES = {
+    "Structure": (["Concrete", "Steel", "Bricks", "Lumber", "Roofing Materials"], 800.0, 0.35),
+    "Interior": (["Furniture", "Appliances", "Lighting", "Decor"], 250.0, 0.20),
+    "Utilities": (["Electrical Wiring", "Plumbing Pipes", "HVAC Unit", "Water Heater"], 400.0, 0.20),
+    "Landscaping": (["Plants", "Soil", "Fencing", "Paving Stones"], 150.0, 0.15),
+    "Permits & Fees": (["Building Permit", "Architect Fee", "Inspection Fee"], 600.0, 0.10),
+}
+
+# title: how often it is picked relative to the others
+TAGS = {
+    "Invoice": 5, "Receipt": 5, "Contractor": 3, "DIY": 2,
+    "Deposit": 1, "Warranty": 1, "Rental": 1, "Urgent": 1,
+}
+
+# Probability of an expense carrying 0, 1, 2 or 3 tags
+TAG_FAN_OUT = [0.30, 0.40, 0.20, 0.10]
+
+# Spread over the category budgets of each seeded project
+PROJECT_BUDGET = 450000.0
+
+DEFAULT_MEDIAN_AMOUNT = 300.0
+AMOUNT_SIGMA = 1.0
+
+def _report(label: str, rows: int, seconds: float):
+    rate = rows / seconds if seconds > 0 else 0.0
+    print(f"{label}: {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+
+def seed_reference_data(db: Session):
+    """Insert the phases, categories, sub-categories and tags of the session's
+    project in one transaction; returns the number of rows."""
+    project_id = projects.project_for_insert(db)
+    phases = [{"project_id": project_id, "title": title, "description": description}
+              for title, description, _ in PHASES]
+    db.execute(insert(models.ConstructionPhase.__table__), phases)
+
+    category_table = models.Category.__table__
+    categories = [
+        {"project_id": project_id, "title": title, "description": f"Expenses related to {title}",
+         "budget": round(PROJECT_BUDGET * share, 2)}
+        for title, (_, _, share) in CATEGORIES.items()
     ]
-    
-    phases = {}
-    for p_data in phases_data:
-        phase = models.ConstructionPhase(**p_data)
-        db.add(phase)
-        db.commit()
-        db.refresh(phase)
-        phases[phase.title] = phase
-        print(f"Created phase: {phase.title}")
-
-    # Categories and Sub-categories
-    categories_data = {
-        "Structure": ["Concrete", "Steel", "Bricks", "Lumber", "Roofing Materials"],
-        "Interior": ["Furniture", "Appliances", "Lighting", "Decor"],
-        "Utilities": ["Electrical Wiring", "Plumbing Pipes", "HVAC Unit", "Water Heater"],
-        "Landscaping": ["Plants", "Soil", "Fencing", "Paving Stones"],
-        "Permits & Fees": ["Building Permit", "Architect Fee", "Inspection Fee"]
-    }
-
-    for cat_title, sub_cats in categories_data.items():
-        category = models.Category(title=cat_title, description=f"Expenses related to {cat_title}")
-        db.add(category)
-        db.commit()
-        db.refresh(category)
-        print(f"Created category: {category.title}")
-
-        for sub_title in sub_cats:
-            sub = models.SubCategory(title=sub_title, category_id=category.id, description=f"{sub_title} for {cat_title}")
-            db.add(sub)
-            print(f"  - Created sub-category: {sub_title}")
-        
+    category_ids = dict(db.execute(
+        insert(category_table).returning(category_table.c.title, category_table.c.id), categories
+    ).all())
+    sub_categories = [
+        {"project_id": project_id, "title": sub_title, "category_id": category_ids[title],
+         "description": f"{sub_title} for {title}"}
+        for title, (sub_titles, _, _) in CATEGORIES.items()
+        for sub_title in sub_titles
+    ]
+    db.execute(insert(models.SubCategory.__table__), sub_categories)
+
+    tags = [{"project_id": project_id, "title": title} for title in TAGS]
+    db.execute(insert(models.Tag.__table__), tags)
+    db.commit()
+    reference_cache.bump("categories", "sub_categories", "phases", "tags", "forecast", "taxonomy")
+    return len(phases) + len(categories) + len(sub_categories) + len(tags)
+
+def seed_data():
+    """Give the default project the demo reference data, unless it has categories."""
+    startup.prepare_database()
+    with SessionLocal() as db:
+        projects.scope(db, projects.DEFAULT_PROJECT_ID)
+        if db.query(models.Category.id).first():
+            print("Data already exists.")
+            return
+        started = time.perf_counter()
+        rows = seed_reference_data(db)
+        _report("Reference data", rows, time.perf_counter() - started)
+
+# Words used to build synthetic expense titles and notes
+EXPENSE_WORDS = [
+    "concrete", "delivery", "cement", "rebar", "timber", "screws", "tiles", "paint", "cable", "pipe",
+    "insulation", "window", "door", "gravel", "sand", "plaster", "roof", "gutter", "pump", "valve",
+]
+
+def _cumulative(weights):
+    # random.choices re-adds plain weights on every call
+    return list(itertools.accumulate(weights))
+
+_TAG_FAN_OUT_CUMULATIVE = _cumulative(TAG_FAN_OUT)
+
+class ExpenseSampler:
+    """Draws synthetic expenses from the reference data of one project.
+
+    The build runs through the phases in order, each over its share of the
+    period, and spends in proportion to that share. Purchases cluster on
+    weekdays, amounts are log-normal around a per-category median, categories
+    and tags are picked by their weights and most expenses carry 0-2 tags.
+    Reference rows with titles not listed above get neutral weights.
+    """
+    def __init__(self, db: Session, rng: random.Random, start_date: datetime.date, days: int):
+        self.rng = rng
+        sub_categories = db.query(models.SubCategory.id, models.SubCategory.category_id) \
+            .order_by(models.SubCategory.id).all()
+        if not sub_categories:
+            raise ValueError("No sub-categories found; run seed_data() first.")
+        subs_by_category = {}
+        for sub_category_id, category_id in sub_categories:
+            subs_by_category.setdefault(category_id, []).append(sub_category_id)
+
+        categories = db.query(models.Category.id, models.Category.title) \
+            .filter(models.Category.id.in_(subs_by_category)).order_by(models.Category.id).all()
+        self.categories = [(id_, subs_by_category[id_], CATEGORIES.get(title, (None, DEFAULT_MEDIAN_AMOUNT))[1])
+                           for id_, title in categories]
+        self.category_weights = _cumulative([CATEGORIES.get(title, (None, None, 0.1))[2] for _, title in categories])
+
+        # Consecutive date windows, one per phase, in ID order
+        phases = db.query(models.ConstructionPhase.id, models.ConstructionPhase.title) \
+            .order_by(models.ConstructionPhase.id).all()
+        shares = {title: share for title, _, share in PHASES}
+        weights = [shares.get(title, 1.0 / max(len(phases), 1)) for _, title in phases]
+        total = sum(weights) or 1.0
+        self.phases = []
+        offset = 0.0
+        for (phase_id, _), weight in zip(phases, weights):
+            length = max(int(days * weight / total), 1)
+            self.phases.append((phase_id, start_date + datetime.timedelta(days=int(offset)), length))
+            offset += days * weight / total
+        self.phase_weights = _cumulative(weights)
+        self.start_date = start_date
+        self.days = days
+
+        tags = db.query(models.Tag.id, models.Tag.title).order_by(models.Tag.id).all()
+        self.tag_ids = [id_ for id_, _ in tags]
+        self.tag_weights = _cumulative([TAGS.get(title, 1) for _, title in tags])
+
+    def _purchase_date(self):
+        rng = self.rng
+        if self.phases:
+            phase_id, first, length = rng.choices(self.phases, cum_weights=self.phase_weights)[0]
+        else:
+            phase_id, first, length = None, self.start_date, self.days
+        day = first + datetime.timedelta(days=rng.randrange(length))
+        # Most weekend purchases move to the nearest weekday
+        if day.weekday() >= 5 and rng.random() < 0.85:
+            day += datetime.timedelta(days=-1 if day.weekday() == 5 else 1)
+        return phase_id, day
+
+    def _tags(self):
+        count = min(self.rng.choices(range(len(TAG_FAN_OUT)), cum_weights=_TAG_FAN_OUT_CUMULATIVE)[0], len(self.tag_ids))
+        picked = []
+        while len(picked) < count:
+            tag_id = self.rng.choices(self.tag_ids, cum_weights=self.tag_weights)[0]
+            if tag_id not in picked:
+                picked.append(tag_id)
+        return picked
+
+    def expense(self, expense_id: int, project_id: int, today: datetime.date):
+        rng = self.rng
+        category_id, sub_category_ids, median = rng.choices(self.categories, cum_weights=self.category_weights)[0]
+        phase_id, purchase_date = self._purchase_date()
+        words = rng.sample(EXPENSE_WORDS, 3)
+        row = {
+            "id": expense_id,
+            "project_id": project_id,
+            "title": f"{words[0].capitalize()} {words[1]}",
+            "amount": round(rng.lognormvariate(0, AMOUNT_SIGMA) * median, 2),
+            "description": None,
+            "notes": f"{words[2].capitalize()} for site work" if rng.random() < 0.3 else None,
+            # Entered into the app a few days after the purchase
+            "creation_date": min(purchase_date + datetime.timedelta(days=rng.randrange(8)), today),
+            "purchase_date": purchase_date,
+            "category_id": category_id,
+            "sub_category_id": rng.choice(sub_category_ids) if rng.random() < 0.8 else None,
+            "phase_id": phase_id if rng.random() < 0.8 else None,
+        }
+        return row, self._tags()
+
+def generate_expenses(db: Session, count: int, seed: int = 42, batch_size: int = 10000,
+                      start_date: datetime.date = datetime.date(2023, 1, 1), days: int = 730):
+    """Bulk insert count synthetic expenses spread over the existing reference data
+    of the session's project (see backend.projects.scope).
+
+    The same seed always produces the same rows. Each batch of expenses and
+    their tag links goes in with one executemany per table and one commit, and
+    the rollup table is rebuilt once at the end.
+    """
+    sampler = ExpenseSampler(db, random.Random(seed), start_date, days)
+    project_id = projects.project_for_insert(db)
+    expense_table = models.Expense.__table__
+    expense_tag_table = models.ExpenseTag.__table__
+    # IDs are shared by all projects; the table is not filtered by the project scope
+    next_id = (db.execute(select(func.max(expense_table.c.id))).scalar() or 0) + 1
+    today = datetime.date.today()
+    inserted = 0
+    while inserted < count:
+        expenses = []
+        expense_tags = []
+        # Set the change tracking columns up front instead of per-row column defaults
+        tracking = {"updated_at": models.utcnow(), "change_seq": sync.transaction_token(db.connection())}
+        for expense_id in range(next_id + inserted, next_id + min(count, inserted + batch_size)):
+            row, tag_ids = sampler.expense(expense_id, project_id, today)
+            row.update(tracking)
+            expenses.append(row)
+            expense_tags += [{"expense_id": expense_id, "tag_id": tag_id} for tag_id in tag_ids]
+        db.execute(insert(expense_table), expenses)
+        if expense_tags:
+            db.execute(insert(expense_tag_table), expense_tags)
         db.commit()
+        inserted += len(expenses)
+    rollups.rebuild(db)
+    return inserted
+
+def _projects(db: Session, count: int):
+    """IDs of the first count projects, creating the missing ones."""
+    project_ids = [id_ for (id_,) in db.query(models.Project.id).order_by(models.Project.id).limit(count)]
+    for number in range(len(project_ids) + 1, count + 1):
+        project = crud.create_project(db, schemas.ProjectCreate(title=f"Synthetic project {number}"))
+        project_ids.append(project.id)
+    return project_ids
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed reference data and synthetic expenses.")
+    parser.add_argument("--projects", type=int, default=1, help="Number of projects to fill (default 1)")
+    parser.add_argument("--expenses", type=int, default=0, help="Synthetic expenses per project (default 0)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Expenses per insert and transaction")
+    parser.add_argument("--start-date", type=datetime.date.fromisoformat, default=datetime.date(2023, 1, 1),
+                        help="Start of the first project (ISO date)")
+    parser.add_argument("--days", type=int, default=730, help="Duration of each project in days")
+    args = parser.parse_args()
+    if args.projects < 1 or args.expenses < 0 or args.batch_size < 1 or args.days < 1:
+        parser.error("--projects, --batch-size and --days must be positive, --expenses not negative")
 
-    db.close()
-    print("Seeding complete!")
+    startup.prepare_database()
+    started = time.perf_counter()
+    reference_rows = expense_rows = 0
+    with search.bulk_load(engine), SessionLocal() as db:
+        for index, project_id in enumerate(_projects(db, args.projects)):
+            projects.scope(db, project_id)
+            if not db.query(models.Category.id).first():
+                reference_rows += seed_reference_data(db)
+            if args.expenses:
+                project_started = time.perf_counter()
+                # Projects overlap but start a month and a half apart
+                start_date = args.start_date + datetime.timedelta(days=45 * index)
+                inserted = generate_expenses(db, args.expenses, seed=args.seed + index, batch_size=args.batch_size,
+                                             start_date=start_date, days=args.days)
+                _report(f"Project {project_id} expenses", inserted, time.perf_counter() - project_started)
+                expense_rows += inserted
+    # A running multi-worker server reads its cache versions from the database
+    cache.DatabaseVersions(engine).bump(
+        ["projects", "categories", "sub_categories", "phases", "tags", "forecast", "taxonomy"]
+    )
+    _report("Total", reference_rows + expense_rows, time.perf_counter() - started)
 
 if __name__ == "__main__":
-    seed_data()
+    main()
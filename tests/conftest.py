@@ -0,0 +1,41 @@
+"""Shared fixtures. The test session runs against a fresh SQLite file; each
+test works in its own project, so tests never see each other's rows."""
+import itertools
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="brickbybrick-tests-")
+os.environ["BRICKBYBRICK_DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/test.db"
+os.environ["BRICKBYBRICK_BLOB_DIR"] = os.path.join(_TMP_DIR, "blobs")
+
+import pytest
+from fastapi.testclient import TestClient
+from backend import async_main, main
+
+_project_numbers = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def async_client(client):
+    """The BRICKBYBRICK_ASYNC=1 app on the same database."""
+    with TestClient(async_main.app) as test_client:
+        yield test_client
+
+def _new_project(client):
+    response = client.post("/projects/", json={"title": f"Test project {next(_project_numbers)}"})
+    assert response.status_code == 200
+    return {"X-Project-Id": str(response.json()["id"])}
+
+@pytest.fixture
+def project(client):
+    """Headers for a new, empty project."""
+    return _new_project(client)
+
+@pytest.fixture
+def other_project(client):
+    """Headers for a second new project, for isolation tests."""
+    return _new_project(client)
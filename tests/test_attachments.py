@@ -0,0 +1,72 @@
+"""Attachment uploads, ranged downloads and blob garbage collection."""
+import hashlib
+import os
+import pytest
+from sqlalchemy import select
+from backend import blobs, database, models
+
+CONTENT = bytes(range(256)) * 40
+
+@pytest.fixture
+def expense(client, project):
+    category = client.post("/categories/", headers=project, json={"title": "Shell"}).json()
+    response = client.post("/expenses/", headers=project, json={"title": "Bricks", "amount": 10, "category_id": category["id"]})
+    return project, response.json()["id"]
+
+def upload(client, expense, content=CONTENT, filename="receipt.pdf"):
+    headers, expense_id = expense
+    response = client.post(f"/expenses/{expense_id}/attachments", headers={**headers, "Content-Type": "application/pdf"},
+                           params={"filename": filename}, content=content)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_single_range_returns_partial_content(client, expense):
+    attachment = upload(client, expense)
+    url = f"/attachments/{attachment['id']}"
+    response = client.get(url, headers={**expense[0], "Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == "100"
+
+    response = client.get(url, headers={**expense[0], "Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[-10:]
+
+def test_unsatisfiable_range_returns_416(client, expense):
+    attachment = upload(client, expense)
+    response = client.get(f"/attachments/{attachment['id']}",
+                          headers={**expense[0], "Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+def test_head_sends_headers_only(client, expense):
+    attachment = upload(client, expense)
+    response = client.head(f"/attachments/{attachment['id']}", headers=expense[0])
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["Content-Length"] == str(len(CONTENT))
+    assert response.headers["ETag"] == f'"{attachment["sha256"]}"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+def test_identical_uploads_share_one_blob(client, expense):
+    first = upload(client, expense, filename="receipt.pdf")
+    second = upload(client, expense, filename="copy.pdf")
+    assert first["id"] != second["id"]
+    assert first["sha256"] == second["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    blob_dir = os.path.dirname(blobs.blob_store.path(first["sha256"]))
+    assert os.listdir(blob_dir) == [first["sha256"]]
+
+def test_gc_keeps_referenced_blobs(client, expense):
+    kept = upload(client, expense, content=b"kept receipt")
+    dropped = upload(client, expense, content=b"dropped receipt")
+    assert client.delete(f"/attachments/{dropped['id']}", headers=expense[0]).status_code == 200
+
+    with database.SessionLocal() as db:
+        referenced = set(db.scalars(select(models.Attachment.sha256).distinct()))
+    blobs.blob_store.collect_garbage(referenced, grace_seconds=0)
+
+    assert os.path.exists(blobs.blob_store.path(kept["sha256"]))
+    assert not os.path.exists(blobs.blob_store.path(dropped["sha256"]))
+    response = client.get(f"/attachments/{kept['id']}", headers=expense[0])
+    assert response.content == b"kept receipt"
@@ -0,0 +1,20 @@
+"""/batch returns rows shaped like the read schemas."""
+
+def test_batch_results_hide_internal_columns(client, project):
+    operations = [
+        {"entity": "category", "action": "create", "data": {"title": "Shell", "budget": 100}, "ref": "cat"},
+        {"entity": "tag", "action": "create", "data": {"title": "Invoice"}, "ref": "tag"},
+        {"entity": "expense", "action": "create", "ref": "exp",
+         "data": {"title": "Bricks", "amount": 12.5, "category_id": "@cat", "tags": ["@tag"]}},
+        {"entity": "expense", "action": "update", "id": "@exp",
+         "data": {"title": "Bricks", "amount": 13.0, "category_id": "@cat", "tags": []}},
+    ]
+    response = client.post("/batch", headers=project, json={"operations": operations})
+    assert response.status_code == 200
+    category, tag, created, updated = [result["data"] for result in response.json()["results"]]
+    for data in (category, tag, created, updated):
+        assert not {"project_id", "updated_at", "change_seq", "amount_cents"} & data.keys()
+    assert category == {"id": category["id"], "title": "Shell", "description": None, "budget": 100.0}
+    assert tag == {"id": tag["id"], "title": "Invoice"}
+    assert created["amount"] == 12.5 and created["tags"] == [tag["id"]]
+    assert updated["amount"] == 13.0 and updated["tags"] == []
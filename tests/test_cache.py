@@ -0,0 +1,44 @@
+"""Cached reference lists answer If-None-Match with 304 until a write."""
+import pytest
+
+@pytest.fixture(params=["sync", "async"])
+def app_client(request, client, async_client):
+    return client if request.param == "sync" else async_client
+
+@pytest.mark.parametrize("url, create", [
+    ("/categories/", ("/categories/", {"title": "Shell"})),
+    ("/phases/", ("/phases/", {"title": "Phase 1"})),
+    ("/tags/", ("/tags/", {"title": "Invoice"})),
+    ("/taxonomy", ("/tags/", {"title": "Invoice"})),
+])
+def test_if_none_match_until_a_write(app_client, project, url, create):
+    response = app_client.get(url, headers=project)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = app_client.get(url, headers={**project, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    assert app_client.post(create[0], headers=project, json=create[1]).status_code == 200
+    response = app_client.get(url, headers={**project, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert create[1]["title"] in response.text
+
+def test_expense_write_changes_forecast_etag(app_client, project):
+    category = app_client.post("/categories/", headers=project, json={"title": "Shell", "budget": 500}).json()
+    etag = app_client.get("/reports/forecast", headers=project).headers["ETag"]
+    assert app_client.get("/reports/forecast", headers={**project, "If-None-Match": etag}).status_code == 304
+
+    app_client.post("/expenses/", headers=project, json={"title": "Bricks", "amount": 10, "category_id": category["id"]})
+    response = app_client.get("/reports/forecast", headers={**project, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_projects_get_separate_etags(client, project):
+    other = {"X-Project-Id": str(client.post("/projects/", json={"title": "Cache neighbour"}).json()["id"])}
+    etag = client.get("/categories/", headers=project).headers["ETag"]
+    assert client.get("/categories/", headers={**other, "If-None-Match": etag}).status_code == 200
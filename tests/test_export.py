@@ -0,0 +1,18 @@
+"""Each export format is distinguishable from the response alone."""
+import pytest
+
+@pytest.mark.parametrize("fmt, media_type, filename", [
+    ("csv", "text/csv", "expenses.csv"),
+    ("ndjson", "application/x-ndjson", "expenses.ndjson"),
+    ("columnar", "application/x-ndjson; layout=columnar", "expenses.columnar.ndjson"),
+])
+def test_export_headers(client, project, fmt, media_type, filename):
+    response = client.get(f"/expenses/export?format={fmt}", headers=project)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(media_type)
+    assert f'filename="{filename}"' in response.headers["content-disposition"]
+
+def test_columnar_export_is_not_imported_as_rows(client, project):
+    response = client.post("/expenses/bulk", headers={**project, "content-type": "application/x-ndjson; layout=columnar"},
+                           content='{"columns": ["title"]}\n')
+    assert response.status_code == 400
@@ -0,0 +1,27 @@
+"""The forecast series is aggregated in SQL over integer cents and must come
+back in currency units."""
+import pytest
+
+def add_expense(client, headers, category_id, amount, purchase_date):
+    response = client.post("/expenses/", headers=headers, json={
+        "title": "Delivery", "amount": amount, "purchase_date": purchase_date, "category_id": category_id,
+    })
+    assert response.status_code == 200
+
+@pytest.fixture
+def category_id(client, project):
+    return client.post("/categories/", headers=project, json={"title": "Shell"}).json()["id"]
+
+def test_single_bucket_rolling_average_equals_spent(client, project, category_id):
+    add_expense(client, project, category_id, 10.10, "2024-03-05")
+    series = client.get("/reports/forecast", headers=project).json()["series"]
+    assert len(series) == 1
+    assert series[0]["spent"] == 10.1
+    assert series[0]["rolling_average"] == series[0]["spent"]
+
+def test_rolling_average_is_in_currency_units(client, project, category_id):
+    add_expense(client, project, category_id, 10.10, "2024-03-05")
+    add_expense(client, project, category_id, 20.20, "2024-04-05")
+    series = client.get("/reports/forecast", headers=project).json()["series"]
+    assert [point["cumulative"] for point in series] == [10.1, 30.3]
+    assert series[1]["rolling_average"] == pytest.approx(15.15)
@@ -0,0 +1,89 @@
+"""POST /expenses/bulk: CSV and NDJSON bodies, per-row errors and partial imports."""
+import json
+import pytest
+
+CSV_BODY = """title,amount,purchase_date,category,sub_category,phase,tags
+Bricks,100.50,2024-03-01,Shell,Walls,Phase 1,Invoice;Paid
+Cement,abc,2024-03-02,Shell,,,
+Tiles,55,2024-03-03,Roof,,,
+Mortar,12,2024-03-04,Shell,Doors,,
+Anchors,7.25,,Shell,,,Invoice
+"""
+
+RECORDS = [
+    {"title": "Bricks", "amount": 100.5, "purchase_date": "2024-03-01", "category": "Shell",
+     "sub_category": "Walls", "phase": "Phase 1", "tags": ["Invoice", "Paid"]},
+    {"title": "Cement", "amount": "abc", "purchase_date": "2024-03-02", "category": "Shell"},
+    {"title": "Tiles", "amount": 55, "purchase_date": "2024-03-03", "category": "Roof"},
+    {"title": "Mortar", "amount": 12, "purchase_date": "2024-03-04", "category": "Shell", "sub_category": "Doors"},
+    {"title": "Anchors", "amount": 7.25, "category": "Shell", "tags": ["Invoice"]},
+]
+
+@pytest.fixture
+def references(client, project):
+    category = client.post("/categories/", headers=project, json={"title": "Shell"}).json()
+    client.post("/sub_categories/", headers=project, json={"title": "Walls", "category_id": category["id"]})
+    client.post("/phases/", headers=project, json={"title": "Phase 1"})
+    for title in ("Invoice", "Paid"):
+        client.post("/tags/", headers=project, json={"title": title})
+    return project
+
+def bulk(client, headers, body, content_type, **params):
+    return client.post("/expenses/bulk", headers={**headers, "Content-Type": content_type},
+                       params=params, content=body)
+
+def imported_expenses(client, headers):
+    expenses = client.get("/expenses/", headers=headers, params={"sort": "id"}).json()
+    return [
+        (expense["title"], expense["amount"], expense["sub_category"] and expense["sub_category"]["title"],
+         expense["phase"] and expense["phase"]["title"], sorted(tag["title"] for tag in expense["tags"]))
+        for expense in expenses
+    ]
+
+def assert_partial_import(report):
+    assert report["total_rows"] == 5
+    assert report["imported"] == 2
+    assert report["failed"] == 3
+    errors = {error["row"]: error["error"] for error in report["errors"]}
+    assert sorted(errors) == [2, 3, 4]
+    assert "amount" in errors[2]
+    assert errors[3] == "Unknown category 'Roof'"
+    assert errors[4] == "Unknown sub-category 'Doors' for this category"
+
+def test_csv_import_reports_failed_rows_and_keeps_the_rest(client, references):
+    response = bulk(client, references, CSV_BODY, "text/csv")
+    assert response.status_code == 200
+    assert_partial_import(response.json())
+    assert imported_expenses(client, references) == [
+        ("Bricks", 100.5, "Walls", "Phase 1", ["Invoice", "Paid"]),
+        ("Anchors", 7.25, None, None, ["Invoice"]),
+    ]
+
+def test_ndjson_import_matches_csv(client, references):
+    body = "\n".join(json.dumps(record) for record in RECORDS)
+    response = bulk(client, references, body, "application/x-ndjson")
+    assert response.status_code == 200
+    assert_partial_import(response.json())
+    assert imported_expenses(client, references) == [
+        ("Bricks", 100.5, "Walls", "Phase 1", ["Invoice", "Paid"]),
+        ("Anchors", 7.25, None, None, ["Invoice"]),
+    ]
+
+def test_malformed_rows_are_reported(client, references):
+    body = '{"title": "Bricks", "amount": 1, "category": "Shell"}\nnot json\n[1, 2]\n'
+    report = bulk(client, references, body, "text/plain", format="ndjson").json()
+    assert report["imported"] == 1
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert report["errors"][1]["error"] == "Expected a JSON object"
+
+    report = bulk(client, references, "title,amount,category\nCement,5,Shell,extra\n", "text/csv").json()
+    assert report["errors"] == [{"row": 1, "error": "Too many fields in row"}]
+
+def test_small_batches_import_the_same_rows(client, references):
+    report = bulk(client, references, CSV_BODY, "text/csv", batch_size=1).json()
+    assert report["imported"] == 2
+    assert len(imported_expenses(client, references)) == 2
+
+def test_unknown_format_is_rejected(client, references):
+    response = bulk(client, references, CSV_BODY, "text/csv", format="xlsx")
+    assert response.status_code == 400
@@ -0,0 +1,20 @@
+"""SQL timings pair each statement with its own start time, also after errors."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from backend import database, metrics
+
+def test_failed_statements_leave_no_timing_state(monkeypatch):
+    clock = iter([100.0, 110.0, 200.0, 201.0])
+    monkeypatch.setattr(metrics, "_clock", lambda: next(clock))
+    observed = []
+    monkeypatch.setattr(metrics.sql_duration, "observe", observed.append)
+    with database.engine.connect() as conn:
+        # conn.info belongs to the pooled DBAPI connection and outlives this checkout
+        info_before = {key: list(value) if isinstance(value, list) else value for key, value in conn.info.items()}
+        for _ in range(2):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info == info_before
+    assert observed == [1.0]
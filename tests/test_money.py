@@ -0,0 +1,24 @@
+"""Money results are floats in currency units, whatever type the driver returns."""
+import datetime
+from decimal import Decimal
+from sqlalchemy.dialects import postgresql
+from backend import crud, models
+
+def result(value):
+    return models.Money().process_result_value(value, postgresql.dialect())
+
+def test_decimal_sum_is_a_float():
+    # Postgres returns SUM(bigint) and AVG(bigint) as numeric
+    assert result(Decimal("1010")) == 10.1
+    assert isinstance(result(Decimal("1010")), float)
+    assert result(Decimal("1515.5")) == 15.155
+    assert result(1010) == 10.1
+    assert result(None) is None
+
+def test_projection_accepts_a_decimal_sum():
+    today = datetime.date(2024, 1, 1)
+    spent = result(Decimal("1010"))
+    remaining, exhausted_on, projected_total = crud._projection(spent, 20.0, 1.0, today, today + datetime.timedelta(days=5))
+    assert remaining == 9.9
+    assert exhausted_on == today + datetime.timedelta(days=9)
+    assert projected_total == 15.1
@@ -0,0 +1,75 @@
+"""Keyset pagination: following next_cursor visits every expense exactly once,
+in the same order as a single unpaged request."""
+import base64
+import pytest
+
+SORTS = ["purchase_date", "-purchase_date", "amount", "-amount", "title", "-title", "id", "-id"]
+
+@pytest.fixture
+def expenses(client, project):
+    category = client.post("/categories/", headers=project, json={"title": "Shell"}).json()
+    # Repeated dates, amounts and titles so every sort has ties; a missing date defaults to today
+    rows = [
+        ("Bricks", 50, "2024-03-01"), ("Bricks", 50, "2024-03-01"), ("Cement", 20, "2024-03-01"),
+        ("Cement", 75, "2024-02-10"), ("Windows", 20, None), ("Anchors", 75, "2024-04-15"),
+        ("Bricks", 10, "2024-02-10"),
+    ]
+    for title, amount, purchase_date in rows:
+        response = client.post("/expenses/", headers=project, json={
+            "title": title, "amount": amount, "purchase_date": purchase_date, "category_id": category["id"],
+        })
+        assert response.status_code == 200
+    return project
+
+def page_through(client, headers, sort, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        params = {"sort": sort, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/expenses/compact", headers=headers, params=params).json()
+        ids += [row["id"] for row in page["expenses"]]
+        cursor, pages = page["next_cursor"], pages + 1
+        if cursor is None:
+            return ids, pages
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_cursor_pages_match_unpaged_order(client, expenses, sort):
+    unpaged = [row["id"] for row in client.get(
+        "/expenses/compact", headers=expenses, params={"sort": sort, "limit": 100}).json()["expenses"]]
+    assert len(unpaged) == 7
+
+    for limit in (1, 2, 3):
+        ids, pages = page_through(client, expenses, sort, limit)
+        assert ids == unpaged
+        # A full last page is followed by one empty page that ends the walk
+        assert pages == 7 // limit + 1
+
+def test_ties_are_broken_on_id(client, expenses):
+    rows = client.get("/expenses/compact", headers=expenses, params={"sort": "-purchase_date", "limit": 100}).json()["expenses"]
+    assert len({row["purchase_date"] for row in rows}) < len(rows)
+    for first, second in zip(rows, rows[1:]):
+        if first["purchase_date"] == second["purchase_date"]:
+            assert first["id"] > second["id"]
+
+def test_last_page_has_no_cursor(client, expenses):
+    response = client.get("/expenses/", headers=expenses, params={"sort": "id", "limit": 5})
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/expenses/", headers=expenses, params={"sort": "id", "limit": 5, "cursor": cursor})
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+    page = client.get("/expenses/compact", headers=expenses, params={"sort": "id", "limit": 5, "cursor": cursor}).json()
+    assert page["next_cursor"] is None
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b'{"value": 1}').decode(),
+    base64.urlsafe_b64encode(b'["2024-13-45", 3]').decode(),
+    base64.urlsafe_b64encode(b'["2024-03-01", "x"]').decode(),
+])
+def test_tampered_cursor_is_rejected(client, expenses, cursor):
+    for url in ("/expenses/", "/expenses/compact"):
+        response = client.get(url, headers=expenses, params={"sort": "-purchase_date", "cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor."
@@ -0,0 +1,98 @@
+"""Project isolation: another project's rows can't be read, changed or deleted."""
+import pytest
+from backend import projects
+
+@pytest.fixture
+def owned(client, project):
+    """One row of every kind in project, with the expense tagged and carrying an attachment."""
+    def create(url, **data):
+        response = client.post(url, headers=project, json=data)
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+
+    ids = {"category": create("/categories/", title="Shell", budget=1000)}
+    ids["sub_category"] = create("/sub_categories/", title="Walls", category_id=ids["category"])
+    ids["phase"] = create("/phases/", title="Phase 1")
+    ids["tag"] = create("/tags/", title="Invoice")
+    ids["expense"] = create("/expenses/", title="Bricks", amount=100, category_id=ids["category"],
+                            sub_category_id=ids["sub_category"], phase_id=ids["phase"], tags=[ids["tag"]])
+    response = client.post(f"/expenses/{ids['expense']}/attachments", headers=project, content=b"receipt")
+    ids["attachment"] = response.json()["id"]
+    return ids
+
+URLS = {"category": "/categories", "sub_category": "/sub_categories", "phase": "/phases", "tag": "/tags"}
+
+def test_lists_are_empty_in_another_project(client, owned, other_project):
+    for url in ("/expenses/", "/categories/", "/sub_categories/", "/phases/", "/tags/"):
+        assert client.get(url, headers=other_project).json() == []
+    assert client.get("/expenses/compact", headers=other_project).json()["expenses"] == []
+    assert client.get("/expenses/search", headers=other_project, params={"q": "bricks"}).json() == []
+
+    taxonomy = client.get("/taxonomy", headers=other_project).json()
+    assert (taxonomy["count"], taxonomy["categories"], taxonomy["phases"], taxonomy["tags"]) == (0, [], [], [])
+
+    changes = client.get("/sync", headers=other_project).json()
+    assert all(changes[entity] == [] for entity in ("expenses", "categories", "sub_categories", "phases", "tags"))
+
+    for fmt in ("csv", "ndjson"):
+        body = client.get("/expenses/export", headers=other_project, params={"format": fmt}).text
+        assert "Bricks" not in body
+
+def test_other_project_cannot_change_rows(client, owned, other_project):
+    expense = {"title": "Stolen", "amount": 1, "category_id": owned["category"]}
+    assert client.put(f"/expenses/{owned['expense']}", headers=other_project, json=expense).status_code == 404
+    assert client.delete(f"/expenses/{owned['expense']}", headers=other_project).status_code == 404
+    assert client.get(f"/expenses/{owned['expense']}/attachments", headers=other_project).status_code == 404
+    assert client.get(f"/attachments/{owned['attachment']}", headers=other_project).status_code == 404
+    assert client.delete(f"/attachments/{owned['attachment']}", headers=other_project).status_code == 404
+
+    for name, url in URLS.items():
+        data = {"title": "Stolen", "category_id": owned["category"]} if name == "sub_category" else {"title": "Stolen"}
+        assert client.put(f"{url}/{owned[name]}", headers=other_project, json=data).status_code in (400, 404)
+        assert client.delete(f"{url}/{owned[name]}", headers=other_project).status_code == 404
+
+def test_other_project_cannot_reference_rows(client, owned, other_project):
+    category = client.post("/categories/", headers=other_project, json={"title": "Shell"}).json()
+    for field in ("category_id", "sub_category_id", "phase_id"):
+        data = {"title": "Bricks", "amount": 1, "category_id": category["id"], field: owned[field[:-3]]}
+        response = client.post("/expenses/", headers=other_project, json=data)
+        assert response.status_code == 400
+    response = client.post("/sub_categories/", headers=other_project, json={"title": "Walls", "category_id": owned["category"]})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("operation", [
+    {"entity": "expense", "action": "update", "data": {"title": "Stolen", "amount": 1}},
+    {"entity": "expense", "action": "delete"},
+    {"entity": "category", "action": "update", "data": {"title": "Stolen"}},
+    {"entity": "tag", "action": "delete"},
+])
+def test_batch_cannot_touch_other_projects(client, owned, other_project, operation):
+    operation = {**operation, "id": owned[operation["entity"]]}
+    if operation["entity"] == "expense" and "data" in operation:
+        operation["data"]["category_id"] = owned["category"]
+    response = client.post("/batch", headers=other_project, json={"operations": [operation]})
+    assert response.status_code in (400, 404)
+
+def test_owner_still_sees_everything(client, project, owned, other_project):
+    test_other_project_cannot_change_rows(client, owned, other_project)
+    expense = client.get("/expenses/", headers=project).json()[0]
+    assert (expense["id"], expense["title"], expense["amount"]) == (owned["expense"], "Bricks", 100)
+    assert [tag["title"] for tag in expense["tags"]] == ["Invoice"]
+    assert client.get(f"/attachments/{owned['attachment']}", headers=project).content == b"receipt"
+
+def test_unknown_project_is_404(client):
+    assert client.get("/expenses/", headers={"X-Project-Id": "999999"}).status_code == 404
+
+def test_project_delete_rules(client, project, owned, other_project):
+    project_id, other_id = project["X-Project-Id"], other_project["X-Project-Id"]
+    response = client.delete(f"/projects/{project_id}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Could not delete project that still has data."
+
+    response = client.delete(f"/projects/{projects.DEFAULT_PROJECT_ID}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The default project cannot be deleted."
+
+    assert client.delete(f"/projects/{other_id}", headers=project).status_code == 200
+    assert client.get("/expenses/", headers=other_project).status_code == 404
+    assert client.delete(f"/projects/{other_id}").status_code == 404
@@ -0,0 +1,64 @@
+"""List endpoints load their relationships eagerly, so the number of SQL
+statements per call must not grow with the number of rows."""
+import contextlib
+import datetime
+import pytest
+from sqlalchemy import event
+from backend import database, models, projects, rollups
+
+@contextlib.contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+
+def seed(headers, expenses: int):
+    """Categories with sub-categories, phases, tags and expenses using all of them."""
+    with database.SessionLocal() as db:
+        projects.scope(db, int(headers["X-Project-Id"]))
+        categories = [
+            models.Category(title=f"Category {i}", sub_categories=[
+                models.SubCategory(title=f"Sub-category {i}.{j}") for j in range(3)
+            ])
+            for i in range(5)
+        ]
+        phases = [models.ConstructionPhase(title=f"Phase {i}") for i in range(4)]
+        tags = [models.Tag(title=f"Tag {i}") for i in range(6)]
+        db.add_all(categories + phases + tags)
+        for i in range(expenses):
+            category = categories[i % len(categories)]
+            db.add(models.Expense(
+                title=f"Expense {i}", amount=10 + i, purchase_date=datetime.date(2024, 1, 1 + i % 28),
+                category=category, sub_category=category.sub_categories[i % 3], phase=phases[i % len(phases)],
+                tags=[tags[i % len(tags)], tags[(i + 1) % len(tags)]],
+            ))
+        db.flush()
+        rollups.rebuild(db)
+        db.commit()
+
+def statements_for(client, url, headers):
+    # The first request of a project reloads the known project IDs; keep it out of the count
+    client.get("/expenses/?limit=1", headers=headers)
+    with count_statements() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+@pytest.mark.parametrize("url, limit", [("/expenses/?limit=100", 3), ("/categories/", 2)])
+def test_list_statements_do_not_grow_with_rows(client, url, limit):
+    counts = []
+    for size in (10, 100):
+        headers = {"X-Project-Id": str(client.post("/projects/", json={"title": f"{url} x{size}"}).json()["id"])}
+        seed(headers, size)
+        count, body = statements_for(client, url, headers)
+        assert body
+        counts.append(count)
+    assert counts[0] == counts[1]
+    assert counts[1] <= limit
@@ -0,0 +1,82 @@
+"""Deleting categories, sub-categories, phases and tags that expenses still use."""
+import pytest
+from backend import database, models
+
+def create(client, headers, url, **data):
+    response = client.post(url, headers=headers, json=data)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+@pytest.fixture
+def references(client, project):
+    shell = create(client, project, "/categories/", title="Shell")
+    roof = create(client, project, "/categories/", title="Roof")
+    ids = {
+        "category": (shell, roof),
+        "sub_category": (create(client, project, "/sub_categories/", title="Walls", category_id=shell),
+                         create(client, project, "/sub_categories/", title="Floors", category_id=shell)),
+        "phase": (create(client, project, "/phases/", title="Phase 1"), create(client, project, "/phases/", title="Phase 2")),
+        "tag": (create(client, project, "/tags/", title="Invoice"), create(client, project, "/tags/", title="Paid")),
+    }
+    source = {name: pair[0] for name, pair in ids.items()}
+    expenses = [
+        create(client, project, "/expenses/", title=f"Expense {i}", amount=10 * (i + 1), purchase_date="2024-03-01",
+               category_id=source["category"], sub_category_id=source["sub_category"], phase_id=source["phase"],
+               tags=[source["tag"]] if i else [source["tag"], ids["tag"][1]])
+        for i in range(3)
+    ]
+    return project, ids, expenses
+
+def expense(client, headers, expense_id):
+    return next(row for row in client.get("/expenses/", headers=headers).json() if row["id"] == expense_id)
+
+URLS = {"category": "/categories", "sub_category": "/sub_categories", "phase": "/phases", "tag": "/tags"}
+
+def rollup_totals(project_id, column):
+    rollup = models.ExpenseRollup
+    with database.SessionLocal() as db:
+        rows = db.query(getattr(rollup, column), rollup.total, rollup.count).filter(rollup.project_id == project_id)
+        return {key: (total, count) for key, total, count in rows}
+
+@pytest.mark.parametrize("name", URLS)
+def test_delete_in_use_is_refused(client, references, name):
+    headers, ids, expenses = references
+    response = client.delete(f"{URLS[name]}/{ids[name][0]}", headers=headers)
+    assert response.status_code == 400
+    assert "existing expenses" in response.json()["detail"]
+    row = expense(client, headers, expenses[0])
+    if name == "tag":
+        assert ids["tag"][0] in [tag["id"] for tag in row["tags"]]
+    else:
+        assert row[name]["id"] == ids[name][0]
+
+@pytest.mark.parametrize("name", ["category", "sub_category", "phase"])
+def test_reassign_moves_expenses_and_rollups(client, references, name):
+    headers, ids, expenses = references
+    source, target = ids[name]
+    column = f"{name}_id"
+    before = rollup_totals(int(headers["X-Project-Id"]), column)
+    assert before == {source: (60.0, 3)}
+
+    response = client.delete(f"{URLS[name]}/{source}", headers=headers, params={"reassign_to": target})
+    assert response.status_code == 200
+    for expense_id in expenses:
+        assert expense(client, headers, expense_id)[name]["id"] == target
+    assert rollup_totals(int(headers["X-Project-Id"]), column) == {target: (60.0, 3)}
+    assert source not in [row["id"] for row in client.get(f"{URLS[name]}/", headers=headers).json()]
+
+def test_reassign_tag_merges_links(client, references):
+    headers, ids, expenses = references
+    source, target = ids["tag"]
+    response = client.delete(f"/tags/{source}", headers=headers, params={"reassign_to": target})
+    assert response.status_code == 200
+    for expense_id in expenses:
+        # The first expense carried both tags; it keeps a single link
+        assert [tag["id"] for tag in expense(client, headers, expense_id)["tags"]] == [target]
+    assert [tag["id"] for tag in client.get("/tags/", headers=headers).json()] == [target]
+
+@pytest.mark.parametrize("name", URLS)
+def test_reassign_to_unknown_target_is_refused(client, references, name):
+    headers, ids, _ = references
+    response = client.delete(f"{URLS[name]}/{ids[name][0]}", headers=headers, params={"reassign_to": ids[name][0]})
+    assert response.status_code == 404
@@ -0,0 +1,78 @@
+"""The expense_rollups table must always equal the totals recomputed from the
+expenses, whichever write path changed them."""
+import datetime
+from backend import crud, database, models, projects, rollups, schemas
+
+def project_id(headers):
+    return int(headers["X-Project-Id"])
+
+def rollup_rows(db, pid):
+    rollup = models.ExpenseRollup
+    return {
+        (row.category_id, row.sub_category_id, row.phase_id, row.month): (round(row.total, 2), row.count)
+        for row in db.query(rollup).filter(rollup.project_id == pid)
+    }
+
+def expected_rows(db, pid):
+    expected = {}
+    for expense in db.query(models.Expense).filter(models.Expense.project_id == pid):
+        rollups.add_delta(expected, rollups.expense_key(expense)[1:], expense.amount, 1)
+    return {key: (round(total, 2), count) for key, (total, count) in expected.items()}
+
+def assert_rollups_match(headers):
+    with database.SessionLocal() as db:
+        assert rollup_rows(db, project_id(headers)) == expected_rows(db, project_id(headers))
+
+def create(client, headers, url, **data):
+    response = client.post(url, headers=headers, json=data)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def test_rollups_follow_expense_writes(client, project):
+    shell = create(client, project, "/categories/", title="Shell")
+    roof = create(client, project, "/categories/", title="Roof")
+    sub = create(client, project, "/sub_categories/", title="Walls", category_id=shell)
+    phase = create(client, project, "/phases/", title="Phase 1")
+
+    first = create(client, project, "/expenses/", title="Bricks", amount=100.10, category_id=shell,
+                   sub_category_id=sub, phase_id=phase, purchase_date="2024-03-01")
+    second = create(client, project, "/expenses/", title="Cement", amount=20.25, category_id=shell,
+                    purchase_date="2024-03-20")
+    create(client, project, "/expenses/", title="Tiles", amount=55, category_id=roof, purchase_date="2024-04-02")
+    assert_rollups_match(project)
+
+    response = client.put(f"/expenses/{first}", headers=project, json={
+        "title": "Bricks", "amount": 80, "category_id": roof, "purchase_date": "2024-05-01"})
+    assert response.status_code == 200
+    assert_rollups_match(project)
+
+    assert client.delete(f"/expenses/{second}", headers=project).status_code == 200
+    assert_rollups_match(project)
+
+    other_phase = create(client, project, "/phases/", title="Phase 2")
+    create(client, project, "/expenses/", title="Scaffold", amount=12, category_id=shell,
+           sub_category_id=sub, phase_id=phase, purchase_date="2024-03-05")
+    assert client.delete(f"/phases/{phase}?reassign_to={other_phase}", headers=project).status_code == 200
+    assert client.delete(f"/categories/{roof}?reassign_to={shell}", headers=project).status_code == 200
+    assert_rollups_match(project)
+
+def test_rebuild_reproduces_incremental_totals(client, project):
+    category = create(client, project, "/categories/", title="Shell")
+    for day in range(1, 8):
+        create(client, project, "/expenses/", title=f"Expense {day}", amount=day * 1.5, category_id=category,
+               purchase_date=f"2024-0{day % 3 + 1}-0{day}")
+    with database.SessionLocal() as db:
+        incremental = rollup_rows(db, project_id(project))
+        projects.scope(db, project_id(project))
+        rollups.rebuild(db)
+        assert rollup_rows(db, project_id(project)) == incremental
+
+def test_unscoped_session_files_deltas_under_the_expense_project(client, project):
+    category = create(client, project, "/categories/", title="Shell")
+    expense = create(client, project, "/expenses/", title="Bricks", amount=10, category_id=category)
+    with database.SessionLocal() as db:
+        # CLI tools work without a project scope
+        crud.update_expense(db, expense, schemas.ExpenseCreate(
+            title="Bricks", amount=25, category_id=category, purchase_date=datetime.date(2024, 1, 1)))
+        assert rollup_rows(db, projects.DEFAULT_PROJECT_ID).get((category, 0, 0, "2024-01")) is None
+    assert_rollups_match(project)
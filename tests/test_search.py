@@ -0,0 +1,57 @@
+"""GET /expenses/search, on the FTS5 index and on the substring fallback."""
+import pytest
+from backend import search
+
+@pytest.fixture(params=["fts", "fallback"])
+def mode(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(search, "fts_available", lambda db: False)
+    return request.param
+
+@pytest.fixture
+def expenses(client, project):
+    category = client.post("/categories/", headers=project, json={"title": "Shell"}).json()
+    tag = client.post("/tags/", headers=project, json={"title": "Granite"}).json()
+    created = {}
+    for key, data in {
+        "notes": {"title": "Delivery", "notes": "granite offcuts"},
+        "title": {"title": "Granite worktop"},
+        "description": {"title": "Kitchen", "description": "Granite sink"},
+        "tag": {"title": "Stone", "tags": [tag["id"]]},
+        "other": {"title": "Bricks"},
+    }.items():
+        response = client.post("/expenses/", headers=project, json={"amount": 10, "category_id": category["id"], **data})
+        created[key] = response.json()["id"]
+    return project, created
+
+def search_ids(client, headers, q):
+    response = client.get("/expenses/search", headers=headers, params={"q": q})
+    assert response.status_code == 200
+    return [hit["expense"]["id"] for hit in response.json()]
+
+def test_ranking_follows_column_weights(client, expenses, mode):
+    headers, created = expenses
+    assert search_ids(client, headers, "granite") == [
+        created["title"], created["tag"], created["description"], created["notes"],
+    ]
+
+def test_tag_titles_match(client, expenses, mode):
+    headers, created = expenses
+    assert created["tag"] in search_ids(client, headers, "granite")
+    assert created["other"] not in search_ids(client, headers, "granite")
+
+def test_other_projects_are_filtered_out(client, expenses, other_project, mode):
+    headers, created = expenses
+    other = other_project
+    category = client.post("/categories/", headers=other, json={"title": "Shell"}).json()
+    client.post("/expenses/", headers=other, json={"title": "Granite slab", "amount": 5, "category_id": category["id"]})
+    assert len(search_ids(client, other, "granite")) == 1
+    assert len(search_ids(client, headers, "granite")) == 4
+
+def test_highlight_escapes_html(client, project, mode):
+    category = client.post("/categories/", headers=project, json={"title": "Shell"}).json()
+    client.post("/expenses/", headers=project, json={
+        "title": "<b>Bricks</b> & mortar", "description": "<i>red</i> bricks", "amount": 1, "category_id": category["id"]})
+    hit = client.get("/expenses/search", headers=project, params={"q": "bricks"}).json()[0]
+    assert hit["title_highlight"] == "&lt;b&gt;<mark>Bricks</mark>&lt;/b&gt; &amp; mortar"
+    assert "<i>" not in hit["snippet"]
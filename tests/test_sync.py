@@ -0,0 +1,81 @@
+"""GET /sync: full syncs, deltas after a change token, and tombstones."""
+
+def create(client, headers, url, **data):
+    response = client.post(url, headers=headers, json=data)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def sync(client, headers, since):
+    response = client.get("/sync", headers=headers, params={"since": since})
+    assert response.status_code == 200
+    return response.json()
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+def setup_project(client, headers):
+    category = create(client, headers, "/categories/", title="Shell")
+    expenses = [
+        create(client, headers, "/expenses/", title=title, amount=amount, category_id=category["id"])
+        for title, amount in (("Bricks", 100), ("Cement", 20), ("Tiles", 55))
+    ]
+    return category, expenses
+
+def test_full_sync_then_delta_after_update(client, project):
+    category, expenses = setup_project(client, project)
+    full = sync(client, project, 0)
+    assert full["full"] is True
+    assert ids(full["expenses"]) == ids(expenses)
+    assert ids(full["categories"]) == [category["id"]]
+
+    assert sync(client, project, full["token"])["expenses"] == []
+
+    bricks = expenses[0]
+    response = client.put(f"/expenses/{bricks['id']}", headers=project, json={
+        "title": "Bricks", "amount": 120, "category_id": category["id"]})
+    assert response.status_code == 200
+    delta = sync(client, project, full["token"])
+    assert delta["full"] is False
+    assert delta["token"] > full["token"]
+    assert ids(delta["expenses"]) == [bricks["id"]]
+    assert delta["expenses"][0]["amount"] == 120
+    assert delta["categories"] == [] and delta["deleted"] == []
+
+def test_delete_is_reported_in_deleted(client, project):
+    _, expenses = setup_project(client, project)
+    token = sync(client, project, 0)["token"]
+    assert client.delete(f"/expenses/{expenses[1]['id']}", headers=project).status_code == 200
+
+    delta = sync(client, project, token)
+    assert delta["deleted"] == [{"entity": "expenses", "id": expenses[1]["id"]}]
+    assert delta["expenses"] == []
+    assert ids(sync(client, project, 0)["expenses"]) == [expenses[0]["id"], expenses[2]["id"]]
+
+def test_token_from_another_database_forces_full_sync(client, project):
+    _, expenses = setup_project(client, project)
+    token = sync(client, project, 0)["token"]
+    changes = sync(client, project, token + 1000)
+    assert changes["full"] is True
+    assert changes["token"] == token
+    assert ids(changes["expenses"]) == ids(expenses)
+
+def test_tag_relinks_move_change_seq(client, project):
+    category, expenses = setup_project(client, project)
+    first, second = create(client, project, "/tags/", title="Invoice"), create(client, project, "/tags/", title="Paid")
+    bricks = expenses[0]
+    token = sync(client, project, 0)["token"]
+
+    # Changing only the tags issues no UPDATE of the expense row itself
+    response = client.put(f"/expenses/{bricks['id']}", headers=project, json={
+        "title": "Bricks", "amount": 100, "category_id": category["id"], "tags": [first["id"]]})
+    assert response.status_code == 200
+    delta = sync(client, project, token)
+    assert ids(delta["expenses"]) == [bricks["id"]]
+    assert delta["expenses"][0]["tags"] == [first["id"]]
+
+    token = delta["token"]
+    assert client.delete(f"/tags/{first['id']}?reassign_to={second['id']}", headers=project).status_code == 200
+    delta = sync(client, project, token)
+    assert ids(delta["expenses"]) == [bricks["id"]]
+    assert delta["expenses"][0]["tags"] == [second["id"]]
+    assert delta["deleted"] == [{"entity": "tags", "id": first["id"]}]
@@ -0,0 +1,99 @@
+"""GET /taxonomy: per-node counts and totals, and cache invalidation on expense writes."""
+import pytest
+
+def create(client, headers, url, **data):
+    response = client.post(url, headers=headers, json=data)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+@pytest.fixture
+def tree(client, project):
+    shell = create(client, project, "/categories/", title="Shell")
+    roof = create(client, project, "/categories/", title="Roof")
+    walls = create(client, project, "/sub_categories/", title="Walls", category_id=shell)
+    floors = create(client, project, "/sub_categories/", title="Floors", category_id=shell)
+    phases = [create(client, project, "/phases/", title=f"Phase {i}") for i in (1, 2)]
+    tags = [create(client, project, "/tags/", title=title) for title in ("Invoice", "Paid", "Unused")]
+    rows = [
+        (shell, walls, phases[0], [tags[0]], 100.10),
+        (shell, walls, phases[1], [tags[0], tags[1]], 20.25),
+        (shell, floors, None, [], 7.5),
+        (shell, None, phases[0], [tags[1]], 12),
+        (roof, None, None, [tags[0]], 55.05),
+    ]
+    for i, (category_id, sub_category_id, phase_id, tag_ids, amount) in enumerate(rows):
+        create(client, project, "/expenses/", title=f"Expense {i}", amount=amount, category_id=category_id,
+               sub_category_id=sub_category_id, phase_id=phase_id, tags=tag_ids, purchase_date=f"2024-0{i + 1}-10")
+    return project
+
+def expected_totals(expenses):
+    """(count, total) per node, computed from the expense rows."""
+    totals = {}
+
+    def add(key, amount):
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, round(total + amount, 2))
+
+    for expense in expenses:
+        add("all", expense["amount"])
+        add(("category", expense["category"]["id"]), expense["amount"])
+        if expense["sub_category"]:
+            add(("sub_category", expense["sub_category"]["id"]), expense["amount"])
+        if expense["phase"]:
+            add(("phase", expense["phase"]["id"]), expense["amount"])
+        for tag in expense["tags"]:
+            add(("tag", tag["id"]), expense["amount"])
+    return totals
+
+def taxonomy_totals(taxonomy):
+    nodes = {"all": (taxonomy["count"], taxonomy["total"])}
+    for category in taxonomy["categories"]:
+        nodes[("category", category["id"])] = (category["count"], category["total"])
+        for sub in category["sub_categories"]:
+            nodes[("sub_category", sub["id"])] = (sub["count"], sub["total"])
+    for name in ("phase", "tag"):
+        for node in taxonomy[f"{name}s"]:
+            nodes[(name, node["id"])] = (node["count"], node["total"])
+    # Nodes without expenses are listed with zeros
+    return {key: (count, round(total, 2)) for key, (count, total) in nodes.items() if count}
+
+def assert_taxonomy_matches(client, headers):
+    taxonomy = client.get("/taxonomy", headers=headers).json()
+    expenses = client.get("/expenses/", headers=headers, params={"limit": 1000}).json()
+    assert taxonomy_totals(taxonomy) == expected_totals(expenses)
+    return taxonomy
+
+def test_node_totals_match_expenses(client, tree):
+    taxonomy = assert_taxonomy_matches(client, tree)
+    assert taxonomy["count"] == 5
+    assert [tag["count"] for tag in taxonomy["tags"]] == [3, 2, 0]
+    assert [len(category["sub_categories"]) for category in taxonomy["categories"]] == [2, 0]
+
+def test_expense_writes_invalidate_the_cache(client, tree):
+    taxonomy = assert_taxonomy_matches(client, tree)
+    category_id = taxonomy["categories"][1]["id"]
+    tag_id = taxonomy["tags"][2]["id"]
+
+    expense_id = create(client, tree, "/expenses/", title="Tiles", amount=30, category_id=category_id)
+    assert assert_taxonomy_matches(client, tree)["count"] == 6
+
+    # A tag-only change moves no rollup totals but must still refresh the tag counts
+    response = client.put(f"/expenses/{expense_id}", headers=tree, json={
+        "title": "Tiles", "amount": 30, "category_id": category_id, "tags": [tag_id]})
+    assert response.status_code == 200
+    assert assert_taxonomy_matches(client, tree)["tags"][2]["count"] == 1
+
+    response = client.post("/batch", headers=tree, json={"operations": [
+        {"entity": "expense", "action": "update", "id": expense_id,
+         "data": {"title": "Tiles", "amount": 45, "category_id": category_id, "tags": [tag_id]}},
+    ]})
+    assert response.status_code == 200
+    assert_taxonomy_matches(client, tree)
+
+    response = client.post("/expenses/bulk", headers={**tree, "Content-Type": "text/csv"},
+                           content="title,amount,category\nGutters,12.5,Roof\n")
+    assert response.json()["imported"] == 1
+    assert assert_taxonomy_matches(client, tree)["count"] == 7
+
+    assert client.delete(f"/expenses/{expense_id}", headers=tree).status_code == 200
+    assert assert_taxonomy_matches(client, tree)["tags"][2]["count"] == 0